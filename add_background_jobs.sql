@@ -0,0 +1,56 @@
+-- Background job queue table for TASK_QUEUE_BACKEND=postgres
+-- Run this in your Supabase SQL Editor
+-- (the functions contain semicolons, so run_migration.py cannot split
+-- this file)
+--
+-- Jobs are deleted when they succeed; rows with status 'failed' have used
+-- all their attempts and are kept for inspection.
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    task TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_status_run_at ON background_jobs(status, run_at);
+
+-- Only the service role key (supabase_admin) should touch the queue
+ALTER TABLE background_jobs ENABLE ROW LEVEL SECURITY;
+
+-- Atomically claim up to batch_size due jobs for one worker. Jobs left
+-- 'running' longer than lock_timeout_seconds (crashed worker) are reclaimed.
+CREATE OR REPLACE FUNCTION claim_background_jobs(worker_id TEXT, batch_size INTEGER DEFAULT 10,
+                                                 lock_timeout_seconds INTEGER DEFAULT 300)
+RETURNS SETOF background_jobs AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE background_jobs
+    SET status = 'running',
+        attempts = background_jobs.attempts + 1,
+        locked_by = worker_id,
+        locked_at = NOW()
+    WHERE id IN (
+        SELECT j.id FROM background_jobs j
+        WHERE (j.status = 'queued' AND j.run_at <= NOW())
+           OR (j.status = 'running' AND j.locked_at < NOW() - make_interval(secs => lock_timeout_seconds))
+        ORDER BY j.run_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING background_jobs.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Queue depth by status
+CREATE OR REPLACE FUNCTION background_job_counts()
+RETURNS TABLE(status TEXT, count BIGINT) AS $$
+    SELECT j.status, COUNT(*) FROM background_jobs j GROUP BY j.status
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,57 @@
+-- Aggregate per-user badge statistics for bulk badge backfills
+-- Run this in your Supabase SQL Editor AFTER add_user_stats.sql
+--
+-- badge_stats_batch() recomputes the counters for a batch of users straight
+-- from the source tables with one GROUP BY pass per table, so
+-- backfill_badges.py needs a single call per batch instead of a count
+-- query per user per statistic.
+
+CREATE OR REPLACE FUNCTION badge_stats_batch(user_ids TEXT[])
+RETURNS TABLE(
+    user_id TEXT,
+    events_attended BIGINT,
+    groups_joined BIGINT,
+    issues_reported BIGINT,
+    comments_posted BIGINT,
+    posts_created BIGINT,
+    events_created BIGINT,
+    groups_created BIGINT,
+    reputation_points INTEGER
+) AS $$
+    SELECT u.id,
+           COALESCE(r.n, 0),
+           COALESCE(m.n, 0),
+           COALESCE(i.n, 0),
+           COALESCE(ec.n, 0) + COALESCE(pc.n, 0),
+           COALESCE(p.n, 0),
+           COALESCE(e.n, 0),
+           COALESCE(g.n, 0),
+           COALESCE(u.reputation_points, 0)
+    FROM users u
+    LEFT JOIN (SELECT er.user_id, COUNT(*) AS n FROM event_rsvps er
+               WHERE er.status = 'going' AND er.user_id = ANY(user_ids)
+               GROUP BY er.user_id) r ON r.user_id = u.id
+    LEFT JOIN (SELECT gm.user_id, COUNT(*) AS n FROM group_members gm
+               WHERE gm.user_id = ANY(user_ids)
+               GROUP BY gm.user_id) m ON m.user_id = u.id
+    LEFT JOIN (SELECT iss.reporter_id, COUNT(*) AS n FROM issues iss
+               WHERE iss.reporter_id = ANY(user_ids)
+               GROUP BY iss.reporter_id) i ON i.reporter_id = u.id
+    LEFT JOIN (SELECT c.user_id, COUNT(*) AS n FROM event_comments c
+               WHERE c.user_id = ANY(user_ids)
+               GROUP BY c.user_id) ec ON ec.user_id = u.id
+    LEFT JOIN (SELECT c.user_id, COUNT(*) AS n FROM group_post_comments c
+               WHERE c.user_id = ANY(user_ids)
+               GROUP BY c.user_id) pc ON pc.user_id = u.id
+    LEFT JOIN (SELECT gp.user_id, COUNT(*) AS n FROM group_posts gp
+               WHERE gp.user_id = ANY(user_ids)
+               GROUP BY gp.user_id) p ON p.user_id = u.id
+    LEFT JOIN (SELECT ev.organizer_id, COUNT(*) AS n FROM events ev
+               WHERE ev.organizer_id = ANY(user_ids)
+               GROUP BY ev.organizer_id) e ON e.organizer_id = u.id
+    LEFT JOIN (SELECT gr.creator_id, COUNT(*) AS n FROM groups gr
+               WHERE gr.creator_id = ANY(user_ids)
+               GROUP BY gr.creator_id) g ON g.creator_id = u.id
+    WHERE u.id = ANY(user_ids)
+$$ LANGUAGE sql STABLE;
+
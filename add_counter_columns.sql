@@ -0,0 +1,120 @@
+-- Denormalized counter columns
+-- Run this in your Supabase SQL Editor AFTER database_schema_extensions.sql,
+-- add_group_posts_tables.sql and add_saved_events_table.sql
+-- (the trigger functions contain semicolons, so run_migration.py cannot
+-- split this file)
+--
+-- Counts that used to be recomputed with count='exact' on every page view
+-- are stored on the parent row and kept current by triggers:
+--   events.going_count        <- event_rsvps with status = 'going'
+--   groups.member_count       <- group_members
+--   group_posts.like_count    <- group_post_likes
+--   group_posts.comment_count <- group_post_comments
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS going_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE group_posts ADD COLUMN IF NOT EXISTS like_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE group_posts ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+
+-- events.going_count
+CREATE OR REPLACE FUNCTION update_event_going_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'going' THEN
+        UPDATE events SET going_count = GREATEST(going_count - 1, 0) WHERE id = OLD.event_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'going' THEN
+        UPDATE events SET going_count = going_count + 1 WHERE id = NEW.event_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS event_rsvps_going_count ON event_rsvps;
+CREATE TRIGGER event_rsvps_going_count AFTER INSERT OR UPDATE OF status, event_id OR DELETE ON event_rsvps
+    FOR EACH ROW EXECUTE FUNCTION update_event_going_count();
+
+-- groups.member_count
+CREATE OR REPLACE FUNCTION update_group_member_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE groups SET member_count = member_count + 1 WHERE id = NEW.group_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0) WHERE id = OLD.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS group_members_member_count ON group_members;
+CREATE TRIGGER group_members_member_count AFTER INSERT OR DELETE ON group_members
+    FOR EACH ROW EXECUTE FUNCTION update_group_member_count();
+
+-- group_posts.like_count
+CREATE OR REPLACE FUNCTION update_group_post_like_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE group_posts SET like_count = like_count + 1 WHERE id = NEW.post_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE group_posts SET like_count = GREATEST(like_count - 1, 0) WHERE id = OLD.post_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS group_post_likes_like_count ON group_post_likes;
+CREATE TRIGGER group_post_likes_like_count AFTER INSERT OR DELETE ON group_post_likes
+    FOR EACH ROW EXECUTE FUNCTION update_group_post_like_count();
+
+-- group_posts.comment_count
+CREATE OR REPLACE FUNCTION update_group_post_comment_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE group_posts SET comment_count = comment_count + 1 WHERE id = NEW.post_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE group_posts SET comment_count = GREATEST(comment_count - 1, 0) WHERE id = OLD.post_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS group_post_comments_comment_count ON group_post_comments;
+CREATE TRIGGER group_post_comments_comment_count AFTER INSERT OR DELETE ON group_post_comments
+    FOR EACH ROW EXECUTE FUNCTION update_group_post_comment_count();
+
+-- Recompute every counter from the source tables.
+-- Called once below to fill existing rows; run backfill_counters.py to
+-- repair drift later on.
+CREATE OR REPLACE FUNCTION backfill_counters()
+RETURNS VOID AS $$
+BEGIN
+    UPDATE events e SET going_count = COALESCE(c.n, 0)
+    FROM (SELECT ev.id, COUNT(r.id) AS n
+          FROM events ev LEFT JOIN event_rsvps r ON r.event_id = ev.id AND r.status = 'going'
+          GROUP BY ev.id) c
+    WHERE e.id = c.id AND e.going_count IS DISTINCT FROM COALESCE(c.n, 0);
+
+    UPDATE groups g SET member_count = COALESCE(c.n, 0)
+    FROM (SELECT gr.id, COUNT(m.id) AS n
+          FROM groups gr LEFT JOIN group_members m ON m.group_id = gr.id
+          GROUP BY gr.id) c
+    WHERE g.id = c.id AND g.member_count IS DISTINCT FROM COALESCE(c.n, 0);
+
+    UPDATE group_posts p SET like_count = COALESCE(c.n, 0)
+    FROM (SELECT gp.id, COUNT(l.id) AS n
+          FROM group_posts gp LEFT JOIN group_post_likes l ON l.post_id = gp.id
+          GROUP BY gp.id) c
+    WHERE p.id = c.id AND p.like_count IS DISTINCT FROM COALESCE(c.n, 0);
+
+    UPDATE group_posts p SET comment_count = COALESCE(c.n, 0)
+    FROM (SELECT gp.id, COUNT(cm.id) AS n
+          FROM group_posts gp LEFT JOIN group_post_comments cm ON cm.post_id = gp.id
+          GROUP BY gp.id) c
+    WHERE p.id = c.id AND p.comment_count IS DISTINCT FROM COALESCE(c.n, 0);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT backfill_counters();
@@ -0,0 +1,70 @@
+-- "Near me" search for events and issues
+-- Run this in your Supabase SQL Editor AFTER add_search_indexes.sql
+-- (the functions contain semicolons, so run_migration.py cannot split
+-- this file)
+--
+-- Rather than adding a geometry column (which would change every
+-- select('*') row), index the point expression built from the existing
+-- latitude/longitude columns. The nearby_* functions use the exact same
+-- expression so the planner can use the GiST index for both the radius
+-- filter (ST_DWithin) and the nearest-first ordering (<->).
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE INDEX IF NOT EXISTS idx_events_geog ON events USING GIST (
+    (ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography)
+) WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_issues_geog ON issues USING GIST (
+    (ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography)
+) WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+
+-- Events within radius_km of (lat, lng), nearest first
+CREATE OR REPLACE FUNCTION nearby_events(
+    lat DOUBLE PRECISION,
+    lng DOUBLE PRECISION,
+    radius_km DOUBLE PRECISION DEFAULT 10,
+    result_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (event events, distance_km DOUBLE PRECISION) AS $$
+    SELECT e,
+           ST_Distance(
+               ST_SetSRID(ST_MakePoint(e.longitude::float8, e.latitude::float8), 4326)::geography,
+               ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography
+           ) / 1000.0
+    FROM events e
+    WHERE e.latitude IS NOT NULL AND e.longitude IS NOT NULL
+      AND ST_DWithin(
+          ST_SetSRID(ST_MakePoint(e.longitude::float8, e.latitude::float8), 4326)::geography,
+          ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography,
+          radius_km * 1000.0
+      )
+    ORDER BY ST_SetSRID(ST_MakePoint(e.longitude::float8, e.latitude::float8), 4326)::geography
+             <-> ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Issues within radius_km of (lat, lng), nearest first
+CREATE OR REPLACE FUNCTION nearby_issues(
+    lat DOUBLE PRECISION,
+    lng DOUBLE PRECISION,
+    radius_km DOUBLE PRECISION DEFAULT 10,
+    result_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (issue issues, distance_km DOUBLE PRECISION) AS $$
+    SELECT i,
+           ST_Distance(
+               ST_SetSRID(ST_MakePoint(i.longitude::float8, i.latitude::float8), 4326)::geography,
+               ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography
+           ) / 1000.0
+    FROM issues i
+    WHERE i.latitude IS NOT NULL AND i.longitude IS NOT NULL
+      AND ST_DWithin(
+          ST_SetSRID(ST_MakePoint(i.longitude::float8, i.latitude::float8), 4326)::geography,
+          ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography,
+          radius_km * 1000.0
+      )
+    ORDER BY ST_SetSRID(ST_MakePoint(i.longitude::float8, i.latitude::float8), 4326)::geography
+             <-> ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
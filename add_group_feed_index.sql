@@ -0,0 +1,10 @@
+-- Index for the group post feed
+-- Group.get_feed pages through a group's posts newest-first using
+-- (created_at, id) as a keyset cursor, so cover (group_id, created_at, id)
+-- together; id breaks ties between posts created at the same instant
+DROP INDEX IF EXISTS idx_group_posts_group_created_at;
+CREATE INDEX IF NOT EXISTS idx_group_posts_group_created_at_id
+    ON group_posts(group_id, created_at DESC, id DESC);
+
+-- Per-user like lookups for the posts on one feed page
+CREATE INDEX IF NOT EXISTS idx_group_post_likes_user_id ON group_post_likes(user_id);
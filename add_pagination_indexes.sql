@@ -0,0 +1,6 @@
+-- Indexes for keyset pagination on the discover pages
+-- Event.get_page walks events in (date_time, id) order and Group.get_page
+-- walks groups in (created_at, id) descending order; these indexes let
+-- every page be a single index range scan however deep the user scrolls
+CREATE INDEX IF NOT EXISTS idx_events_datetime_id ON events(date_time, id);
+CREATE INDEX IF NOT EXISTS idx_groups_created_at_id ON groups(created_at DESC, id DESC);
@@ -0,0 +1,74 @@
+-- Full-text search for events and groups
+-- Run this in your Supabase SQL Editor AFTER add_counter_columns.sql
+-- (the search functions contain semicolons, so run_migration.py cannot
+-- split this file)
+--
+-- Title/name matches are weighted above description matches. Results are
+-- ordered by ts_rank and paged with a (rank, id) keyset cursor.
+
+-- The indexes are on expressions rather than stored tsvector columns so the
+-- vectors are never returned by select('*'); the search functions below
+-- must use exactly the same expressions for the planner to use them.
+-- (Drops the generated columns an earlier version of this file added.)
+DROP INDEX IF EXISTS idx_events_search;
+DROP INDEX IF EXISTS idx_groups_search;
+ALTER TABLE events DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE groups DROP COLUMN IF EXISTS search_vector;
+
+CREATE INDEX IF NOT EXISTS idx_events_search ON events USING GIN ((
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+));
+
+CREATE INDEX IF NOT EXISTS idx_groups_search ON groups USING GIN ((
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+));
+
+-- Ranked event search
+CREATE OR REPLACE FUNCTION search_events(
+    q TEXT,
+    filter_category TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 20,
+    after_rank REAL DEFAULT NULL,
+    after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (event events, rank REAL) AS $$
+    SELECT e, r.rank
+    FROM events e,
+         websearch_to_tsquery('english', q) query,
+         LATERAL (SELECT ts_rank(
+             setweight(to_tsvector('english', coalesce(e.title, '')), 'A') ||
+             setweight(to_tsvector('english', coalesce(e.description, '')), 'B'),
+             query) AS rank) r
+    WHERE (setweight(to_tsvector('english', coalesce(e.title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(e.description, '')), 'B')) @@ query
+      AND (filter_category IS NULL OR e.category = filter_category)
+      AND (after_rank IS NULL OR (r.rank, e.id) < (after_rank, after_id))
+    ORDER BY r.rank DESC, e.id DESC
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Ranked group search
+CREATE OR REPLACE FUNCTION search_groups(
+    q TEXT,
+    filter_category TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 20,
+    after_rank REAL DEFAULT NULL,
+    after_id UUID DEFAULT NULL
+)
+RETURNS TABLE ("group" groups, rank REAL) AS $$
+    SELECT g, r.rank
+    FROM groups g,
+         websearch_to_tsquery('english', q) query,
+         LATERAL (SELECT ts_rank(
+             setweight(to_tsvector('english', coalesce(g.name, '')), 'A') ||
+             setweight(to_tsvector('english', coalesce(g.description, '')), 'B'),
+             query) AS rank) r
+    WHERE (setweight(to_tsvector('english', coalesce(g.name, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(g.description, '')), 'B')) @@ query
+      AND (filter_category IS NULL OR g.category = filter_category)
+      AND (after_rank IS NULL OR (r.rank, g.id) < (after_rank, after_id))
+    ORDER BY r.rank DESC, g.id DESC
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
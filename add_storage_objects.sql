@@ -0,0 +1,62 @@
+-- Reference counts for content-addressed storage objects
+-- Run this in your Supabase SQL Editor
+-- (the functions contain semicolons, so run_migration.py cannot split
+-- this file)
+--
+-- Uploads are stored at <bucket>/<sha256[:2]>/<sha256>.<ext>, so identical
+-- images share one object. Each row that points at an object holds one
+-- reference; delete_from_storage() only removes the object (and its
+-- thumbnail variants) when the last reference is released. Objects
+-- uploaded before this table existed, or while a reference couldn't be
+-- taken, live at unique paths; they are untracked and deleted directly.
+
+CREATE TABLE IF NOT EXISTS storage_objects (
+    bucket TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size BIGINT,
+    content_type TEXT,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (bucket, path)
+);
+
+-- Only the service role key (supabase_admin) should touch reference counts
+ALTER TABLE storage_objects ENABLE ROW LEVEL SECURITY;
+
+-- Add a reference; returns the new count (1 = object must be uploaded)
+CREATE OR REPLACE FUNCTION acquire_storage_object(p_bucket TEXT, p_path TEXT, p_sha256 TEXT,
+                                                  p_size BIGINT, p_content_type TEXT)
+RETURNS INTEGER AS $$
+    INSERT INTO storage_objects (bucket, path, sha256, size, content_type, ref_count)
+    VALUES (p_bucket, p_path, p_sha256, p_size, p_content_type, 1)
+    ON CONFLICT (bucket, path) DO UPDATE
+    SET ref_count = storage_objects.ref_count + 1, updated_at = NOW()
+    RETURNING ref_count;
+$$ LANGUAGE sql;
+
+-- Drop a reference; returns the remaining count, or NULL if untracked.
+-- The row is removed when the count reaches zero.
+CREATE OR REPLACE FUNCTION release_storage_object(p_bucket TEXT, p_path TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    remaining INTEGER;
+BEGIN
+    UPDATE storage_objects
+    SET ref_count = GREATEST(ref_count - 1, 0), updated_at = NOW()
+    WHERE bucket = p_bucket AND path = p_path
+    RETURNING ref_count INTO remaining;
+    
+    IF remaining IS NULL THEN
+        RETURN NULL;
+    END IF;
+    
+    IF remaining = 0 THEN
+        DELETE FROM storage_objects
+        WHERE bucket = p_bucket AND path = p_path AND ref_count = 0;
+    END IF;
+    
+    RETURN remaining;
+END;
+$$ LANGUAGE plpgsql;
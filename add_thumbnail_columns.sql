@@ -0,0 +1,9 @@
+-- Thumbnail URLs for event and group images
+-- Run this in your Supabase SQL Editor or with run_migration.py
+--
+-- Uploads are resized and re-encoded server-side (app/utils/image_pipeline.py)
+-- and a card-sized thumbnail is stored next to the original. List pages
+-- use thumbnail_url and fall back to image_url for older rows.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS thumbnail_url TEXT;
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS thumbnail_url TEXT;
@@ -0,0 +1,175 @@
+-- Per-user activity counters and a single-call profile bundle
+-- Run this in your Supabase SQL Editor AFTER add_counter_columns.sql
+-- (the functions contain semicolons, so run_migration.py cannot split
+-- this file)
+--
+-- user_stats holds one row per user with counters kept current by
+-- triggers on the source tables, so profile pages and badge evaluation
+-- read one row instead of running a count='exact' query per statistic.
+-- get_profile_bundle() returns stats, badges and recent activity in one RPC.
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    events_attended INTEGER NOT NULL DEFAULT 0,
+    groups_joined INTEGER NOT NULL DEFAULT 0,
+    issues_reported INTEGER NOT NULL DEFAULT 0,
+    comments_posted INTEGER NOT NULL DEFAULT 0,
+    posts_created INTEGER NOT NULL DEFAULT 0,
+    events_created INTEGER NOT NULL DEFAULT 0,
+    groups_created INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow all on user_stats" ON user_stats FOR ALL USING (true);
+
+-- Add delta to one counter, creating the row on first use
+CREATE OR REPLACE FUNCTION bump_user_stat(uid TEXT, stat TEXT, delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF uid IS NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format(
+        'INSERT INTO user_stats (user_id, %1$I) VALUES ($1, GREATEST($2, 0))
+         ON CONFLICT (user_id) DO UPDATE
+         SET %1$I = GREATEST(user_stats.%1$I + $2, 0), updated_at = NOW()',
+        stat
+    ) USING uid, delta;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Generic row-count trigger: TG_ARGV[0] = user column, TG_ARGV[1] = stat
+CREATE OR REPLACE FUNCTION update_user_stat()
+RETURNS TRIGGER AS $$
+DECLARE
+    user_column TEXT := TG_ARGV[0];
+    stat TEXT := TG_ARGV[1];
+    old_uid TEXT;
+    new_uid TEXT;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('SELECT ($1).%I::text', user_column) INTO old_uid USING OLD;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('SELECT ($1).%I::text', user_column) INTO new_uid USING NEW;
+    END IF;
+    IF old_uid IS DISTINCT FROM new_uid THEN
+        PERFORM bump_user_stat(old_uid, stat, -1);
+        PERFORM bump_user_stat(new_uid, stat, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- events_attended only counts RSVPs with status = 'going'
+CREATE OR REPLACE FUNCTION update_user_events_attended()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'going' THEN
+        PERFORM bump_user_stat(OLD.user_id, 'events_attended', -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'going' THEN
+        PERFORM bump_user_stat(NEW.user_id, 'events_attended', 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_stats_events_attended ON event_rsvps;
+CREATE TRIGGER user_stats_events_attended AFTER INSERT OR UPDATE OF status, user_id OR DELETE ON event_rsvps
+    FOR EACH ROW EXECUTE FUNCTION update_user_events_attended();
+
+DROP TRIGGER IF EXISTS user_stats_groups_joined ON group_members;
+CREATE TRIGGER user_stats_groups_joined AFTER INSERT OR DELETE ON group_members
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('user_id', 'groups_joined');
+
+DROP TRIGGER IF EXISTS user_stats_issues_reported ON issues;
+CREATE TRIGGER user_stats_issues_reported AFTER INSERT OR UPDATE OF reporter_id OR DELETE ON issues
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('reporter_id', 'issues_reported');
+
+DROP TRIGGER IF EXISTS user_stats_event_comments ON event_comments;
+CREATE TRIGGER user_stats_event_comments AFTER INSERT OR DELETE ON event_comments
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('user_id', 'comments_posted');
+
+DROP TRIGGER IF EXISTS user_stats_group_post_comments ON group_post_comments;
+CREATE TRIGGER user_stats_group_post_comments AFTER INSERT OR DELETE ON group_post_comments
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('user_id', 'comments_posted');
+
+DROP TRIGGER IF EXISTS user_stats_posts_created ON group_posts;
+CREATE TRIGGER user_stats_posts_created AFTER INSERT OR DELETE ON group_posts
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('user_id', 'posts_created');
+
+DROP TRIGGER IF EXISTS user_stats_events_created ON events;
+CREATE TRIGGER user_stats_events_created AFTER INSERT OR UPDATE OF organizer_id OR DELETE ON events
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('organizer_id', 'events_created');
+
+DROP TRIGGER IF EXISTS user_stats_groups_created ON groups;
+CREATE TRIGGER user_stats_groups_created AFTER INSERT OR UPDATE OF creator_id OR DELETE ON groups
+    FOR EACH ROW EXECUTE FUNCTION update_user_stat('creator_id', 'groups_created');
+
+-- Recompute every user's counters from the source tables
+CREATE OR REPLACE FUNCTION backfill_user_stats()
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO user_stats (
+        user_id, events_attended, groups_joined, issues_reported,
+        comments_posted, posts_created, events_created, groups_created, updated_at
+    )
+    SELECT u.id,
+           (SELECT COUNT(*) FROM event_rsvps r WHERE r.user_id = u.id AND r.status = 'going'),
+           (SELECT COUNT(*) FROM group_members m WHERE m.user_id = u.id),
+           (SELECT COUNT(*) FROM issues i WHERE i.reporter_id = u.id),
+           (SELECT COUNT(*) FROM event_comments c WHERE c.user_id = u.id) +
+           (SELECT COUNT(*) FROM group_post_comments c WHERE c.user_id = u.id),
+           (SELECT COUNT(*) FROM group_posts p WHERE p.user_id = u.id),
+           (SELECT COUNT(*) FROM events e WHERE e.organizer_id = u.id),
+           (SELECT COUNT(*) FROM groups g WHERE g.creator_id = u.id),
+           NOW()
+    FROM users u
+    ON CONFLICT (user_id) DO UPDATE SET
+        events_attended = EXCLUDED.events_attended,
+        groups_joined = EXCLUDED.groups_joined,
+        issues_reported = EXCLUDED.issues_reported,
+        comments_posted = EXCLUDED.comments_posted,
+        posts_created = EXCLUDED.posts_created,
+        events_created = EXCLUDED.events_created,
+        groups_created = EXCLUDED.groups_created,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT backfill_user_stats();
+
+-- Stats, badges and recent activity for a profile page in one call
+CREATE OR REPLACE FUNCTION get_profile_bundle(uid TEXT, activity_limit INTEGER DEFAULT 10)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'stats', json_build_object(
+            'events_attended', COALESCE(s.events_attended, 0),
+            'groups_joined', COALESCE(s.groups_joined, 0),
+            'issues_reported', COALESCE(s.issues_reported, 0),
+            'comments_posted', COALESCE(s.comments_posted, 0),
+            'posts_created', COALESCE(s.posts_created, 0),
+            'events_created', COALESCE(s.events_created, 0),
+            'groups_created', COALESCE(s.groups_created, 0),
+            'reputation_points', COALESCE(u.reputation_points, 0)
+        ),
+        'badges', COALESCE((
+            SELECT json_agg(b ORDER BY b.earned_at DESC)
+            FROM user_badges b WHERE b.user_id = uid
+        ), '[]'::json),
+        'activity', COALESCE((
+            SELECT json_agg(a)
+            FROM (
+                SELECT * FROM user_activity
+                WHERE user_id = uid
+                ORDER BY created_at DESC
+                LIMIT activity_limit
+            ) a
+        ), '[]'::json)
+    )
+    FROM users u
+    LEFT JOIN user_stats s ON s.user_id = u.id
+    WHERE u.id = uid;
+$$ LANGUAGE sql STABLE;
@@ -21,7 +21,7 @@ def create_app(config_name='default'):
     login_manager.login_message_category = 'info'
     
     # Import and register blueprints
-    from app.routes import main, auth, events, groups, issues, chat, profile
+    from app.routes import main, auth, events, groups, issues, chat, profile, media
     
     app.register_blueprint(main.bp)
     app.register_blueprint(auth.bp)
@@ -30,12 +30,49 @@ def create_app(config_name='default'):
     app.register_blueprint(issues.bp)
     app.register_blueprint(chat.bp)
     app.register_blueprint(profile.bp)
+    app.register_blueprint(media.bp)
+    
+    # Supabase call accounting per request, and its debug listing
+    from app.utils import instrumentation
+    instrumentation.init_app(app)
+    if app.config['DEBUG_REQUESTS_ENDPOINT']:
+        from app.routes import debug
+        app.register_blueprint(debug.bp)
+    
+    # Prometheus metrics on /metrics
+    from app.utils import metrics
+    if metrics.enabled() and app.config['METRICS_ENABLED']:
+        from app.models import user_cache
+        from app.routes import metrics as metrics_routes
+        metrics.init_app(app)
+        metrics.watch_cache('user', user_cache)
+        from app.utils.token_verifier import get_verifier
+        metrics.watch_cache('firebase_token', get_verifier().cache)
+        app.register_blueprint(metrics_routes.bp)
+    
+    # Register background tasks and, unless dedicated workers run them
+    # (worker.py), process the queue on a thread in this process
+    from app import tasks
+    from app.utils.task_queue import start_worker_thread
+    if app.config['TASK_WORKER_IN_PROCESS']:
+        start_worker_thread(app)
     
     # User loader for Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.get_by_id(user_id)
+        from app.models import User, user_cache
+        if app.config['SESSION_USER_SNAPSHOT']:
+            user = User.from_session_snapshot(user_id)
+            if user is not None:
+                return user
+            # Re-snapshot from the database, not the user cache, so a write
+            # made in another process is stale for at most one max age
+            user = User.get_by_id(user_id)
+            if user is not None:
+                user_cache.set(user_id, user)
+                user.save_session_snapshot()
+            return user
+        return User.get_cached(user_id)
     
     # Context processor for Firebase config
     @app.context_processor
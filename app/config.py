@@ -20,15 +20,93 @@ class Config:
     FIREBASE_MEASUREMENT_ID = os.getenv('FIREBASE_MEASUREMENT_ID')
     FIREBASE_ADMIN_SDK_PATH = os.getenv('FIREBASE_ADMIN_SDK_PATH')
     
+    # ID token verification (app/utils/token_verifier.py)
+    FIREBASE_TOKEN_CACHE_SIZE = int(os.getenv('FIREBASE_TOKEN_CACHE_SIZE', 4096))
+    FIREBASE_TOKEN_CACHE_TTL = int(os.getenv('FIREBASE_TOKEN_CACHE_TTL', 300))  # seconds, capped by exp
+    # JSON {key id: PEM} to verify against instead of fetching Google's keys
+    FIREBASE_KEYSET_PATH = os.getenv('FIREBASE_KEYSET_PATH')
+    
     # Supabase Configuration
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
     SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
     
+    # HTTP connection pools per Supabase client (app/utils/supabase_pool.py);
+    # size the pool to at least the threads per worker plus FANOUT_MAX_WORKERS
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', 32))
+    SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', 60))  # seconds idle
+    SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'True') == 'True'  # needs the h2 package
+    SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', 3))  # seconds
+    SUPABASE_POOL_TIMEOUT = float(os.getenv('SUPABASE_POOL_TIMEOUT', 2))  # waiting for a free connection
+    SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', 10))  # selects
+    SUPABASE_WRITE_TIMEOUT = float(os.getenv('SUPABASE_WRITE_TIMEOUT', 15))  # insert/update/delete
+    SUPABASE_RPC_TIMEOUT = float(os.getenv('SUPABASE_RPC_TIMEOUT', 15))
+    SUPABASE_STORAGE_TIMEOUT = float(os.getenv('SUPABASE_STORAGE_TIMEOUT', 60))
+    
+    # Data backend (app/utils/local_db.py): supabase, or memory/sqlite for an
+    # offline in-process stand-in; pair the local ones with STORAGE_BACKEND=local
+    DATA_BACKEND = os.getenv('DATA_BACKEND', 'supabase')
+    LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', 'instance/local_db.sqlite3')
+    
+    # Per-request Supabase call accounting (app/utils/instrumentation.py)
+    LOG_REQUEST_SUMMARY = os.getenv('LOG_REQUEST_SUMMARY', 'True') == 'True'
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 3))  # same query shape per request
+    REQUEST_LOG_SIZE = int(os.getenv('REQUEST_LOG_SIZE', 200))  # recent requests kept for /_debug/requests
+    # Serve /_debug/requests; it exposes full paths and query shapes, so it
+    # is off by default and production only serves it behind a token
+    DEBUG_REQUESTS_ENDPOINT = os.getenv('DEBUG_REQUESTS_ENDPOINT', 'False') == 'True'
+    DEBUG_REQUESTS_TOKEN = os.getenv('DEBUG_REQUESTS_TOKEN', '')  # require "Authorization: Bearer <token>" if set
+    
+    # Prometheus /metrics (app/utils/metrics.py, needs prometheus_client);
+    # it exposes route names, queue depth and pool stats, so it is off by
+    # default and production only serves it behind METRICS_TOKEN
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+    # Shared directory for multi-process servers (gunicorn); empty wipe before each start
+    PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # require "Authorization: Bearer <token>" if set
+    
+    # User cache for the Flask-Login user loader
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # seconds
+    # Keep the fields templates need in the signed session cookie so most
+    # requests skip the user lookup. Invalidation is process-local: other
+    # gunicorn workers and worker.py keep serving a snapshot for up to
+    # SESSION_SNAPSHOT_MAX_AGE after a profile write, so keep it short
+    SESSION_USER_SNAPSHOT = os.getenv('SESSION_USER_SNAPSHOT', 'False') == 'True'
+    SESSION_SNAPSHOT_MAX_AGE = int(os.getenv('SESSION_SNAPSHOT_MAX_AGE', 30))  # seconds
+    
+    # Concurrent fan-out of independent Supabase calls (app/utils/concurrency.py)
+    FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', 16))
+    FANOUT_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', 5))  # seconds per call
+    
+    # Background task queue (app/utils/task_queue.py)
+    TASK_QUEUE_BACKEND = os.getenv('TASK_QUEUE_BACKEND', 'sqlite')  # sqlite or postgres
+    TASK_QUEUE_SQLITE_PATH = os.getenv('TASK_QUEUE_SQLITE_PATH', 'instance/tasks.db')
+    TASK_WORKER_IN_PROCESS = os.getenv('TASK_WORKER_IN_PROCESS', 'True') == 'True'
+    TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', 5))
+    TASK_RETRY_BASE_DELAY = float(os.getenv('TASK_RETRY_BASE_DELAY', 2))  # seconds
+    TASK_RETRY_MAX_DELAY = float(os.getenv('TASK_RETRY_MAX_DELAY', 300))  # seconds
+    TASK_LOCK_TIMEOUT = int(os.getenv('TASK_LOCK_TIMEOUT', 300))  # reclaim stuck jobs after
+    TASK_BATCH_SIZE = int(os.getenv('TASK_BATCH_SIZE', 10))
+    TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', 1))  # seconds
+    
     # Upload Configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    IMAGE_OUTPUT_FORMAT = os.getenv('IMAGE_OUTPUT_FORMAT', 'WEBP').upper()  # WEBP or JPEG
+    
+    # Media storage backend (app/utils/storage_backends.py)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase')  # supabase or local
+    # File uploads to Supabase at or above this size are streamed from disk
+    # through the resumable (TUS) endpoint instead of read into one request
+    # body; keep it at or below the in-memory upload spool (1MB)
+    SUPABASE_RESUMABLE_THRESHOLD = int(os.getenv('SUPABASE_RESUMABLE_THRESHOLD', 1024 * 1024))  # bytes
+    LOCAL_STORAGE_ROOT = os.getenv('LOCAL_STORAGE_ROOT', 'instance/storage')
+    # When nginx fronts the app, hand /media files to it via X-Accel-Redirect
+    # to this internal location (e.g. /protected-media); empty serves directly
+    STORAGE_ACCEL_REDIRECT_PREFIX = os.getenv('STORAGE_ACCEL_REDIRECT_PREFIX', '')
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'False') == 'True'  # Apache/lighttpd
     
     @staticmethod
     def get_firebase_config():
@@ -52,6 +130,8 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    DEBUG_REQUESTS_ENDPOINT = Config.DEBUG_REQUESTS_ENDPOINT and bool(Config.DEBUG_REQUESTS_TOKEN)
+    METRICS_ENABLED = Config.METRICS_ENABLED and bool(Config.METRICS_TOKEN)
 
 config = {
     'development': DevelopmentConfig,
@@ -1,8 +1,37 @@
+from flask import g, has_request_context, session
 from flask_login import UserMixin
 from app.utils.supabase_client import supabase
+from app.utils.cache import TTLCache
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.geo import haversine_km, bounding_box
+from app.tasks import log_activity, check_badges
+from app.config import Config
 from datetime import datetime
+import time
 import uuid
 
+# Process-local cache of User objects for the Flask-Login user loader
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+
+# Signed session snapshot of the fields every page needs, so the user
+# loader can skip the lookup (Config.SESSION_USER_SNAPSHOT). Bump
+# SESSION_SNAPSHOT_FORMAT when the fields change to discard old cookies.
+SESSION_SNAPSHOT_KEY = '_user_snapshot'
+SESSION_SNAPSHOT_FORMAT = 1
+SESSION_SNAPSHOT_FIELDS = ('email', 'name', 'profile_picture', 'reputation_points', 'user_type', 'verified')
+
+# user id -> time of the last profile write seen by this process; older
+# snapshots are refreshed. Entries only matter for one snapshot max age.
+# Other processes don't see these, so a write made elsewhere shows up once
+# the snapshot expires (SESSION_SNAPSHOT_MAX_AGE), not immediately.
+snapshot_invalidations = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.SESSION_SNAPSHOT_MAX_AGE)
+
+# Counters kept in the user_stats table (see add_user_stats.sql)
+USER_STAT_KEYS = (
+    'events_attended', 'groups_joined', 'issues_reported', 'comments_posted',
+    'posts_created', 'events_created', 'groups_created'
+)
+
 class User(UserMixin):
     """User model for Flask-Login"""
     
@@ -23,53 +52,102 @@ class User(UserMixin):
         self.bio = bio
         self.cover_photo = cover_photo
     
+    @staticmethod
+    def from_row(user_data):
+        """Build a User from a row of the users table"""
+        return User(
+            id=user_data['id'],
+            email=user_data.get('email'),
+            name=user_data.get('name'),
+            profile_picture=user_data.get('profile_picture'),
+            location=user_data.get('location'),
+            interests=user_data.get('interests'),
+            reputation_points=user_data.get('reputation_points', 0),
+            user_type=user_data.get('user_type', 'citizen'),
+            verified=user_data.get('verified', False),
+            phone_number=user_data.get('phone_number'),
+            bio=user_data.get('bio'),
+            cover_photo=user_data.get('cover_photo')
+        )
+    
     @staticmethod
     def get_by_id(user_id):
         """Get user by ID from Supabase"""
         try:
             response = supabase.table('users').select('*').eq('id', user_id).execute()
             if response.data and len(response.data) > 0:
-                user_data = response.data[0]
-                return User(
-                    id=user_data['id'],
-                    email=user_data.get('email'),
-                    name=user_data.get('name'),
-                    profile_picture=user_data.get('profile_picture'),
-                    location=user_data.get('location'),
-                    interests=user_data.get('interests'),
-                    reputation_points=user_data.get('reputation_points', 0),
-                    user_type=user_data.get('user_type', 'citizen'),
-                    verified=user_data.get('verified', False),
-                    phone_number=user_data.get('phone_number'),
-                    bio=user_data.get('bio'),
-                    cover_photo=user_data.get('cover_photo')
-                )
+                return User.from_row(response.data[0])
             return None
         except Exception as e:
             print(f"Error fetching user: {e}")
             return None
     
+    @staticmethod
+    def get_cached(user_id):
+        """Get user by ID, served from the process-local user cache when fresh"""
+        user = user_cache.get(user_id)
+        if user is None:
+            user = User.get_by_id(user_id)
+            if user:
+                user_cache.set(user_id, user)
+        return user
+    
+    @staticmethod
+    def invalidate_cache(user_id):
+        """Drop a user from the user cache and session snapshots after a write"""
+        user_cache.invalidate(user_id)
+        snapshot_invalidations.set(user_id, time.time())
+        if has_request_context():
+            snapshot = session.get(SESSION_SNAPSHOT_KEY)
+            if snapshot and snapshot.get('id') == user_id:
+                session.pop(SESSION_SNAPSHOT_KEY)
+    
+    def save_session_snapshot(self):
+        """Store this user's template fields in the (signed) session cookie"""
+        session[SESSION_SNAPSHOT_KEY] = {
+            'v': SESSION_SNAPSHOT_FORMAT,
+            'id': self.id,
+            'at': time.time(),
+            'f': {field: getattr(self, field) for field in SESSION_SNAPSHOT_FIELDS}
+        }
+    
+    @staticmethod
+    def from_session_snapshot(user_id):
+        """SessionUser from a fresh session snapshot, or None"""
+        snapshot = session.get(SESSION_SNAPSHOT_KEY)
+        if not snapshot or snapshot.get('v') != SESSION_SNAPSHOT_FORMAT or snapshot.get('id') != user_id:
+            return None
+        taken_at = snapshot.get('at', 0)
+        if time.time() - taken_at > Config.SESSION_SNAPSHOT_MAX_AGE:
+            return None
+        invalidated_at = snapshot_invalidations.get(user_id)
+        if invalidated_at is not None and taken_at <= invalidated_at:
+            return None
+        return SessionUser(user_id, snapshot['f'])
+    
+    @staticmethod
+    def get_many(user_ids):
+        """Get many users by ID in a single query
+
+        Returns a dict mapping user id to User. Unknown ids are left out.
+        """
+        user_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        if not user_ids:
+            return {}
+        try:
+            response = supabase.table('users').select('*').in_('id', user_ids).execute()
+            return {row['id']: User.from_row(row) for row in response.data or []}
+        except Exception as e:
+            print(f"Error fetching users: {e}")
+            return {}
+    
     @staticmethod
     def get_by_email(email):
         """Get user by email from Supabase"""
         try:
             response = supabase.table('users').select('*').eq('email', email).execute()
             if response.data and len(response.data) > 0:
-                user_data = response.data[0]
-                return User(
-                    id=user_data['id'],
-                    email=user_data.get('email'),
-                    name=user_data.get('name'),
-                    profile_picture=user_data.get('profile_picture'),
-                    location=user_data.get('location'),
-                    interests=user_data.get('interests'),
-                    reputation_points=user_data.get('reputation_points', 0),
-                    user_type=user_data.get('user_type', 'citizen'),
-                    verified=user_data.get('verified', False),
-                    phone_number=user_data.get('phone_number'),
-                    bio=user_data.get('bio'),
-                    cover_photo=user_data.get('cover_photo')
-                )
+                return User.from_row(response.data[0])
             return None
         except Exception as e:
             print(f"Error fetching user by email: {e}")
@@ -95,22 +173,12 @@ class User(UserMixin):
             }
             response = supabase.table('users').insert(user_data).execute()
             if response.data:
-                # Create activity log entry
-                activity_data = {
-                    'user_id': firebase_uid,
-                    'activity_type': 'joined',
-                    'description': f'{name} joined the community',
-                    'created_at': datetime.utcnow().isoformat()
-                }
-                supabase.table('user_activity').insert(activity_data).execute()
-                
-                # Award first badge
-                badge_data = {
-                    'user_id': firebase_uid,
-                    'badge_type': 'first_steps',
-                    'earned_at': datetime.utcnow().isoformat()
-                }
-                supabase.table('user_badges').insert(badge_data).execute()
+                # Create activity log entry and award first badge
+                log_activity.delay(
+                    firebase_uid, 'joined', f'{name} joined the community',
+                    created_at=datetime.utcnow().isoformat()
+                )
+                check_badges.delay(firebase_uid, 'signup')
                 
                 return User.get_by_id(firebase_uid)
             return None
@@ -127,6 +195,8 @@ class User(UserMixin):
                 for key, value in kwargs.items():
                     if hasattr(self, key):
                         setattr(self, key, value)
+                get_user_loader().clear(self.id)
+                User.invalidate_cache(self.id)
                 return True
             return False
         except Exception as e:
@@ -134,44 +204,46 @@ class User(UserMixin):
             return False
     
     def get_stats(self):
-        """Get user statistics"""
+        """Get user statistics from the trigger-maintained user_stats row"""
+        stats = {key: 0 for key in USER_STAT_KEYS}
+        stats['reputation_points'] = self.reputation_points
         try:
-            # Count events attended (RSVPs)
-            events_response = supabase.table('event_rsvps')\
-                .select('id', count='exact')\
+            response = supabase.table('user_stats')\
+                .select(', '.join(USER_STAT_KEYS))\
                 .eq('user_id', self.id)\
-                .eq('status', 'going')\
                 .execute()
-            events_count = events_response.count or 0
-            
-            # Count groups joined
-            groups_response = supabase.table('group_members')\
-                .select('id', count='exact')\
-                .eq('user_id', self.id)\
-                .execute()
-            groups_count = groups_response.count or 0
-            
-            # Count issues reported
-            issues_response = supabase.table('issues')\
-                .select('id', count='exact')\
-                .eq('reporter_id', self.id)\
-                .execute()
-            issues_count = issues_response.count or 0
-            
-            return {
-                'events_attended': events_count,
-                'groups_joined': groups_count,
-                'issues_reported': issues_count,
-                'reputation_points': self.reputation_points
-            }
+            if response.data:
+                for key in USER_STAT_KEYS:
+                    stats[key] = response.data[0].get(key) or 0
         except Exception as e:
             print(f"Error getting user stats: {e}")
-            return {
-                'events_attended': 0,
-                'groups_joined': 0,
-                'issues_reported': 0,
-                'reputation_points': self.reputation_points
-            }
+        return stats
+    
+    def get_profile_bundle(self, activity_limit=10):
+        """Get stats, badges and recent activity in a single RPC
+        
+        Falls back to the individual queries if the get_profile_bundle
+        function has not been installed (see add_user_stats.sql).
+        """
+        try:
+            response = supabase.rpc('get_profile_bundle', {
+                'uid': self.id,
+                'activity_limit': activity_limit
+            }).execute()
+            if response.data:
+                bundle = response.data
+                return {
+                    'stats': bundle.get('stats') or {},
+                    'badges': bundle.get('badges') or [],
+                    'activity': bundle.get('activity') or []
+                }
+        except Exception as e:
+            print(f"Error fetching profile bundle: {e}")
+        return {
+            'stats': self.get_stats(),
+            'badges': self.get_badges(),
+            'activity': self.get_activity(activity_limit)
+        }
     
     def get_badges(self):
         """Get user's earned badges"""
@@ -200,6 +272,127 @@ class User(UserMixin):
             print(f"Error fetching activity: {e}")
             return []
 
+class SessionUser(User):
+    """User rebuilt from a session snapshot without a database lookup
+    
+    Only SESSION_SNAPSHOT_FIELDS are carried; reading any other attribute
+    (bio, interests, ...) loads the full user once.
+    """
+    
+    def __init__(self, id, fields):
+        self.id = id
+        for field in SESSION_SNAPSHOT_FIELDS:
+            setattr(self, field, fields.get(field))
+        self.display_name = self.name
+    
+    def __getattr__(self, name):
+        # Only called for attributes the snapshot doesn't have
+        if name.startswith('_'):
+            raise AttributeError(name)
+        full = User.get_cached(self.id)
+        if full is None:
+            raise AttributeError(name)
+        for key, value in vars(full).items():
+            self.__dict__.setdefault(key, value)
+        return getattr(full, name)
+
+class UserLoader:
+    """Request-scoped batching loader for User lookups
+
+    Call prime() with every user id a view is about to need, then load()
+    each one. All primed ids are fetched with a single query the first time
+    any of them is loaded, and every result (including misses) is memoized
+    for the rest of the request.
+    """
+    
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+    
+    def prime(self, user_ids):
+        """Queue user ids to be fetched in the next batch"""
+        for user_id in user_ids:
+            if user_id and user_id not in self._cache:
+                self._pending.add(user_id)
+        return self
+    
+    def _dispatch(self):
+        """Fetch every pending user id in one query"""
+        if not self._pending:
+            return
+        pending, self._pending = list(self._pending), set()
+        users = User.get_many(pending)
+        for user_id in pending:
+            self._cache[user_id] = users.get(user_id)
+    
+    def load(self, user_id):
+        """Get a single user, batching it with any other pending ids"""
+        if not user_id:
+            return None
+        if user_id not in self._cache:
+            self._pending.add(user_id)
+            self._dispatch()
+        return self._cache.get(user_id)
+    
+    def load_many(self, user_ids):
+        """Get a dict of id -> User for the given ids"""
+        self.prime(user_ids)
+        self._dispatch()
+        return {user_id: self._cache[user_id] for user_id in user_ids
+                if self._cache.get(user_id)}
+    
+    def clear(self, user_id=None):
+        """Forget a memoized user (or all of them) after a write"""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+
+def get_user_loader():
+    """Get the UserLoader for the current request, stored on flask.g"""
+    if not has_request_context():
+        return UserLoader()
+    if 'user_loader' not in g:
+        g.user_loader = UserLoader()
+    return g.user_loader
+
+
+def _fetch_nearby(table, rpc_name, row_key, lat, lng, radius_km, limit):
+    """Get [(row, distance_km)] within radius_km of a point, nearest first
+    
+    Uses the PostGIS-backed RPC from add_geo_indexes.sql. If that is not
+    available (e.g. a database without PostGIS), falls back to a
+    bounding-box query on latitude/longitude filtered by haversine distance.
+    """
+    try:
+        response = supabase.rpc(rpc_name, {
+            'lat': lat,
+            'lng': lng,
+            'radius_km': radius_km,
+            'result_limit': limit
+        }).execute()
+        return [(row[row_key], row['distance_km']) for row in response.data or []]
+    except Exception as e:
+        print(f"Error running {rpc_name}, falling back to bounding box: {e}")
+    
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    response = supabase.table(table)\
+        .select('*')\
+        .gte('latitude', min_lat)\
+        .lte('latitude', max_lat)\
+        .gte('longitude', min_lng)\
+        .lte('longitude', max_lng)\
+        .execute()
+    
+    results = []
+    for row in response.data or []:
+        distance = haversine_km(lat, lng, float(row['latitude']), float(row['longitude']))
+        if distance <= radius_km:
+            results.append((row, distance))
+    results.sort(key=lambda item: item[1])
+    return results[:limit]
+
 
 class Event:
     """Event model"""
@@ -207,7 +400,7 @@ class Event:
     def __init__(self, id, organizer_id, title, description, category, 
                  date_time, location, latitude=None, longitude=None, 
                  max_participants=None, image_url=None, created_at=None, 
-                 updated_at=None):
+                 updated_at=None, going_count=0, thumbnail_url=None):
         self.id = id
         self.organizer_id = organizer_id
         self.title = title
@@ -226,13 +419,15 @@ class Event:
         self.longitude = longitude
         self.max_participants = max_participants
         self.image_url = image_url
+        self.thumbnail_url = thumbnail_url
         self.created_at = created_at
         self.updated_at = updated_at
+        self.going_count = going_count or 0  # Maintained by trigger
     
     @staticmethod
     def create(organizer_id, title, description, category, date_time, 
                location, latitude=None, longitude=None, max_participants=None, 
-               image_url=None):
+               image_url=None, thumbnail_url=None):
         """Create new event"""
         try:
             event_data = {
@@ -245,7 +440,8 @@ class Event:
                 'latitude': latitude,
                 'longitude': longitude,
                 'max_participants': max_participants,
-                'image_url': image_url
+                'image_url': image_url,
+                'thumbnail_url': thumbnail_url
             }
             response = supabase.table('events').insert(event_data).execute()
             if response.data:
@@ -293,6 +489,130 @@ class Event:
             print(f"Error fetching events: {e}")
             return []
     
+    @staticmethod
+    def get_page(filters=None, limit=20, cursor=None):
+        """Get one page of upcoming-first events with keyset pagination
+        
+        Events are ordered by (date_time, id), so every page costs the same
+        index range scan no matter how deep it is. Returns
+        (events, next_cursor); next_cursor is None on the last page.
+        """
+        try:
+            query = supabase.table('events').select('*')
+            
+            if filters:
+                if 'category' in filters:
+                    query = query.eq('category', filters['category'])
+                if 'organizer_id' in filters:
+                    query = query.eq('organizer_id', filters['organizer_id'])
+            
+            after = decode_cursor(cursor, 'timestamp', 'uuid')
+            if after:
+                after_date_time, after_id = after
+                query = query.or_(
+                    f'date_time.gt."{after_date_time}",'
+                    f'and(date_time.eq."{after_date_time}",id.gt.{after_id})'
+                )
+            
+            # Fetch one extra row to know whether there is another page
+            response = query.order('date_time', desc=False)\
+                .order('id', desc=False)\
+                .limit(limit + 1)\
+                .execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]['date_time'], rows[-1]['id'])
+            
+            return [Event(**data) for data in rows], next_cursor
+        except Exception as e:
+            print(f"Error fetching events page: {e}")
+            return [], None
+    
+    @staticmethod
+    def search(q, category=None, limit=20, cursor=None):
+        """Full-text search over event titles and descriptions
+        
+        Results are ranked by relevance (search_events RPC, backed by a GIN
+        index). Returns (events, next_cursor); pass next_cursor back as
+        `cursor` for the next page. next_cursor is None on the last page.
+        """
+        try:
+            params = {
+                'q': q,
+                'filter_category': category,
+                'result_limit': limit + 1
+            }
+            after = decode_cursor(cursor, 'number', 'uuid')
+            if after:
+                params['after_rank'], params['after_id'] = after
+            
+            response = supabase.rpc('search_events', params).execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]['rank'], rows[-1]['event']['id'])
+            
+            return [Event(**row['event']) for row in rows], next_cursor
+        except Exception as e:
+            print(f"Error searching events: {e}")
+            return [], None
+    
+    @staticmethod
+    def get_for_user(user_id):
+        """Get the events on a user's My Events page in a constant number of queries
+        
+        The user's RSVPs and saved events each come back in one query with
+        their event embedded via PostgREST, plus one query for the events
+        the user organizes, so no list of ids ever goes into a URL.
+        Attendee counts come along as going_count on each row.
+        
+        Returns a dict with 'organized', 'going', 'interested' and 'saved'
+        lists of Event, each ordered by date_time.
+        """
+        rsvp_response = supabase.table('event_rsvps')\
+            .select('status, event:events(*)')\
+            .eq('user_id', user_id)\
+            .execute()
+        
+        saved_response = supabase.table('saved_events')\
+            .select('event:events(*)')\
+            .eq('user_id', user_id)\
+            .execute()
+        
+        organized_response = supabase.table('events')\
+            .select('*')\
+            .eq('organizer_id', user_id)\
+            .order('date_time', desc=False)\
+            .execute()
+        
+        def by_date(rows):
+            events = [row['event'] for row in rows if row.get('event')]
+            events.sort(key=lambda data: data.get('date_time') or '')
+            return [Event(**data) for data in events]
+        
+        rsvps = rsvp_response.data or []
+        return {
+            'organized': [Event(**data) for data in organized_response.data or []],
+            'going': by_date([r for r in rsvps if r['status'] == 'going']),
+            'interested': by_date([r for r in rsvps if r['status'] == 'interested']),
+            'saved': by_date(saved_response.data or [])
+        }
+    
+    @staticmethod
+    def nearby(lat, lng, radius_km=10, limit=20):
+        """Get events within radius_km of a point as [(event, distance_km)], nearest first"""
+        try:
+            rows = _fetch_nearby('events', 'nearby_events', 'event', lat, lng, radius_km, limit)
+            return [(Event(**row), distance) for row, distance in rows]
+        except Exception as e:
+            print(f"Error fetching nearby events: {e}")
+            return []
+    
     def get_attendees(self):
         """Get list of attendees"""
         try:
@@ -307,43 +627,44 @@ class Event:
             return []
     
     def get_attendee_count(self):
-        """Get count of attendees"""
+        """Get count of attendees (fresh read of the going_count column)"""
         try:
-            response = supabase.table('event_rsvps')\
-                .select('*', count='exact')\
-                .eq('event_id', str(self.id))\
-                .eq('status', 'going')\
+            response = supabase.table('events')\
+                .select('going_count')\
+                .eq('id', str(self.id))\
                 .execute()
             
-            if hasattr(response, 'count') and response.count is not None:
-                return response.count
-            elif response.data:
-                return len(response.data)
-            return 0
+            if response.data:
+                self.going_count = response.data[0].get('going_count') or 0
+            return self.going_count
         except Exception as e:
             print(f"Error counting attendees: {e}")
             import traceback
             traceback.print_exc()
-            return 0
+            return self.going_count
 
 
 class Group:
     """Group model"""
     
     def __init__(self, id, creator_id, name, description, category, 
-                 image_url=None, is_private=False, created_at=None, updated_at=None):
+                 image_url=None, is_private=False, created_at=None, updated_at=None,
+                 member_count=0, thumbnail_url=None):
         self.id = id
         self.creator_id = creator_id
         self.name = name
         self.description = description
         self.category = category
         self.image_url = image_url
+        self.thumbnail_url = thumbnail_url
         self.is_private = is_private
         self.created_at = created_at
         self.updated_at = updated_at
+        self.member_count = member_count or 0  # Maintained by trigger
     
     @staticmethod
-    def create(creator_id, name, description, category, image_url=None, is_private=False):
+    def create(creator_id, name, description, category, image_url=None, is_private=False,
+               thumbnail_url=None):
         """Create new group"""
         try:
             group_data = {
@@ -352,6 +673,7 @@ class Group:
                 'description': description,
                 'category': category,
                 'image_url': image_url,
+                'thumbnail_url': thumbnail_url,
                 'is_private': is_private
             }
             response = supabase.table('groups').insert(group_data).execute()
@@ -408,17 +730,109 @@ class Group:
             print(f"Error fetching groups: {e}")
             return []
     
-    def get_member_count(self):
-        """Get count of members"""
+    @staticmethod
+    def get_page(filters=None, limit=20, cursor=None):
+        """Get one page of newest-first groups with keyset pagination
+        
+        Groups are ordered by (created_at, id) descending, so every page
+        costs the same index range scan no matter how deep it is. Returns
+        (groups, next_cursor); next_cursor is None on the last page.
+        """
+        try:
+            query = supabase.table('groups').select('*')
+            
+            if filters:
+                if 'category' in filters:
+                    query = query.eq('category', filters['category'])
+                if 'creator_id' in filters:
+                    query = query.eq('creator_id', filters['creator_id'])
+            
+            after = decode_cursor(cursor, 'timestamp', 'uuid')
+            if after:
+                after_created_at, after_id = after
+                query = query.or_(
+                    f'created_at.lt."{after_created_at}",'
+                    f'and(created_at.eq."{after_created_at}",id.lt.{after_id})'
+                )
+            
+            # Fetch one extra row to know whether there is another page
+            response = query.order('created_at', desc=True)\
+                .order('id', desc=True)\
+                .limit(limit + 1)\
+                .execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+            
+            return [Group(**data) for data in rows], next_cursor
+        except Exception as e:
+            print(f"Error fetching groups page: {e}")
+            return [], None
+    
+    @staticmethod
+    def get_member_group_ids(user_id, group_ids):
+        """Get the subset of group_ids the user belongs to, in one query"""
+        group_ids = [str(group_id) for group_id in group_ids]
+        if not user_id or not group_ids:
+            return set()
         try:
             response = supabase.table('group_members')\
-                .select('id', count='exact')\
-                .eq('group_id', self.id)\
+                .select('group_id')\
+                .eq('user_id', user_id)\
+                .in_('group_id', group_ids)\
+                .execute()
+            return {str(m['group_id']) for m in response.data or []}
+        except Exception as e:
+            print(f"Error checking memberships: {e}")
+            return set()
+    
+    @staticmethod
+    def search(q, category=None, limit=20, cursor=None):
+        """Full-text search over group names and descriptions
+        
+        Results are ranked by relevance (search_groups RPC, backed by a GIN
+        index). Returns (groups, next_cursor); pass next_cursor back as
+        `cursor` for the next page. next_cursor is None on the last page.
+        """
+        try:
+            params = {
+                'q': q,
+                'filter_category': category,
+                'result_limit': limit + 1
+            }
+            after = decode_cursor(cursor, 'number', 'uuid')
+            if after:
+                params['after_rank'], params['after_id'] = after
+            
+            response = supabase.rpc('search_groups', params).execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]['rank'], rows[-1]['group']['id'])
+            
+            return [Group(**row['group']) for row in rows], next_cursor
+        except Exception as e:
+            print(f"Error searching groups: {e}")
+            return [], None
+    
+    def get_member_count(self):
+        """Get count of members (fresh read of the member_count column)"""
+        try:
+            response = supabase.table('groups')\
+                .select('member_count')\
+                .eq('id', self.id)\
                 .execute()
-            return response.count or 0
+            if response.data:
+                self.member_count = response.data[0].get('member_count') or 0
+            return self.member_count
         except Exception as e:
             print(f"Error counting members: {e}")
-            return 0
+            return self.member_count
     
     def get_members(self, limit=50):
         """Get group members with user details"""
@@ -434,6 +848,77 @@ class Group:
             print(f"Error fetching members: {e}")
             return []
     
+    def get_feed(self, user_id=None, limit=20, cursor=None):
+        """Get a page of posts with author, like/comment counts and like state
+        
+        Posts and their like/comment counter columns come back in one query,
+        with the author embedded via PostgREST; a second query marks the
+        posts liked by user_id.
+        Posts are ordered by (created_at, id) descending and keyset-paginated:
+        pass the returned cursor back as `cursor` for the next (older) page.
+        
+        Returns (posts, next_cursor). next_cursor is None on the last page.
+        """
+        try:
+            query = supabase.table('group_posts')\
+                .select('id, content, image_url, created_at, user_id, '
+                        'like_count, comment_count, '
+                        'author:users(id, name, profile_picture)')\
+                .eq('group_id', self.id)
+            
+            after = decode_cursor(cursor, 'timestamp', 'uuid')
+            if after:
+                after_created_at, after_id = after
+                query = query.or_(
+                    f'created_at.lt."{after_created_at}",'
+                    f'and(created_at.eq."{after_created_at}",id.lt.{after_id})'
+                )
+            
+            # Fetch one extra row to know whether there is another page
+            response = query.order('created_at', desc=True)\
+                .order('id', desc=True)\
+                .limit(limit + 1)\
+                .execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+            
+            # Which of these posts has the user liked
+            liked_ids = set()
+            if user_id and rows:
+                likes_response = supabase.table('group_post_likes')\
+                    .select('post_id')\
+                    .eq('user_id', user_id)\
+                    .in_('post_id', [row['id'] for row in rows])\
+                    .execute()
+                liked_ids = {like['post_id'] for like in likes_response.data or []}
+            
+            posts = []
+            for row in rows:
+                author = row.get('author')
+                posts.append({
+                    'id': row['id'],
+                    'content': row['content'],
+                    'image_url': row.get('image_url'),
+                    'created_at': row['created_at'],
+                    'user': {
+                        'id': author['id'],
+                        'name': author['name'],
+                        'profile_picture': author.get('profile_picture')
+                    } if author else None,
+                    'like_count': row.get('like_count') or 0,
+                    'comment_count': row.get('comment_count') or 0,
+                    'liked_by_user': row['id'] in liked_ids
+                })
+            
+            return posts, next_cursor
+        except Exception as e:
+            print(f"Error fetching group feed: {e}")
+            return [], None
+    
     def is_member(self, user_id):
         """Check if user is a member"""
         try:
@@ -491,7 +976,7 @@ class Group:
         """Update group details"""
         try:
             update_data = {}
-            allowed_fields = ['name', 'description', 'category', 'image_url', 'is_private']
+            allowed_fields = ['name', 'description', 'category', 'image_url', 'thumbnail_url', 'is_private']
             
             for key, value in kwargs.items():
                 if key in allowed_fields and value is not None:
@@ -560,14 +1045,12 @@ class Issue:
                 issue_id = response.data[0]['id']
                 
                 # Log activity
-                activity_data = {
-                    'user_id': reporter_id,
-                    'activity_type': 'issue_reported',
-                    'entity_type': 'issue',
-                    'entity_id': issue_id,
-                    'description': f'Reported issue: {title}'
-                }
-                supabase.table('user_activity').insert(activity_data).execute()
+                log_activity.delay(
+                    reporter_id, 'issue_reported', f'Reported issue: {title}',
+                    entity_type='issue', entity_id=issue_id,
+                    created_at=datetime.utcnow().isoformat()
+                )
+                check_badges.delay(reporter_id, 'issue_report')
                 
                 return Issue.get_by_id(issue_id)
             return None
@@ -610,6 +1093,16 @@ class Issue:
             print(f"Error fetching issues: {e}")
             return []
     
+    @staticmethod
+    def nearby(lat, lng, radius_km=10, limit=20):
+        """Get issues within radius_km of a point as [(issue, distance_km)], nearest first"""
+        try:
+            rows = _fetch_nearby('issues', 'nearby_issues', 'issue', lat, lng, radius_km, limit)
+            return [(Issue(**row), distance) for row, distance in rows]
+        except Exception as e:
+            print(f"Error fetching nearby issues: {e}")
+            return []
+    
     def update_status(self, new_status, user_id):
         """Update issue status"""
         try:
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
 from flask_login import login_user, logout_user, current_user
 from app.utils.firebase_client import verify_firebase_token
-from app.models import User
+from app.models import User, SESSION_SNAPSHOT_KEY
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -107,4 +107,5 @@ def verify_token():
 def logout():
     """Logout user"""
     logout_user()
+    session.pop(SESSION_SNAPSHOT_KEY, None)
     return redirect(url_for('main.landing'))
@@ -0,0 +1,33 @@
+import hmac
+from flask import Blueprint, abort, jsonify, request
+from app.config import Config
+from app.utils.instrumentation import recent_requests
+
+# Only registered when Config.DEBUG_REQUESTS_ENDPOINT is on
+bp = Blueprint('debug', __name__, url_prefix='/_debug')
+
+@bp.route('/requests')
+def list_requests():
+    """Slowest recent requests with their Supabase calls
+    
+    Query params: limit (default 20), order=slowest|recent, endpoint
+    """
+    if Config.DEBUG_REQUESTS_TOKEN:
+        expected = f"Bearer {Config.DEBUG_REQUESTS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            abort(401)
+    
+    limit = request.args.get('limit', 20, type=int)
+    slowest = request.args.get('order', 'slowest') != 'recent'
+    endpoint = request.args.get('endpoint')
+    
+    entries = recent_requests(slowest=slowest)
+    # Don't list the listing itself
+    entries = [entry for entry in entries if entry['endpoint'] != 'debug.list_requests']
+    if endpoint:
+        entries = [entry for entry in entries if entry['endpoint'] == endpoint]
+    
+    return jsonify({
+        'requests': entries[:limit],
+        'n_plus_one': sum(1 for entry in entries if entry['n_plus_one'])
+    })
@@ -1,13 +1,42 @@
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify, flash
 from flask_login import current_user, login_required
-from app.models import Event, User
+from app.models import Event, get_user_loader
 from app.utils.supabase_client import supabase
-from app.utils.storage_helper import upload_to_storage, delete_from_storage
+from app.utils.storage_helper import upload_image
+from app.utils.concurrency import fan_out
+from app.tasks import log_activity, check_badges, delete_file
 from datetime import datetime
 import uuid
 
 bp = Blueprint('events', __name__, url_prefix='/events')
 
+EVENTS_PAGE_SIZE = 20
+
+def fetch_events_page(category=None, search=None, cursor=None):
+    """Get one page of discover results as (events, next_cursor)"""
+    if search:
+        # Ranked full-text search in the database
+        return Event.search(search, category=category, limit=EVENTS_PAGE_SIZE, cursor=cursor)
+    
+    filters = {}
+    if category:
+        filters['category'] = category
+    return Event.get_page(filters=filters, limit=EVENTS_PAGE_SIZE, cursor=cursor)
+
+def event_card(event):
+    """Fields shown on an event card"""
+    return {
+        'id': str(event.id),
+        'title': event.title,
+        'description': event.description,
+        'category': event.category,
+        'date_time': event.date_time,
+        'location': event.location,
+        'image_url': event.image_url,
+        'thumbnail_url': event.thumbnail_url,
+        'attendee_count': event.going_count
+    }
+
 @bp.route('/')
 @login_required
 def list_events():
@@ -16,130 +45,89 @@ def list_events():
     category = request.args.get('category')
     search = request.args.get('search')
     
-    # Build filters
-    filters = {}
-    if category:
-        filters['category'] = category
-    
-    # Fetch events from database
-    events = Event.get_all(filters=filters, limit=50)
-    
-    # Search filter (client-side for now, can move to DB later)
-    if search:
-        search_lower = search.lower()
-        events = [e for e in events if search_lower in e.title.lower() or search_lower in e.description.lower()]
-    
-    # Get attendee counts for each event
-    events_with_counts = []
-    for event in events:
-        event_dict = {
-            'id': str(event.id),
-            'title': event.title,
-            'description': event.description,
-            'category': event.category,
-            'date_time': event.date_time,
-            'location': event.location,
-            'image_url': event.image_url,
-            'attendee_count': event.get_attendee_count()
-        }
-        events_with_counts.append(event_dict)
+    # Fetch the first page; later pages come from /events/api/list
+    events, next_cursor = fetch_events_page(category=category, search=search)
     
-    return render_template('events/discover.html', events=events_with_counts, selected_category=category)
+    return render_template('events/discover.html',
+                         events=[event_card(event) for event in events],
+                         next_cursor=next_cursor,
+                         selected_category=category,
+                         search=search)
 
-@bp.route('/my-events')
+@bp.route('/api/list')
 @login_required
-def my_events():
-    """List events user is attending or interested in"""
+def api_list_events():
+    """Get the next page of discover results as JSON"""
     try:
-        # Get events created by user (organized events)
-        organized_response = supabase.table('events')\
-            .select('*')\
-            .eq('organizer_id', current_user.id)\
-            .order('date_time', desc=False)\
-            .execute()
-        
-        organized_events = []
-        if organized_response.data:
-            for event_data in organized_response.data:
-                event = Event(**event_data)
-                organized_events.append({
-                    'id': str(event.id),
-                    'title': event.title,
-                    'description': event.description,
-                    'category': event.category,
-                    'date_time': event.date_time,
-                    'location': event.location,
-                    'image_url': event.image_url,
-                    'attendee_count': event.get_attendee_count()
-                })
-        
-        # Get all RSVPs for current user
-        rsvp_response = supabase.table('event_rsvps')\
-            .select('event_id, status')\
-            .eq('user_id', current_user.id)\
-            .execute()
-        
-        # Separate events by status
-        going_event_ids = []
-        interested_event_ids = []
+        events, next_cursor = fetch_events_page(
+            category=request.args.get('category'),
+            search=request.args.get('search'),
+            cursor=request.args.get('cursor')
+        )
         
-        if rsvp_response.data:
-            going_event_ids = [r['event_id'] for r in rsvp_response.data if r['status'] == 'going']
-            interested_event_ids = [r['event_id'] for r in rsvp_response.data if r['status'] == 'interested']
+        cards = []
+        for event in events:
+            card = event_card(event)
+            card['date_time'] = event.date_time.isoformat() if event.date_time else None
+            cards.append(card)
         
-        # Get saved events
-        saved_response = supabase.table('saved_events')\
-            .select('event_id')\
-            .eq('user_id', current_user.id)\
-            .execute()
+        return jsonify({
+            'success': True,
+            'events': cards,
+            'next_cursor': next_cursor
+        })
         
-        saved_event_ids = [s['event_id'] for s in saved_response.data] if saved_response.data else []
-        
-        # Fetch event details
-        going_events = []
-        for event_id in going_event_ids:
-            event = Event.get_by_id(event_id)
-            if event:
-                going_events.append({
-                    'id': str(event.id),
-                    'title': event.title,
-                    'description': event.description,
-                    'category': event.category,
-                    'date_time': event.date_time,
-                    'location': event.location,
-                    'image_url': event.image_url,
-                    'attendee_count': event.get_attendee_count()
-                })
+    except Exception as e:
+        print(f"Error listing events: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/nearby')
+@login_required
+def api_nearby_events():
+    """Get events near a point as JSON, nearest first"""
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({'success': False, 'error': 'Valid lat and lng are required'}), 400
+        
+        radius_km = min(max(request.args.get('radius_km', 10, type=float), 0.1), 100)
+        limit = min(max(request.args.get('limit', EVENTS_PAGE_SIZE, type=int), 1), 100)
+        
+        events = []
+        for event, distance_km in Event.nearby(lat, lng, radius_km=radius_km, limit=limit):
+            card = event_card(event)
+            card['date_time'] = event.date_time.isoformat() if event.date_time else None
+            card['latitude'] = event.latitude
+            card['longitude'] = event.longitude
+            card['distance_km'] = round(distance_km, 2)
+            events.append(card)
+        
+        return jsonify({
+            'success': True,
+            'events': events
+        })
         
-        interested_events = []
-        for event_id in interested_event_ids:
-            event = Event.get_by_id(event_id)
-            if event:
-                interested_events.append({
-                    'id': str(event.id),
-                    'title': event.title,
-                    'description': event.description,
-                    'category': event.category,
-                    'date_time': event.date_time,
-                    'location': event.location,
-                    'image_url': event.image_url,
-                    'attendee_count': event.get_attendee_count()
-                })
+    except Exception as e:
+        print(f"Error fetching nearby events: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/my-events')
+@login_required
+def my_events():
+    """List events user is attending or interested in"""
+    try:
+        # Organized, going, interested and saved events in three queries total
+        my = Event.get_for_user(current_user.id)
         
-        saved_events = []
-        for event_id in saved_event_ids:
-            event = Event.get_by_id(event_id)
-            if event:
-                saved_events.append({
-                    'id': str(event.id),
-                    'title': event.title,
-                    'description': event.description,
-                    'category': event.category,
-                    'date_time': event.date_time,
-                    'location': event.location,
-                    'image_url': event.image_url,
-                    'attendee_count': event.get_attendee_count()
-                })
+        organized_events = [event_card(event) for event in my['organized']]
+        going_events = [event_card(event) for event in my['going']]
+        interested_events = [event_card(event) for event in my['interested']]
+        saved_events = [event_card(event) for event in my['saved']]
         
         return render_template('events/my_events.html', 
                              organized_events=organized_events,
@@ -180,13 +168,17 @@ def create_event():
         
         # Handle image upload
         image_url = None
+        thumbnail_url = None
         print(f"DEBUG: request.files = {request.files}")
         if 'image' in request.files:
             file = request.files['image']
             print(f"DEBUG: file = {file}, filename = {file.filename if file else 'None'}")
             if file and file.filename:
                 print(f"DEBUG: Uploading to storage, bucket='events', folder='{current_user.id}'")
-                image_url = upload_to_storage(file, 'events', folder=str(current_user.id))
+                uploaded = upload_image(file, 'events', folder=str(current_user.id))
+                if uploaded:
+                    image_url = uploaded['url']
+                    thumbnail_url = uploaded['thumbnail_url']
                 print(f"DEBUG: Image uploaded successfully: {image_url}")
             else:
                 print("DEBUG: No file selected or empty filename")
@@ -211,10 +203,12 @@ def create_event():
             latitude=float(latitude) if latitude else None,
             longitude=float(longitude) if longitude else None,
             max_participants=int(max_participants) if max_participants else None,
-            image_url=image_url
+            image_url=image_url,
+            thumbnail_url=thumbnail_url
         )
         
         if event:
+            check_badges.delay(current_user.id, 'event_create')
             print(f"DEBUG: Event created successfully!")
             print(f"DEBUG: Event ID: {event.id}")
             print(f"DEBUG: Event image_url: {event.image_url}")
@@ -241,14 +235,55 @@ def event_detail(event_id):
     if not event:
         return "Event not found", 404
     
-    # Get organizer info
-    organizer = User.get_by_id(event.organizer_id)
+    users = get_user_loader()
+    user_id = current_user.id
+    
+    def fetch_comments():
+        response = supabase.table('event_comments')\
+            .select('*')\
+            .eq('event_id', event_id)\
+            .order('created_at', desc=True)\
+            .limit(20)\
+            .execute()
+        return response.data or []
+    
+    def fetch_user_rsvp():
+        response = supabase.table('event_rsvps')\
+            .select('status')\
+            .eq('event_id', event_id)\
+            .eq('user_id', user_id)\
+            .execute()
+        return response.data[0]['status'] if response.data else None
+    
+    def fetch_similar():
+        # Same category, not this event
+        all_events = Event.get_all(filters={'category': event.category}, limit=10)
+        return [e for e in all_events if str(e.id) != str(event_id)][:3]
+    
+    # Attendees, comments, the user's RSVP and similar events are
+    # independent, so fetch them concurrently
+    results = fan_out({
+        'attendees': lambda: event.get_attendees()[:10],  # Show first 10
+        'comments': fetch_comments,
+        'user_rsvp': fetch_user_rsvp,
+        'similar': fetch_similar
+    }, defaults={'attendees': [], 'comments': [], 'similar': []})
+    
+    attendees_data = results['attendees']
+    comments_data = results['comments']
+    user_rsvp = results['user_rsvp']
+    similar = results['similar']
+    
+    # Fetch organizer, attendees and comment authors in one query
+    users.prime([event.organizer_id])
+    users.prime([a['user_id'] for a in attendees_data])
+    users.prime([c['user_id'] for c in comments_data])
+    
+    organizer = users.load(event.organizer_id)
     
-    # Get attendees
-    attendees_data = event.get_attendees()
     attendees = []
-    for attendee_data in attendees_data[:10]:  # Show first 10
-        user = User.get_by_id(attendee_data['user_id'])
+    for attendee_data in attendees_data:
+        user = users.load(attendee_data['user_id'])
         if user:
             attendees.append({
                 'id': user.id,
@@ -256,61 +291,27 @@ def event_detail(event_id):
                 'profile_picture': user.profile_picture
             })
     
-    # Check if current user has RSVP'd
-    user_rsvp = None
-    try:
-        rsvp_response = supabase.table('event_rsvps')\
-            .select('status')\
-            .eq('event_id', event_id)\
-            .eq('user_id', current_user.id)\
-            .execute()
-        if rsvp_response.data and len(rsvp_response.data) > 0:
-            user_rsvp = rsvp_response.data[0]['status']
-    except Exception as e:
-        print(f"Error checking RSVP: {e}")
-    
-    # Get comments
     comments = []
-    try:
-        comments_response = supabase.table('event_comments')\
-            .select('*')\
-            .eq('event_id', event_id)\
-            .order('created_at', desc=True)\
-            .limit(20)\
-            .execute()
-        
-        if comments_response.data:
-            for comment_data in comments_response.data:
-                user = User.get_by_id(comment_data['user_id'])
-                if user:
-                    from datetime import datetime
-                    created_at = datetime.fromisoformat(comment_data['created_at'].replace('Z', '+00:00'))
-                    comments.append({
-                        'id': comment_data['id'],
-                        'content': comment_data['content'],
-                        'user_name': user.name,
-                        'user_picture': user.profile_picture,
-                        'created_at': created_at
-                    })
-    except Exception as e:
-        print(f"Error fetching comments: {e}")
+    for comment_data in comments_data:
+        user = users.load(comment_data['user_id'])
+        if user:
+            created_at = datetime.fromisoformat(comment_data['created_at'].replace('Z', '+00:00'))
+            comments.append({
+                'id': comment_data['id'],
+                'content': comment_data['content'],
+                'user_name': user.name,
+                'user_picture': user.profile_picture,
+                'created_at': created_at
+            })
     
-    # Get similar events (same category, not this event)
-    similar_events = []
-    try:
-        all_events = Event.get_all(filters={'category': event.category}, limit=10)
-        for similar_event in all_events:
-            if str(similar_event.id) != str(event_id):
-                similar_events.append({
-                    'id': str(similar_event.id),
-                    'title': similar_event.title,
-                    'date_time': similar_event.date_time,
-                    'image_url': similar_event.image_url
-                })
-                if len(similar_events) >= 3:
-                    break
-    except Exception as e:
-        print(f"Error fetching similar events: {e}")
+    similar_events = [{
+        'id': str(similar_event.id),
+        'title': similar_event.title,
+        'date_time': similar_event.date_time,
+        'image_url': similar_event.image_url,
+        'thumbnail_url': similar_event.thumbnail_url,
+        'attendee_count': similar_event.going_count
+    } for similar_event in similar]
     
     event_data = {
         'id': str(event.id),
@@ -329,7 +330,7 @@ def event_detail(event_id):
             'name': organizer.name,
             'profile_picture': organizer.profile_picture
         } if organizer else None,
-        'attendee_count': event.get_attendee_count(),
+        'attendee_count': event.going_count,
         'attendees': attendees,
         'user_rsvp': user_rsvp,
         'comments': comments,
@@ -384,16 +385,16 @@ def rsvp_event(event_id):
             
             # Log activity
             if status == 'going':
-                activity_data = {
-                    'user_id': current_user.id,
-                    'activity_type': 'event_rsvp',
-                    'entity_type': 'event',
-                    'entity_id': event_id,
-                    'description': f'RSVPed to {event.title}'
-                }
-                supabase.table('user_activity').insert(activity_data).execute()
+                log_activity.delay(
+                    current_user.id, 'event_rsvp', f'RSVPed to {event.title}',
+                    entity_type='event', entity_id=event_id,
+                    created_at=datetime.utcnow().isoformat()
+                )
         
         if result.data:
+            if status == 'going':
+                check_badges.delay(current_user.id, 'rsvp')
+            
             # Get updated attendee count
             attendee_count = event.get_attendee_count()
             return jsonify({
@@ -435,6 +436,7 @@ def post_comment(event_id):
         result = supabase.table('event_comments').insert(comment_data).execute()
         
         if result.data:
+            check_badges.delay(current_user.id, 'comment')
             return jsonify({
                 'success': True,
                 'comment': {
@@ -555,13 +557,16 @@ def edit_event(event_id):
         
         # Handle image upload
         image_url = event.image_url  # Keep existing image
+        thumbnail_url = event.thumbnail_url
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
-                # Delete old image if exists
+                # Delete old image (and its thumbnail) if exists
                 if event.image_url:
-                    delete_from_storage(event.image_url, 'events')
-                image_url = upload_to_storage(file, 'events', folder=str(current_user.id))
+                    delete_file.delay(event.image_url, 'events')
+                uploaded = upload_image(file, 'events', folder=str(current_user.id))
+                image_url = uploaded['url'] if uploaded else None
+                thumbnail_url = uploaded['thumbnail_url'] if uploaded else None
         
         # Convert date_time string to ISO format
         if date_time:
@@ -578,7 +583,8 @@ def edit_event(event_id):
             'latitude': float(latitude) if latitude else None,
             'longitude': float(longitude) if longitude else None,
             'max_participants': int(max_participants) if max_participants else None,
-            'image_url': image_url
+            'image_url': image_url,
+            'thumbnail_url': thumbnail_url
         }
         
         result = supabase.table('events').update(update_data).eq('id', event_id).execute()
@@ -613,7 +619,7 @@ def delete_event(event_id):
         
         # Delete image from storage if exists
         if event.image_url:
-            delete_from_storage(event.image_url, 'events')
+            delete_file.delay(event.image_url, 'events')
         
         # Delete event from database (cascade will handle RSVPs, comments, etc.)
         result = supabase.table('events').delete().eq('id', event_id).execute()
@@ -1,11 +1,41 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
 from flask_login import current_user, login_required
-from app.models import Group, User
+from app.models import Group, get_user_loader
 from app.utils.supabase_client import supabase
-from app.utils.storage_helper import upload_to_storage, delete_from_storage
+from app.utils.storage_helper import upload_to_storage, upload_image
+from app.tasks import check_badges, delete_file
 
 bp = Blueprint('groups', __name__, url_prefix='/groups')
 
+GROUPS_PAGE_SIZE = 20
+POSTS_PAGE_SIZE = 20
+
+def fetch_groups_page(category=None, search=None, cursor=None):
+    """Get one page of discover results as (groups, next_cursor)"""
+    if search:
+        # Ranked full-text search in the database
+        return Group.search(search, category=category, limit=GROUPS_PAGE_SIZE, cursor=cursor)
+    
+    filters = {}
+    if category:
+        filters['category'] = category
+    return Group.get_page(filters=filters, limit=GROUPS_PAGE_SIZE, cursor=cursor)
+
+def group_cards(groups):
+    """Fields shown on group cards, with membership checked in one query"""
+    member_ids = Group.get_member_group_ids(current_user.id, [group.id for group in groups])
+    return [{
+        'id': str(group.id),
+        'name': group.name,
+        'description': group.description,
+        'category': group.category,
+        'image_url': group.image_url,
+        'thumbnail_url': group.thumbnail_url,
+        'is_private': group.is_private,
+        'member_count': group.member_count,
+        'is_member': str(group.id) in member_ids
+    } for group in groups]
+
 @bp.route('/')
 @login_required
 def list_groups():
@@ -16,10 +46,7 @@ def list_groups():
         search = request.args.get('search')
         my_groups = request.args.get('my_groups') == 'true'
         
-        # Build filters
-        filters = {}
-        if category:
-            filters['category'] = category
+        next_cursor = None
         
         # Fetch groups
         if my_groups:
@@ -38,29 +65,20 @@ def list_groups():
                         groups.append(group)
             else:
                 groups = []
+            
+            # Search within the user's own groups (already a small set)
+            if search and groups:
+                search_lower = search.lower()
+                groups = [g for g in groups if search_lower in g.name.lower() or search_lower in (g.description or '').lower()]
         else:
-            groups = Group.get_all(filters=filters)
-        
-        # Search filter
-        if search and groups:
-            search_lower = search.lower()
-            groups = [g for g in groups if search_lower in g.name.lower() or search_lower in g.description.lower()]
-        
-        # Convert to dict with member counts
-        groups_with_counts = []
-        for group in groups:
-            groups_with_counts.append({
-                'id': str(group.id),
-                'name': group.name,
-                'description': group.description,
-                'category': group.category,
-                'image_url': group.image_url,
-                'is_private': group.is_private,
-                'member_count': group.get_member_count(),
-                'is_member': group.is_member(current_user.id)
-            })
+            # Fetch the first page; later pages come from /groups/api/list
+            groups, next_cursor = fetch_groups_page(category=category, search=search)
         
-        return render_template('groups/discover.html', groups=groups_with_counts, selected_category=category)
+        return render_template('groups/discover.html',
+                             groups=group_cards(groups),
+                             next_cursor=next_cursor,
+                             selected_category=category,
+                             search=search)
         
     except Exception as e:
         print(f"Error fetching groups: {e}")
@@ -68,6 +86,29 @@ def list_groups():
         traceback.print_exc()
         return render_template('groups/discover.html', groups=[])
 
+@bp.route('/api/list')
+@login_required
+def api_list_groups():
+    """Get the next page of discover results as JSON"""
+    try:
+        groups, next_cursor = fetch_groups_page(
+            category=request.args.get('category'),
+            search=request.args.get('search'),
+            cursor=request.args.get('cursor')
+        )
+        
+        return jsonify({
+            'success': True,
+            'groups': group_cards(groups),
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        print(f"Error listing groups: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @bp.route('/<group_id>')
 @login_required
 def group_detail(group_id):
@@ -79,14 +120,20 @@ def group_detail(group_id):
             flash('Group not found', 'error')
             return redirect(url_for('groups.list_groups'))
         
-        # Get creator info
-        creator = User.get_by_id(group.creator_id)
+        users = get_user_loader()
         
         # Get members with user details
         members_data = group.get_members(limit=20)
+        
+        # Fetch creator and members in one query
+        users.prime([group.creator_id])
+        users.prime([m['user_id'] for m in members_data])
+        
+        creator = users.load(group.creator_id)
+        
         members = []
         for member_data in members_data:
-            user = User.get_by_id(member_data['user_id'])
+            user = users.load(member_data['user_id'])
             if user:
                 members.append({
                     'id': user.id,
@@ -100,61 +147,11 @@ def group_detail(group_id):
         is_member = group.is_member(current_user.id)
         user_role = group.get_user_role(current_user.id) if is_member else None
         
-        # Get group posts with user details, likes, and comments
-        posts = []
-        try:
-            posts_response = supabase.table('group_posts')\
-                .select('*')\
-                .eq('group_id', group_id)\
-                .order('created_at', desc=True)\
-                .execute()
-            
-            if posts_response.data:
-                for post_data in posts_response.data:
-                    # Get post author
-                    author = User.get_by_id(post_data['user_id'])
-                    
-                    # Get like count
-                    likes_response = supabase.table('group_post_likes')\
-                        .select('id', count='exact')\
-                        .eq('post_id', post_data['id'])\
-                        .execute()
-                    like_count = likes_response.count if hasattr(likes_response, 'count') else 0
-                    
-                    # Check if current user liked
-                    user_liked = False
-                    if is_member:
-                        user_like = supabase.table('group_post_likes')\
-                            .select('id')\
-                            .eq('post_id', post_data['id'])\
-                            .eq('user_id', current_user.id)\
-                            .execute()
-                        user_liked = len(user_like.data) > 0
-                    
-                    # Get comment count
-                    comments_response = supabase.table('group_post_comments')\
-                        .select('id', count='exact')\
-                        .eq('post_id', post_data['id'])\
-                        .execute()
-                    comment_count = comments_response.count if hasattr(comments_response, 'count') else 0
-                    
-                    posts.append({
-                        'id': post_data['id'],
-                        'content': post_data['content'],
-                        'image_url': post_data.get('image_url'),
-                        'created_at': post_data['created_at'],
-                        'user': {
-                            'id': author.id,
-                            'name': author.name,
-                            'profile_picture': author.profile_picture
-                        } if author else None,
-                        'like_count': like_count,
-                        'comment_count': comment_count,
-                        'liked_by_user': user_liked
-                    })
-        except Exception as e:
-            print(f"Error fetching posts: {e}")
-            posts = []
+        # Get the first page of posts with authors, likes and comments
+        posts, next_cursor = group.get_feed(
+            user_id=current_user.id if is_member else None,
+            limit=POSTS_PAGE_SIZE
+        )
         
         group_data = {
             'id': str(group.id),
@@ -170,11 +167,12 @@ def group_detail(group_id):
                 'name': creator.name,
                 'profile_picture': creator.profile_picture
             } if creator else None,
-            'member_count': group.get_member_count(),
+            'member_count': group.member_count,
             'members': members,
             'is_member': is_member,
             'user_role': user_role,
-            'posts': posts
+            'posts': posts,
+            'next_cursor': next_cursor
         }
         
         return render_template('groups/detail.html', group=group_data)
@@ -210,10 +208,14 @@ def create_group():
         
         # Handle image upload
         image_url = None
+        thumbnail_url = None
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
-                image_url = upload_to_storage(file, 'groups', folder=str(current_user.id))
+                uploaded = upload_image(file, 'groups', folder=str(current_user.id))
+                if uploaded:
+                    image_url = uploaded['url']
+                    thumbnail_url = uploaded['thumbnail_url']
         
         # Create group
         group = Group.create(
@@ -222,10 +224,14 @@ def create_group():
             description=description,
             category=category,
             image_url=image_url,
-            is_private=is_private
+            is_private=is_private,
+            thumbnail_url=thumbnail_url
         )
         
         if group:
+            # Group.create also makes the creator a member
+            check_badges.delay(current_user.id, 'group_create')
+            check_badges.delay(current_user.id, 'group_join')
             flash('Group created successfully!', 'success')
             return redirect(url_for('groups.group_detail', group_id=group.id))
         else:
@@ -297,18 +303,22 @@ def edit_group(group_id):
         
         # Handle image upload
         image_url = group.image_url  # Keep existing image
+        thumbnail_url = group.thumbnail_url
         
         if delete_image and group.image_url:
-            delete_from_storage(group.image_url, 'groups')
+            delete_file.delay(group.image_url, 'groups')
             image_url = None
+            thumbnail_url = None
         
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
-                # Delete old image if exists
+                # Delete old image (and its thumbnail) if exists
                 if group.image_url:
-                    delete_from_storage(group.image_url, 'groups')
-                image_url = upload_to_storage(file, 'groups', folder=str(current_user.id))
+                    delete_file.delay(group.image_url, 'groups')
+                uploaded = upload_image(file, 'groups', folder=str(current_user.id))
+                image_url = uploaded['url'] if uploaded else None
+                thumbnail_url = uploaded['thumbnail_url'] if uploaded else None
         
         # Update group
         success = group.update(
@@ -316,6 +326,7 @@ def edit_group(group_id):
             description=description,
             category=category,
             image_url=image_url,
+            thumbnail_url=thumbnail_url,
             is_private=is_private
         )
         
@@ -351,7 +362,7 @@ def delete_group(group_id):
         
         # Delete image from storage if exists
         if group.image_url:
-            delete_from_storage(group.image_url, 'groups')
+            delete_file.delay(group.image_url, 'groups')
         
         # Delete group (cascade will handle members)
         if group.delete():
@@ -384,6 +395,7 @@ def join_group(group_id):
         
         # Add member
         if group.add_member(current_user.id):
+            check_badges.delay(current_user.id, 'group_join')
             return jsonify({
                 'success': True,
                 'member_count': group.get_member_count()
@@ -431,6 +443,34 @@ def leave_group(group_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@bp.route('/api/<group_id>/posts', methods=['GET'])
+@login_required
+def list_posts(group_id):
+    """Get the next page of posts in a group"""
+    try:
+        group = Group.get_by_id(group_id)
+        
+        if not group:
+            return jsonify({'success': False, 'error': 'Group not found'}), 404
+        
+        is_member = group.is_member(current_user.id)
+        posts, next_cursor = group.get_feed(
+            user_id=current_user.id if is_member else None,
+            limit=POSTS_PAGE_SIZE,
+            cursor=request.args.get('cursor')
+        )
+        
+        return jsonify({
+            'success': True,
+            'posts': posts,
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        print(f"Error listing posts: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @bp.route('/api/<group_id>/posts', methods=['POST'])
 @login_required
 def create_post(group_id):
@@ -474,6 +514,7 @@ def create_post(group_id):
         response = supabase.table('group_posts').insert(post_data).execute()
         
         if response.data:
+            check_badges.delay(current_user.id, 'post')
             post = response.data[0]
             return jsonify({
                 'success': True,
@@ -530,13 +571,13 @@ def like_post(group_id, post_id):
             }).execute()
             liked = True
         
-        # Get like count
-        like_count_response = supabase.table('group_post_likes')\
-            .select('id', count='exact')\
-            .eq('post_id', post_id)\
+        # Get like count (kept current by trigger)
+        like_count_response = supabase.table('group_posts')\
+            .select('like_count')\
+            .eq('id', post_id)\
             .execute()
         
-        like_count = like_count_response.count if hasattr(like_count_response, 'count') else 0
+        like_count = like_count_response.data[0]['like_count'] if like_count_response.data else 0
         
         return jsonify({
             'success': True,
@@ -560,9 +601,12 @@ def get_comments(group_id, post_id):
             .order('created_at', desc=False)\
             .execute()
         
+        users = get_user_loader()
+        users.prime([comment['user_id'] for comment in response.data or []])
+        
         comments = []
-        for comment in response.data:
-            user = User.get_by_id(comment['user_id'])
+        for comment in response.data or []:
+            user = users.load(comment['user_id'])
             if user:
                 comments.append({
                     'id': comment['id'],
@@ -605,6 +649,7 @@ def add_comment(group_id, post_id):
         response = supabase.table('group_post_comments').insert(comment_data).execute()
         
         if response.data:
+            check_badges.delay(current_user.id, 'comment')
             comment = response.data[0]
             return jsonify({
                 'success': True,
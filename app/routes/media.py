@@ -0,0 +1,45 @@
+from flask import Blueprint, abort, send_file, Response
+from app.config import Config
+from app.utils.storage_backends import get_storage, LocalStorage
+
+bp = Blueprint('media', __name__, url_prefix='/media')
+
+# Stored paths are content hashes, so a URL's bytes never change
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@bp.route('/<bucket_name>/<path:path>')
+def serve_media(bucket_name, path):
+    """Serve an object from the local storage backend"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        abort(404)
+    
+    try:
+        stat = storage.stat(bucket_name, path)
+    except ValueError:
+        abort(404)
+    if stat is None:
+        abort(404)
+    
+    if Config.STORAGE_ACCEL_REDIRECT_PREFIX:
+        # nginx streams the file itself (sendfile) from an internal location
+        # mapped onto LOCAL_STORAGE_ROOT
+        response = Response(mimetype=stat['content_type'])
+        response.headers['X-Accel-Redirect'] = \
+            f"{Config.STORAGE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{bucket_name}/{path}"
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+    
+    # send_file hands the open file to the server's wsgi.file_wrapper (sendfile
+    # under gunicorn) or emits X-Sendfile when USE_X_SENDFILE is set
+    response = send_file(
+        storage.local_path(bucket_name, path),
+        mimetype=stat['content_type'],
+        conditional=True,
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,18 @@
+import hmac
+from flask import Blueprint, Response, abort, request
+from app.config import Config
+from app.utils.metrics import render
+
+# Only registered when prometheus_client is installed and METRICS_ENABLED
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def export_metrics():
+    """Prometheus scrape endpoint"""
+    if Config.METRICS_TOKEN:
+        expected = f"Bearer {Config.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            abort(401)
+    
+    body, content_type = render()
+    return Response(body, content_type=content_type)
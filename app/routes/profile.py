@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify
 from flask_login import login_required, current_user
-from app.utils.storage_helper import upload_to_storage, delete_from_storage
+from app.utils.storage_helper import upload_to_storage
+from app.tasks import delete_file
 from app.utils.supabase_client import supabase
 from app.models import User
 
@@ -13,15 +14,13 @@ def view_profile():
     if not current_user.is_authenticated:
         return redirect(url_for('auth.login'))
     
-    # Get real user stats from database
-    stats = current_user.get_stats()
-    badges = current_user.get_badges()
-    activity = current_user.get_activity(limit=10)
+    # Get stats, badges and activity in one round trip
+    results = current_user.get_profile_bundle(activity_limit=10)
     
     return render_template('profile/view.html', 
-                         stats=stats, 
-                         badges=badges, 
-                         activity=activity)
+                         stats=results['stats'], 
+                         badges=results['badges'], 
+                         activity=results['activity'])
 
 @bp.route('/<user_id>')
 @login_required
@@ -36,16 +35,14 @@ def view_user_profile(user_id):
     if not user:
         return "User not found", 404
     
-    # Get user stats
-    stats = user.get_stats()
-    badges = user.get_badges()
-    activity = user.get_activity(limit=10)
+    # Get stats, badges and activity in one round trip
+    results = user.get_profile_bundle(activity_limit=10)
     
     return render_template('profile/view.html', 
                          user=user,
-                         stats=stats, 
-                         badges=badges, 
-                         activity=activity,
+                         stats=results['stats'], 
+                         badges=results['badges'], 
+                         activity=results['activity'],
                          is_own_profile=False)
 
 @bp.route('/edit')
@@ -88,6 +85,7 @@ def update_profile():
             for key, value in update_data.items():
                 if hasattr(current_user, key):
                     setattr(current_user, key, value)
+            User.invalidate_cache(current_user.id)
             
             return jsonify({'success': True, 'message': 'Profile updated successfully'})
         else:
@@ -119,7 +117,7 @@ def upload_avatar():
         
         # Delete old avatar if exists
         if current_user.profile_picture:
-            delete_from_storage(current_user.profile_picture, 'avatars')
+            delete_file.delay(current_user.profile_picture, 'avatars')
         
         # Update user record in database
         result = supabase.table('users').update({
@@ -129,6 +127,7 @@ def upload_avatar():
         if result.data:
             # Update current_user object
             current_user.profile_picture = public_url
+            User.invalidate_cache(current_user.id)
             return jsonify({
                 'success': True,
                 'url': public_url,
@@ -163,7 +162,7 @@ def upload_cover():
         
         # Delete old cover if exists
         if current_user.cover_photo:
-            delete_from_storage(current_user.cover_photo, 'covers')
+            delete_file.delay(current_user.cover_photo, 'covers')
         
         # Update user record in database
         result = supabase.table('users').update({
@@ -173,6 +172,7 @@ def upload_cover():
         if result.data:
             # Update current_user object
             current_user.cover_photo = public_url
+            User.invalidate_cache(current_user.id)
             return jsonify({
                 'success': True,
                 'url': public_url,
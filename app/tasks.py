@@ -0,0 +1,42 @@
+"""Background tasks for side effects that should not block a request
+
+Queue them with .delay(...); see app/utils/task_queue.py.
+"""
+from app.utils.task_queue import task
+from app.utils.supabase_client import supabase
+from app.utils.badge_helper import record_event
+from app.utils.storage_helper import remove_from_storage
+
+
+@task()
+def log_activity(user_id, activity_type, description, entity_type=None, entity_id=None,
+                 created_at=None):
+    """Insert a user_activity row
+    
+    Pass created_at (ISO string) from the request so retries don't shift
+    the activity's position in the timeline.
+    """
+    activity_data = {
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'description': description
+    }
+    if created_at:
+        activity_data['created_at'] = created_at
+    if entity_type:
+        activity_data['entity_type'] = entity_type
+        activity_data['entity_id'] = entity_id
+    supabase.table('user_activity').insert(activity_data).execute()
+
+
+@task()
+def check_badges(user_id, event):
+    """Award any badges affected by a domain event"""
+    record_event(user_id, event)
+
+
+@task()
+def delete_file(url, bucket_name):
+    """Remove a replaced or orphaned file from storage"""
+    if not remove_from_storage(url, bucket_name):
+        print(f"Skipping {url}: not stored in {bucket_name}")
@@ -1,99 +1,95 @@
-"""Helper functions for badge awarding system"""
+"""Helper functions for badge awarding system
+
+Badges are evaluated incrementally: each badge lists the domain events that
+can change its outcome, and record_event() only checks the badges that
+depend on the event that just happened. Requirements are read from the
+trigger-maintained user_stats row, and awards are written with an upsert on
+UNIQUE(user_id, badge_type) so repeated evaluation never duplicates a badge.
+
+record_event() runs in the check_badges background task and lets errors
+propagate so the queue retries it; check_and_award_badges() and
+award_badge() are the synchronous entry points and log errors instead.
+"""
 from app.utils.supabase_client import supabase
 
+# Domain events that can affect badge requirements
+BADGE_EVENTS = (
+    'signup', 'rsvp', 'group_join', 'issue_report', 'comment', 'post',
+    'event_create', 'group_create', 'reputation'
+)
+
 # Badge definitions with their requirements
 BADGE_REQUIREMENTS = {
     'first_steps': {
         'name': 'First Steps',
         'description': 'Joined the community',
+        'events': ('signup',),
+        'stats': (),
         'check': lambda stats, user_id: True  # Auto-awarded on signup
     },
     'event_explorer': {
         'name': 'Event Explorer',
         'description': 'Attended 10 events',
+        'events': ('rsvp',),
+        'stats': ('events_attended',),
         'check': lambda stats, user_id: stats.get('events_attended', 0) >= 10
     },
     'community_builder': {
         'name': 'Community Builder',
         'description': 'Joined 5 groups',
+        'events': ('group_join',),
+        'stats': ('groups_joined',),
         'check': lambda stats, user_id: stats.get('groups_joined', 0) >= 5
     },
     'problem_solver': {
         'name': 'Problem Solver',
         'description': 'Reported 10 issues',
+        'events': ('issue_report',),
+        'stats': ('issues_reported',),
         'check': lambda stats, user_id: stats.get('issues_reported', 0) >= 10
     },
     'conversation_starter': {
         'name': 'Conversation Starter',
         'description': 'Posted 50 comments',
-        'check': lambda stats, user_id: count_user_comments(user_id) >= 50
+        'events': ('comment',),
+        'stats': ('comments_posted',),
+        'check': lambda stats, user_id: stats.get('comments_posted', 0) >= 50
     },
     'super_star': {
         'name': 'Super Star',
         'description': 'Reached 1000 reputation points',
+        'events': ('reputation',),
+        'stats': ('reputation_points',),
         'check': lambda stats, user_id: stats.get('reputation_points', 0) >= 1000
     },
     'event_host': {
         'name': 'Event Host',
         'description': 'Created an event',
-        'check': lambda stats, user_id: has_created_event(user_id)
+        'events': ('event_create',),
+        'stats': ('events_created',),
+        'check': lambda stats, user_id: stats.get('events_created', 0) > 0
     },
     'group_creator': {
         'name': 'Group Creator',
         'description': 'Created a group',
-        'check': lambda stats, user_id: has_created_group(user_id)
+        'events': ('group_create',),
+        'stats': ('groups_created',),
+        'check': lambda stats, user_id: stats.get('groups_created', 0) > 0
     },
     'helpful_neighbor': {
         'name': 'Helpful Neighbor',
         'description': 'Active in community discussions',
-        'check': lambda stats, user_id: count_user_posts(user_id) >= 20
+        'events': ('post',),
+        'stats': ('posts_created',),
+        'check': lambda stats, user_id: stats.get('posts_created', 0) >= 20
     }
 }
 
-def count_user_comments(user_id):
-    """Count total comments by user across all tables"""
-    try:
-        # Count event comments
-        event_comments = supabase.table('event_comments').select('id', count='exact').eq('user_id', user_id).execute()
-        event_count = event_comments.count if hasattr(event_comments, 'count') else 0
-        
-        # Count group post comments
-        group_comments = supabase.table('group_post_comments').select('id', count='exact').eq('user_id', user_id).execute()
-        group_count = group_comments.count if hasattr(group_comments, 'count') else 0
-        
-        return event_count + group_count
-    except Exception as e:
-        print(f"Error counting comments: {e}")
-        return 0
-
-def count_user_posts(user_id):
-    """Count total posts by user"""
-    try:
-        result = supabase.table('group_posts').select('id', count='exact').eq('user_id', user_id).execute()
-        return result.count if hasattr(result, 'count') else 0
-    except Exception as e:
-        print(f"Error counting posts: {e}")
-        return 0
-
-def has_created_event(user_id):
-    """Check if user has created any events"""
-    try:
-        result = supabase.table('events').select('id', count='exact').eq('organizer_id', user_id).execute()
-        count = result.count if hasattr(result, 'count') else 0
-        return count > 0
-    except Exception as e:
-        print(f"Error checking events: {e}")
-        return False
-
-def has_created_group(user_id):
-    """Check if user has created any groups"""
-    try:
-        result = supabase.table('groups').select('id', count='exact').eq('creator_id', user_id).execute()
-        count = result.count if hasattr(result, 'count') else 0
-        return count > 0
-    except Exception as e:
-        print(f"Error checking groups: {e}")
-        return False
+# Reverse index: domain event -> badge types that depend on it
+BADGES_BY_EVENT = {event: [] for event in BADGE_EVENTS}
+for _badge_type, _badge_info in BADGE_REQUIREMENTS.items():
+    for _event in _badge_info['events']:
+        BADGES_BY_EVENT[_event].append(_badge_type)
 
 def get_user_badges(user_id):
     """Get list of badge types already earned by user"""
@@ -104,63 +100,79 @@ def get_user_badges(user_id):
         print(f"Error getting user badges: {e}")
         return []
 
+def load_badge_stats(user_id, stat_keys):
+    """Read only the counters the given badges need (at most two queries)
+    
+    Errors are raised rather than read as zeros, which would skip awards.
+    """
+    stats = {key: 0 for key in stat_keys}
+    counters = [key for key in stat_keys if key != 'reputation_points']
+    if counters:
+        result = supabase.table('user_stats').select(', '.join(counters)).eq('user_id', user_id).execute()
+        if result.data:
+            for key in counters:
+                stats[key] = result.data[0].get(key) or 0
+    if 'reputation_points' in stat_keys:
+        result = supabase.table('users').select('reputation_points').eq('id', user_id).execute()
+        if result.data:
+            stats['reputation_points'] = result.data[0].get('reputation_points') or 0
+    return stats
+
+def award_badges(user_id, badge_types):
+    """
+    Award badges to a user with a single idempotent upsert
+    Returns the badge types that were newly awarded
+    """
+    if not badge_types:
+        return []
+    # Existing (user_id, badge_type) rows are skipped and not returned
+    result = supabase.table('user_badges').upsert(
+        [{'user_id': user_id, 'badge_type': badge_type} for badge_type in badge_types],
+        on_conflict='user_id,badge_type',
+        ignore_duplicates=True
+    ).execute()
+    awarded = [badge['badge_type'] for badge in result.data] if result.data else []
+    for badge_type in awarded:
+        print(f"✅ Awarded '{badge_type}' badge to user {user_id}")
+    return awarded
+
 def award_badge(user_id, badge_type):
     """Award a badge to a user"""
     try:
-        # Check if badge already exists
-        existing = supabase.table('user_badges').select('id').eq('user_id', user_id).eq('badge_type', badge_type).execute()
-        
-        if existing.data and len(existing.data) > 0:
-            return False  # Badge already awarded
-        
-        # Insert new badge
-        result = supabase.table('user_badges').insert({
-            'user_id': user_id,
-            'badge_type': badge_type
-        }).execute()
-        
-        if result.data:
-            print(f"✅ Awarded '{badge_type}' badge to user {user_id}")
-            return True
-        return False
-        
+        return badge_type in award_badges(user_id, [badge_type])
     except Exception as e:
-        print(f"Error awarding badge: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error awarding badge {badge_type}: {e}")
         return False
 
+def evaluate_badges(user_id, badge_types):
+    """Check the given badges against the user's counters and award any that are met"""
+    if not badge_types:
+        return []
+    stat_keys = set()
+    for badge_type in badge_types:
+        stat_keys.update(BADGE_REQUIREMENTS[badge_type]['stats'])
+    stats = load_badge_stats(user_id, stat_keys)
+    
+    met = [badge_type for badge_type in badge_types
+           if BADGE_REQUIREMENTS[badge_type]['check'](stats, user_id)]
+    return award_badges(user_id, met)
+
+def record_event(user_id, event):
+    """
+    Evaluate only the badges affected by a domain event
+    Call after the primary write succeeds, e.g. record_event(user_id, 'rsvp')
+    """
+    if event not in BADGES_BY_EVENT:
+        raise ValueError(f"Unknown badge event: {event}")
+    return evaluate_badges(user_id, BADGES_BY_EVENT[event])
+
 def check_and_award_badges(user_id):
     """
-    Check user's achievements and award new badges
-    Should be called after major actions (RSVP, join group, report issue, create event/group, post comment)
+    Check all of a user's achievements and award new badges
+    Prefer record_event() after a single action; this re-evaluates every badge
     """
     try:
-        # Get user's current stats
-        from app.models import User
-        user = User.get_by_id(user_id)
-        if not user:
-            return []
-        
-        stats = user.get_stats()
-        
-        # Get badges already earned
-        earned_badges = get_user_badges(user_id)
-        
-        # Check each badge requirement
-        newly_awarded = []
-        for badge_type, badge_info in BADGE_REQUIREMENTS.items():
-            # Skip if already earned
-            if badge_type in earned_badges:
-                continue
-            
-            # Check if user meets requirements
-            if badge_info['check'](stats, user_id):
-                if award_badge(user_id, badge_type):
-                    newly_awarded.append(badge_type)
-        
-        return newly_awarded
-        
+        return evaluate_badges(user_id, list(BADGE_REQUIREMENTS))
     except Exception as e:
         print(f"Error checking badges: {e}")
         import traceback
@@ -0,0 +1,79 @@
+"""Run independent Supabase calls from a request handler in parallel"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from app.config import Config
+
+# One bounded pool shared by every request in the process
+_executor = ThreadPoolExecutor(
+    max_workers=Config.FANOUT_MAX_WORKERS,
+    thread_name_prefix='fanout'
+)
+
+_local = threading.local()
+
+
+def _run_in_worker(ctx, fn):
+    """Run fn inside a copy of the caller's context on a pool thread"""
+    _local.in_worker = True
+    try:
+        return ctx.run(fn)
+    finally:
+        _local.in_worker = False
+
+
+def fan_out(calls, timeout=None, timeouts=None, defaults=None):
+    """Run independent zero-argument callables concurrently
+    
+    Args:
+        calls: dict of name -> callable
+        timeout: seconds to wait for any call (Config.FANOUT_TIMEOUT by default)
+        timeouts: optional dict of name -> seconds overriding `timeout` per call
+        defaults: optional dict of name -> value returned when a call fails
+            or times out (None otherwise)
+    
+    Returns:
+        dict of name -> result
+    
+    Each call runs in a copy of the caller's context, so Flask's request
+    and current_user are visible, but calls must not mutate shared
+    per-request state (e.g. the UserLoader on flask.g). A failing or slow
+    call only loses its own result; it is logged and replaced by its
+    default. Page latency becomes the slowest call rather than the sum.
+    """
+    timeout = Config.FANOUT_TIMEOUT if timeout is None else timeout
+    timeouts = timeouts or {}
+    defaults = defaults or {}
+    results = {}
+    
+    # Nested fan-outs run inline so pool threads never wait on the pool
+    if getattr(_local, 'in_worker', False):
+        for name, fn in calls.items():
+            try:
+                results[name] = fn()
+            except Exception as e:
+                print(f"Error in fan-out call '{name}': {e}")
+                results[name] = defaults.get(name)
+        return results
+    
+    started = time.monotonic()
+    futures = {
+        name: _executor.submit(_run_in_worker, contextvars.copy_context(), fn)
+        for name, fn in calls.items()
+    }
+    
+    # Every call's deadline is measured from when the fan-out started
+    for name, future in futures.items():
+        remaining = timeouts.get(name, timeout) - (time.monotonic() - started)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            print(f"Fan-out call '{name}' timed out")
+            future.cancel()
+            results[name] = defaults.get(name)
+        except Exception as e:
+            print(f"Error in fan-out call '{name}': {e}")
+            results[name] = defaults.get(name)
+    
+    return results
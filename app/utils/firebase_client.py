@@ -1,13 +1,17 @@
 import firebase_admin
 from firebase_admin import credentials, auth
 import os
+import time
 from app.config import Config
+from app.utils.metrics import observe_token_verification
+from app.utils.token_verifier import get_verifier, TokenVerificationError
 
-# Initialize Firebase Admin SDK
-cred_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                          Config.FIREBASE_ADMIN_SDK_PATH)
-
+# Initialize Firebase Admin SDK (user lookups; tokens are verified locally)
 try:
+    if not Config.FIREBASE_ADMIN_SDK_PATH:
+        raise ValueError("FIREBASE_ADMIN_SDK_PATH is not set")
+    cred_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
+                              Config.FIREBASE_ADMIN_SDK_PATH)
     cred = credentials.Certificate(cred_path)
     firebase_admin.initialize_app(cred)
     print("✅ Firebase Admin SDK initialized successfully")
@@ -15,11 +19,23 @@ except Exception as e:
     print(f"❌ Error initializing Firebase Admin SDK: {e}")
 
 def verify_firebase_token(id_token):
-    """Verify Firebase ID token and return decoded token"""
+    """Verify Firebase ID token and return decoded token
+    
+    Uses Google's cached public keys and a short-lived cache of verified
+    tokens (app/utils/token_verifier.py) rather than the Admin SDK.
+    """
+    started = time.perf_counter()
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = get_verifier().verify(id_token)
+        observe_token_verification(time.perf_counter() - started, 'ok')
         return decoded_token
+    except TokenVerificationError as e:
+        observe_token_verification(time.perf_counter() - started, 'invalid')
+        print(f"Error verifying Firebase token: {e}")
+        return None
     except Exception as e:
+        # Key fetch failures and the like, not the token's fault
+        observe_token_verification(time.perf_counter() - started, 'error')
         print(f"Error verifying Firebase token: {e}")
         return None
 
@@ -0,0 +1,159 @@
+"""Geospatial helpers: great-circle distance and a pure-Python geohash index
+
+Postgres answers "near me" queries with a PostGIS GiST index (see
+add_geo_indexes.sql). The helpers here cover backends without PostGIS:
+haversine_km for exact distances and GeohashIndex for an in-memory
+spatial index that only scans the cells around the query point.
+"""
+import bisect
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Approximate cell height/width in km at the equator for each precision
+_CELL_SIZE_KM = {
+    1: 5000.0, 2: 1250.0, 3: 156.0, 4: 39.1, 5: 4.89,
+    6: 1.22, 7: 0.153, 8: 0.0382, 9: 0.00477
+}
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Get (min_lat, max_lat, min_lng, max_lng) enclosing a circle"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return (max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng)
+
+
+def geohash_encode(lat, lng, precision=6):
+    """Encode a point as a geohash string"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def geohash_decode_bounds(geohash):
+    """Get (min_lat, max_lat, min_lng, max_lng) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def precision_for_radius(radius_km):
+    """Pick the finest geohash precision whose cells are at least radius_km wide"""
+    for precision in range(9, 0, -1):
+        if _CELL_SIZE_KM[precision] >= radius_km:
+            return precision
+    return 1
+
+
+def geohash_cells(lat, lng, radius_km, precision):
+    """Get the geohash cells at `precision` that cover a circle"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    cell_min_lat, cell_max_lat, cell_min_lng, cell_max_lng = \
+        geohash_decode_bounds(geohash_encode(lat, lng, precision))
+    step_lat = cell_max_lat - cell_min_lat
+    step_lng = cell_max_lng - cell_min_lng
+    
+    cells = set()
+    cell_lat = min_lat
+    while cell_lat <= max_lat + step_lat:
+        cell_lng = min_lng
+        while cell_lng <= max_lng + step_lng:
+            wrapped_lng = ((cell_lng + 180.0) % 360.0) - 180.0
+            cells.add(geohash_encode(min(cell_lat, 90.0), wrapped_lng, precision))
+            cell_lng += step_lng
+        cell_lat += step_lat
+    return cells
+
+
+class GeohashIndex:
+    """In-memory spatial index bucketing points by geohash
+    
+    Points are stored under their full-precision geohash, kept in sorted
+    order so a cell prefix maps to one contiguous range. A radius query
+    only visits the ranges for the cells covering the circle, then filters
+    and sorts the candidates by exact haversine distance.
+    """
+    
+    def __init__(self, precision=7):
+        self.precision = precision
+        self._buckets = {}
+        self._sorted = []
+        self._points = {}
+    
+    def __len__(self):
+        return len(self._points)
+    
+    def add(self, key, lat, lng):
+        """Index (or re-index) a point under key"""
+        self.remove(key)
+        geohash = geohash_encode(lat, lng, self.precision)
+        if geohash not in self._buckets:
+            self._buckets[geohash] = set()
+            bisect.insort(self._sorted, geohash)
+        self._buckets[geohash].add(key)
+        self._points[key] = (lat, lng, geohash)
+    
+    def remove(self, key):
+        """Drop a point from the index"""
+        point = self._points.pop(key, None)
+        if not point:
+            return
+        geohash = point[2]
+        bucket = self._buckets.get(geohash)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[geohash]
+                del self._sorted[bisect.bisect_left(self._sorted, geohash)]
+    
+    def nearby(self, lat, lng, radius_km, limit=None):
+        """Get [(key, distance_km)] within radius_km, nearest first"""
+        precision = min(self.precision, precision_for_radius(radius_km))
+        results = []
+        for cell in geohash_cells(lat, lng, radius_km, precision):
+            start = bisect.bisect_left(self._sorted, cell)
+            end = bisect.bisect_left(self._sorted, cell + '~')
+            for geohash in self._sorted[start:end]:
+                for key in self._buckets[geohash]:
+                    point_lat, point_lng, _ = self._points[key]
+                    distance = haversine_km(lat, lng, point_lat, point_lng)
+                    if distance <= radius_km:
+                        results.append((key, distance))
+        results.sort(key=lambda item: item[1])
+        return results[:limit] if limit else results
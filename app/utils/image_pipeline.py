@@ -0,0 +1,141 @@
+"""Resize and re-encode uploaded images before they go to storage"""
+import io
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app.config import Config
+
+# Per-bucket output settings. max_size bounds the stored original;
+# thumbnails are stored next to it as <name>_<variant>.<ext>.
+IMAGE_PROFILES = {
+    'avatars': {'max_size': (512, 512), 'quality': 80, 'thumbnails': {}},
+    'covers': {'max_size': (1920, 640), 'quality': 78, 'thumbnails': {}},
+    'events': {'max_size': (1600, 1600), 'quality': 80, 'thumbnails': {'thumb': (640, 360)}},
+    'groups': {'max_size': (1600, 1600), 'quality': 80, 'thumbnails': {'thumb': (640, 360)}},
+    'group_posts': {'max_size': (1600, 1600), 'quality': 78, 'thumbnails': {}},
+}
+
+# Decoded pixels allowed per upload: SOURCE_PIXEL_FACTOR times the
+# profile's max_size area, but never less than MIN_SOURCE_PIXELS so
+# ordinary screenshots still fit small profiles. Checked against the
+# header (after JPEG draft scaling) before anything is decoded, because
+# PNG, WebP and GIF always decode at full size.
+SOURCE_PIXEL_FACTOR = 4
+MIN_SOURCE_PIXELS = 4_000_000
+
+# Global backstop for any other Image.open in the process
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+OUTPUT_FORMATS = {
+    'WEBP': ('webp', 'image/webp'),
+    'JPEG': ('jpg', 'image/jpeg'),
+}
+
+
+def _encode(image, image_format, quality):
+    """Encode an image without any metadata"""
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha channel; flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.mode or image.mode == 'P' else 'RGB')
+
+    buffer = io.BytesIO()
+    options = {'quality': quality}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options['method'] = 4
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def _cover(image, size):
+    """Scale and center-crop to exactly size"""
+    return ImageOps.fit(image, size, method=Image.Resampling.LANCZOS)
+
+
+def source_pixel_limit(profile):
+    """Most pixels an upload for this profile may decode to"""
+    width, height = profile['max_size']
+    return max(SOURCE_PIXEL_FACTOR * width * height, MIN_SOURCE_PIXELS)
+
+
+def process_image(source, bucket_name):
+    """
+    Strip metadata, bound dimensions and re-encode an uploaded image
+
+    Args:
+        source: file object (or raw bytes) positioned at the start of the upload
+        bucket_name: storage bucket, selects the profile in IMAGE_PROFILES
+
+    Returns:
+        dict with content, extension, content_type and thumbnails
+        ({variant: bytes}), or None if the image should be stored as
+        uploaded (unknown bucket, animated image, or not decodable)
+
+    Raises:
+        ValueError if the image's dimensions are too large to decode
+    """
+    profile = IMAGE_PROFILES.get(bucket_name)
+    if profile is None:
+        return None
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    try:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            # Re-encoding would keep only the first frame
+            return None
+        # Let JPEGs decode at a reduced scale that still covers max_size in
+        # either orientation, which keeps decode memory proportional to the
+        # output, not the input
+        longest = max(profile['max_size'])
+        image.draft('RGB', (longest, longest))
+        width, height = image.size
+        if width * height > source_pixel_limit(profile):
+            raise ValueError(f"Image dimensions {width}x{height} are too large")
+        # Only now: reading EXIF can decode the whole image (PNG)
+        orientation = image.getexif().get(0x0112)
+        image.load()
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image dimensions are too large: {e}") from e
+    except (UnidentifiedImageError, OSError) as e:
+        print(f"Error decoding image for {bucket_name}: {e}")
+        return None
+
+    # Shrink in place first so nothing after this holds a full-size copy;
+    # sideways images are bounded by their stored, not upright, dimensions
+    max_size = profile['max_size']
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        max_size = max_size[::-1]
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    # Apply the EXIF orientation, then drop EXIF (GPS, camera data) entirely
+    image = ImageOps.exif_transpose(image)
+    image.info.pop('exif', None)
+
+    image_format = Config.IMAGE_OUTPUT_FORMAT
+    extension, content_type = OUTPUT_FORMATS[image_format]
+    quality = profile['quality']
+
+    thumbnails = {
+        variant: _encode(_cover(image, size), image_format, quality)
+        for variant, size in profile['thumbnails'].items()
+    }
+
+    return {
+        'content': _encode(image, image_format, quality),
+        'extension': extension,
+        'content_type': content_type,
+        'thumbnails': thumbnails
+    }
@@ -0,0 +1,226 @@
+"""Per-request accounting of Supabase calls
+
+supabase_client wraps both clients with InstrumentedClient. Every executed
+query or RPC is recorded with its table, operation, filter shape, duration
+and row count into the current request's CallLog; init_app() then logs one
+summary line per request, flags probable N+1 patterns (the same query
+shape repeated N_PLUS_ONE_THRESHOLD or more times in one request) and
+keeps the most recent requests for the /_debug/requests endpoint.
+
+The CallLog lives in a context variable, so calls made through fan_out()
+on pool threads are attributed to the request that started them.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, deque
+from flask import g, request
+from flask.logging import default_handler
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Builder methods that choose what a query does rather than filter it
+OPERATIONS = {'select', 'insert', 'update', 'delete', 'upsert'}
+
+# Builder methods that only shape the result
+MODIFIERS = {'order', 'limit', 'range', 'single', 'maybe_single', 'csv', 'explain'}
+
+_current = contextvars.ContextVar('backend_call_log', default=None)
+
+# Functions called with every finished call, in or out of a request
+_listeners = []
+
+_recent = deque(maxlen=Config.REQUEST_LOG_SIZE)
+_recent_lock = threading.Lock()
+
+
+def add_call_listener(fn):
+    """Call fn(call) after every instrumented call (e.g. to export metrics)"""
+    _listeners.append(fn)
+
+
+class CallLog:
+    """Calls made while handling one request"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = time.perf_counter()
+
+    def add(self, call):
+        self.calls.append(call)
+
+    def total_ms(self):
+        return sum(call['duration_ms'] for call in self.calls)
+
+    def repeated_shapes(self, threshold=None):
+        """[(shape, count)] for query shapes seen at least threshold times"""
+        threshold = threshold or Config.N_PLUS_ONE_THRESHOLD
+        counts = Counter(call['shape'] for call in self.calls)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+def _record(call):
+    log = _current.get()
+    if log is not None:
+        log.add(call)
+    for listener in _listeners:
+        try:
+            listener(call)
+        except Exception as e:
+            logger.warning("Call listener %r failed: %s", listener, e)
+
+
+def _describe_filter(method, args):
+    """Filter without its value, e.g. eq(id); values don't change the shape"""
+    if method in ('or_', 'not_', 'filter', 'match') or not args:
+        return method.rstrip('_')
+    return f"{method.rstrip('_')}({args[0]})"
+
+
+class InstrumentedQuery:
+    """Proxy for a query or RPC builder that records execute()"""
+
+    def __init__(self, builder, table, operation='select'):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._filters = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name in OPERATIONS:
+                self._operation = name
+            elif name not in MODIFIERS:
+                self._filters.append(_describe_filter(name, args))
+            if hasattr(result, 'execute'):
+                # postgrest returns a new builder from some methods
+                self._builder = result
+                return self
+            return result
+        return call
+
+    def execute(self):
+        started = time.perf_counter()
+        error = None
+        response = None
+        try:
+            response = self._builder.execute()
+            return response
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            data = getattr(response, 'data', None)
+            filters = ', '.join(self._filters)
+            _record({
+                'table': self._table,
+                'operation': self._operation,
+                'filters': filters,
+                'shape': f"{self._table}.{self._operation}({filters})",
+                'duration_ms': (time.perf_counter() - started) * 1000,
+                'rows': len(data) if isinstance(data, list) else (0 if data is None else 1),
+                'error': error
+            })
+
+
+class InstrumentedClient:
+    """Proxy for a Supabase client whose table() and rpc() calls are recorded"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return InstrumentedQuery(self._client.table(name), name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None, *args, **kwargs):
+        return InstrumentedQuery(self._client.rpc(name, params or {}, *args, **kwargs), name, 'rpc')
+
+    def __getattr__(self, name):
+        # storage, auth etc. pass through unrecorded
+        return getattr(self._client, name)
+
+
+def instrument(client):
+    """Wrap a client, leaving None (failed initialization) alone"""
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+def get_call_log():
+    """CallLog for the current request, or None outside one"""
+    return _current.get()
+
+
+def recent_requests(limit=None, slowest=True):
+    """Summaries of recently finished requests, slowest first by default"""
+    with _recent_lock:
+        entries = list(_recent)
+    if slowest:
+        entries.sort(key=lambda entry: entry['duration_ms'], reverse=True)
+    else:
+        entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def init_app(app):
+    """Collect calls per request and log a summary line after each one"""
+    if not logger.handlers:
+        logger.addHandler(default_handler)
+    logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_call_log():
+        log = CallLog()
+        g._backend_call_log = log
+        g._backend_call_log_token = _current.set(log)
+
+    @app.after_request
+    def summarize_call_log(response):
+        log = g.get('_backend_call_log')
+        if log is None:
+            return response
+
+        duration_ms = (time.perf_counter() - log.started) * 1000
+        repeated = log.repeated_shapes()
+        entry = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'backend_calls': len(log.calls),
+            'backend_ms': round(log.total_ms(), 2),
+            'n_plus_one': [{'shape': shape, 'count': count} for shape, count in repeated],
+            'calls': [dict(call, duration_ms=round(call['duration_ms'], 2)) for call in log.calls],
+            'finished_at': time.time()
+        }
+        with _recent_lock:
+            _recent.append(entry)
+
+        if Config.LOG_REQUEST_SUMMARY and request.endpoint != 'static':
+            logger.info(
+                "%s %s %s %.1fms backend=%d calls %.1fms",
+                entry['method'], entry['path'], entry['status'], duration_ms,
+                entry['backend_calls'], entry['backend_ms']
+            )
+        for shape, count in repeated:
+            logger.warning("Probable N+1 in %s: %s ran %d times", request.endpoint, shape, count)
+        return response
+
+    @app.teardown_request
+    def end_call_log(exc):
+        g.pop('_backend_call_log', None)
+        token = g.pop('_backend_call_log_token', None)
+        if token is not None:
+            _current.reset(token)
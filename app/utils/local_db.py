@@ -0,0 +1,849 @@
+"""In-process stand-in for the Supabase client, for tests and benchmarks
+
+Implements the part of the PostgREST query builder the app uses:
+
+    client.table(name).select(columns, count='exact')
+        .eq / .neq / .gt / .gte / .lt / .lte / .in_ / .is_ / .like / .ilike / .or_
+        .order(column, desc=...) / .limit(n) / .range(start, end)
+    client.table(name).insert(rows) / .update(values) / .delete() / .upsert(rows, ...)
+    client.rpc(name, params)
+
+plus embedded to-one resources in select strings (e.g. author:users(id, name)),
+the counter columns and user_stats rows that triggers maintain in Postgres,
+ON DELETE CASCADE for the tables whose routes rely on it, and Python versions
+of the app's RPCs. Rows live in memory; with a path they are also written
+through to a SQLite file so data survives restarts.
+
+Select it with DATA_BACKEND=memory or DATA_BACKEND=sqlite.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from app.config import Config
+from app.utils.geo import GeohashIndex
+
+PRIMARY_KEYS = {
+    'user_stats': ('user_id',),
+    'storage_objects': ('bucket', 'path'),
+}
+
+UNIQUE_KEYS = {
+    'users': [('email',)],
+    'event_rsvps': [('event_id', 'user_id')],
+    'group_members': [('group_id', 'user_id')],
+    'group_post_likes': [('post_id', 'user_id')],
+    'saved_events': [('user_id', 'event_id')],
+    'user_badges': [('user_id', 'badge_type')],
+}
+
+# Column defaults from the schema files (created_at is added to every table)
+TABLE_DEFAULTS = {
+    'users': {'reputation_points': 0, 'verified': False, 'user_type': 'citizen', 'interests': []},
+    'events': {'going_count': 0},
+    'groups': {'member_count': 0, 'is_private': False},
+    'group_members': {'role': 'member'},
+    'group_posts': {'like_count': 0, 'comment_count': 0},
+    'issues': {'status': 'open', 'priority': 'medium'},
+    'event_rsvps': {'status': 'going'},
+    'user_stats': {
+        'events_attended': 0, 'groups_joined': 0, 'issues_reported': 0,
+        'comments_posted': 0, 'posts_created': 0, 'events_created': 0, 'groups_created': 0
+    },
+    'storage_objects': {'ref_count': 0},
+}
+
+TIMESTAMP_DEFAULTS = {
+    'group_members': ('joined_at',),
+    'user_badges': ('earned_at',),
+    'users': ('updated_at',),
+    'events': ('updated_at',),
+    'groups': ('updated_at',),
+}
+
+# (table, embedded table) -> foreign key column on table
+FOREIGN_KEYS = {
+    ('events', 'users'): 'organizer_id',
+    ('groups', 'users'): 'creator_id',
+    ('issues', 'users'): 'reporter_id',
+    ('event_rsvps', 'events'): 'event_id',
+    ('event_comments', 'events'): 'event_id',
+    ('saved_events', 'events'): 'event_id',
+    ('group_members', 'groups'): 'group_id',
+    ('group_posts', 'groups'): 'group_id',
+    ('group_post_likes', 'group_posts'): 'post_id',
+    ('group_post_comments', 'group_posts'): 'post_id',
+}
+
+# parent table -> [(child table, foreign key column)] deleted with the parent
+CASCADES = {
+    'users': [
+        ('event_rsvps', 'user_id'), ('group_members', 'user_id'), ('event_comments', 'user_id'),
+        ('saved_events', 'user_id'), ('user_badges', 'user_id'), ('user_activity', 'user_id'),
+        ('user_stats', 'user_id'),
+    ],
+    'events': [('event_rsvps', 'event_id'), ('event_comments', 'event_id'), ('saved_events', 'event_id')],
+    'groups': [('group_members', 'group_id'), ('group_posts', 'group_id')],
+    'group_posts': [('group_post_likes', 'post_id'), ('group_post_comments', 'post_id')],
+}
+
+def _going(row):
+    return row.get('status') == 'going'
+
+# Trigger-maintained counters:
+# (child table, parent table, foreign key column, counter column, row filter)
+COUNTERS = [
+    ('event_rsvps', 'events', 'event_id', 'going_count', _going),
+    ('group_members', 'groups', 'group_id', 'member_count', None),
+    ('group_post_likes', 'group_posts', 'post_id', 'like_count', None),
+    ('group_post_comments', 'group_posts', 'post_id', 'comment_count', None),
+    ('event_rsvps', 'user_stats', 'user_id', 'events_attended', _going),
+    ('group_members', 'user_stats', 'user_id', 'groups_joined', None),
+    ('issues', 'user_stats', 'reporter_id', 'issues_reported', None),
+    ('event_comments', 'user_stats', 'user_id', 'comments_posted', None),
+    ('group_post_comments', 'user_stats', 'user_id', 'comments_posted', None),
+    ('group_posts', 'user_stats', 'user_id', 'posts_created', None),
+    ('events', 'user_stats', 'organizer_id', 'events_created', None),
+    ('groups', 'user_stats', 'creator_id', 'groups_created', None),
+]
+
+# Tables whose latitude/longitude are kept in a GeohashIndex for nearby RPCs
+GEO_TABLES = ('events', 'issues')
+
+_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+
+
+class LocalAPIError(Exception):
+    """Raised where PostgREST would return an error response"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class LocalResponse:
+    """Same shape as postgrest's APIResponse"""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_timestamp(value):
+    if not isinstance(value, str) or not _TIMESTAMP_RE.match(value):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _coerce(value, other):
+    """Bring a stored value and a filter value to comparable types"""
+    if isinstance(value, bool):
+        return value, other if isinstance(other, bool) else str(other).lower() == 'true'
+    if isinstance(value, (int, float)):
+        try:
+            return value, float(other)
+        except (TypeError, ValueError):
+            return str(value), str(other)
+    if isinstance(value, str):
+        stamp = _parse_timestamp(value)
+        if stamp is not None:
+            other_stamp = other if isinstance(other, datetime) else _parse_timestamp(str(other))
+            if other_stamp is not None:
+                return stamp, other_stamp
+    return str(value), str(other)
+
+
+def _sort_key(value):
+    """Order numbers, timestamps and strings sensibly within one column"""
+    if isinstance(value, bool):
+        return (0, int(value))
+    if isinstance(value, (int, float)):
+        return (0, value)
+    stamp = _parse_timestamp(value)
+    if stamp is not None:
+        return (1, stamp.timestamp())
+    return (2, str(value))
+
+
+def _like(pattern, value, case_insensitive):
+    regex = '^' + ''.join(
+        '.*' if ch in '%*' else '.' if ch == '_' else re.escape(ch) for ch in pattern
+    ) + '$'
+    return re.match(regex, str(value), re.IGNORECASE if case_insensitive else 0) is not None
+
+
+def _compare(op, value, target):
+    if op == 'is':
+        target = str(target).lower()
+        if target == 'null':
+            return value is None
+        return value is (target == 'true')
+    if value is None:
+        return False
+    if op == 'in':
+        return any(_compare('eq', value, item) for item in target)
+    if op in ('like', 'ilike'):
+        return _like(str(target), value, op == 'ilike')
+    left, right = _coerce(value, target)
+    try:
+        if op == 'eq':
+            return left == right
+        if op == 'neq':
+            return left != right
+        if op == 'gt':
+            return left > right
+        if op == 'gte':
+            return left >= right
+        if op == 'lt':
+            return left < right
+        if op == 'lte':
+            return left <= right
+    except TypeError:
+        return False
+    raise LocalAPIError(f"Unsupported operator: {op}")
+
+
+def _split_top_level(text):
+    """Split on commas that are not inside parentheses or double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _parse_condition(text):
+    """Parse one PostgREST logic-tree item into a row predicate"""
+    for group in ('and', 'or'):
+        if text.startswith(group + '(') and text.endswith(')'):
+            children = [_parse_condition(part) for part in _split_top_level(text[len(group) + 1:-1])]
+            if group == 'and':
+                return lambda row: all(child(row) for child in children)
+            return lambda row: any(child(row) for child in children)
+
+    column, _, rest = text.partition('.')
+    negate = rest.startswith('not.')
+    if negate:
+        rest = rest[4:]
+    op, _, raw = rest.partition('.')
+    if op == 'in':
+        target = [_unquote(item) for item in _split_top_level(raw.strip('()'))]
+    else:
+        target = _unquote(raw)
+
+    def predicate(row):
+        result = _compare(op, row.get(column), target)
+        return not result if negate else result
+    return predicate
+
+
+def _parse_select(columns):
+    """Split a select string into plain columns and embedded resources"""
+    plain, embeds = [], []
+    for item in _split_top_level(columns or '*'):
+        match = re.match(r'^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$', item, re.S)
+        if match:
+            alias, table, inner = match.groups()
+            embeds.append((alias or table, table, inner))
+        else:
+            plain.append(item.split(':')[-1].strip())
+    return plain, embeds
+
+
+def _copy_row(row):
+    return {key: (list(value) if isinstance(value, list) else
+                  dict(value) if isinstance(value, dict) else value)
+            for key, value in row.items()}
+
+
+class LocalStore:
+    """Tables of rows keyed by primary key, optionally persisted to SQLite"""
+
+    def __init__(self, path=None):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.geo = {table: GeohashIndex() for table in GEO_TABLES}
+        # (table, columns) -> {values: primary key} for UNIQUE_KEYS
+        self.unique = {}
+        # Queries and RPCs executed, for benchmark call counts
+        self.calls = 0
+        self._db = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS local_rows '
+                '(tbl TEXT NOT NULL, pk TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (tbl, pk))'
+            )
+            for table, data in self._db.execute('SELECT tbl, data FROM local_rows ORDER BY rowid'):
+                row = json.loads(data)
+                self.table(table)[self.key(table, row)] = row
+                self._index_geo(table, None, row)
+                self._index_unique(table, None, row)
+
+    # -- storage ---------------------------------------------------------
+
+    def table(self, name):
+        return self.tables.setdefault(name, {})
+
+    @staticmethod
+    def key(table, row):
+        return tuple(str(row.get(column)) for column in PRIMARY_KEYS.get(table, ('id',)))
+
+    def _persist(self, table, key, row):
+        if self._db is None:
+            return
+        pk = json.dumps(key)
+        if row is None:
+            self._db.execute('DELETE FROM local_rows WHERE tbl = ? AND pk = ?', (table, pk))
+        else:
+            self._db.execute(
+                'INSERT OR REPLACE INTO local_rows (tbl, pk, data) VALUES (?, ?, ?)',
+                (table, pk, json.dumps(row, default=str))
+            )
+
+    def _index_geo(self, table, old, new):
+        index = self.geo.get(table)
+        if index is None:
+            return
+        if old is not None:
+            index.remove(old['id'])
+        if new is not None and new.get('latitude') is not None and new.get('longitude') is not None:
+            index.add(new['id'], float(new['latitude']), float(new['longitude']))
+
+    @staticmethod
+    def _unique_values(row, columns):
+        values = tuple(row.get(column) for column in columns)
+        if any(value is None for value in values):
+            return None
+        return tuple(str(value) for value in values)
+
+    def _index_unique(self, table, old, new):
+        for columns in UNIQUE_KEYS.get(table, []):
+            index = self.unique.setdefault((table, columns), {})
+            if old is not None:
+                index.pop(self._unique_values(old, columns), None)
+            if new is not None:
+                values = self._unique_values(new, columns)
+                if values is not None:
+                    index[values] = self.key(table, new)
+
+    def find_unique(self, table, columns, row):
+        """Existing row with the same values in a primary or unique key, or None"""
+        columns = tuple(columns)
+        if columns == PRIMARY_KEYS.get(table, ('id',)):
+            return self.table(table).get(self.key(table, row))
+        if columns not in UNIQUE_KEYS.get(table, []):
+            return None
+        key = self.unique.get((table, columns), {}).get(self._unique_values(row, columns))
+        return self.table(table).get(key) if key is not None else None
+
+    def _check_unique(self, table, row, ignore_key=None):
+        key = self.key(table, row)
+        if key != ignore_key and key in self.table(table):
+            raise LocalAPIError(f'duplicate key value violates unique constraint "{table}_pkey"', '23505')
+        for columns in UNIQUE_KEYS.get(table, []):
+            values = self._unique_values(row, columns)
+            other_key = self.unique.get((table, columns), {}).get(values)
+            if values is not None and other_key is not None and other_key != ignore_key:
+                raise LocalAPIError(
+                    f'duplicate key value violates unique constraint "{table}_{"_".join(columns)}_key"',
+                    '23505'
+                )
+
+    def write(self, table, old, new):
+        """Replace old with new (either may be None) and run triggers"""
+        rows = self.table(table)
+        if old is not None:
+            old_key = self.key(table, old)
+            rows.pop(old_key, None)
+            self._persist(table, old_key, None)
+        if new is not None:
+            new_key = self.key(table, new)
+            rows[new_key] = new
+            self._persist(table, new_key, new)
+        self._index_geo(table, old, new)
+        self._index_unique(table, old, new)
+        self._apply_counters(table, old, new)
+        if old is not None and new is None:
+            self._cascade(table, old)
+
+    def _cascade(self, table, row):
+        for child_table, column in CASCADES.get(table, []):
+            for child in [r for r in self.table(child_table).values() if r.get(column) == row.get('id')]:
+                self.write(child_table, child, None)
+
+    def _apply_counters(self, table, old, new):
+        for child_table, parent_table, column, counter, condition in COUNTERS:
+            if child_table != table:
+                continue
+            deltas = {}
+            if old is not None and (condition is None or condition(old)) and old.get(column) is not None:
+                deltas[old[column]] = deltas.get(old[column], 0) - 1
+            if new is not None and (condition is None or condition(new)) and new.get(column) is not None:
+                deltas[new[column]] = deltas.get(new[column], 0) + 1
+            for parent_id, delta in deltas.items():
+                if delta:
+                    self._bump(parent_table, parent_id, counter, delta)
+
+    def _bump(self, table, parent_id, counter, delta):
+        parent_key = (str(parent_id),)
+        parent = self.table(table).get(parent_key)
+        if parent is None:
+            if table != 'user_stats':
+                return
+            parent = dict(TABLE_DEFAULTS['user_stats'], user_id=parent_id)
+        updated = dict(parent)
+        updated[counter] = max((updated.get(counter) or 0) + delta, 0)
+        if table == 'user_stats':
+            updated['updated_at'] = _now()
+        self.table(table)[parent_key] = updated
+        self._persist(table, parent_key, updated)
+
+    def prepare_insert(self, table, row):
+        """Fill defaults and the primary key for a new row"""
+        prepared = dict(TABLE_DEFAULTS.get(table, {}))
+        for column, value in prepared.items():
+            if isinstance(value, list):
+                prepared[column] = list(value)
+        now = _now()
+        prepared['created_at'] = now
+        for column in TIMESTAMP_DEFAULTS.get(table, ()):
+            prepared[column] = now
+        prepared.update(row)
+        if PRIMARY_KEYS.get(table, ('id',)) == ('id',) and not prepared.get('id'):
+            prepared['id'] = str(uuid.uuid4())
+        return prepared
+
+    def recompute_counters(self):
+        """Rebuild every trigger-maintained counter from the child tables"""
+        with self.lock:
+            for child_table, parent_table, column, counter, condition in COUNTERS:
+                for parent in self.table(parent_table).values():
+                    parent[counter] = 0
+            for child_table, parent_table, column, counter, condition in COUNTERS:
+                for row in list(self.table(child_table).values()):
+                    if (condition is None or condition(row)) and row.get(column) is not None:
+                        self._bump(parent_table, row[column], counter, 1)
+            for table in set(parent for _, parent, _, _, _ in COUNTERS):
+                for key, row in self.table(table).items():
+                    self._persist(table, key, row)
+
+
+class LocalQueryBuilder:
+    """Chainable query over one table, executed against a LocalStore"""
+
+    def __init__(self, store, table):
+        self.store = store
+        self.table_name = table
+        self.operation = 'select'
+        self.columns = '*'
+        self.count_mode = None
+        self.payload = None
+        self.filters = []
+        # Value of an eq filter on the primary key, to skip the table scan
+        self.key_lookup = None
+        self.orders = []
+        self.limit_count = None
+        self.offset = 0
+        self.on_conflict = None
+        self.ignore_duplicates = False
+
+    # -- operations ------------------------------------------------------
+
+    def select(self, *columns, count=None, **kwargs):
+        self.operation = 'select'
+        self.columns = ','.join(columns) if columns else '*'
+        self.count_mode = count
+        return self
+
+    def insert(self, json_data, count=None, upsert=False, **kwargs):
+        self.operation = 'upsert' if upsert else 'insert'
+        self.payload = json_data
+        self.count_mode = count
+        return self
+
+    def upsert(self, json_data, count=None, ignore_duplicates=False, on_conflict='', **kwargs):
+        self.operation = 'upsert'
+        self.payload = json_data
+        self.count_mode = count
+        self.ignore_duplicates = ignore_duplicates
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, json_data, count=None, **kwargs):
+        self.operation = 'update'
+        self.payload = json_data
+        self.count_mode = count
+        return self
+
+    def delete(self, count=None, **kwargs):
+        self.operation = 'delete'
+        self.count_mode = count
+        return self
+
+    # -- filters ---------------------------------------------------------
+
+    def _filter(self, column, op, value):
+        self.filters.append(lambda row: _compare(op, row.get(column), value))
+        return self
+
+    def eq(self, column, value):
+        if (column,) == PRIMARY_KEYS.get(self.table_name, ('id',)):
+            self.key_lookup = value
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'in', list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, 'is', 'null' if value is None else value)
+
+    def like(self, column, pattern):
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, 'ilike', pattern)
+
+    def or_(self, filters, reference_table=None):
+        conditions = [_parse_condition(part) for part in _split_top_level(filters)]
+        self.filters.append(lambda row: any(condition(row) for condition in conditions))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None, **kwargs):
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size, **kwargs):
+        self.limit_count = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.offset = start
+        self.limit_count = end - start + 1
+        return self
+
+    # -- execution -------------------------------------------------------
+
+    def _matching(self):
+        rows = self.store.table(self.table_name)
+        if self.key_lookup is not None:
+            row = rows.get((str(self.key_lookup),))
+            candidates = [row] if row is not None else []
+        else:
+            candidates = rows.values()
+        return [row for row in candidates if all(condition(row) for condition in self.filters)]
+
+    def _sorted(self, rows):
+        for column, desc, nulls_first in reversed(self.orders):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: _sort_key(row[column]), reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def _project(self, row):
+        plain, embeds = _parse_select(self.columns)
+        if '*' in plain:
+            result = _copy_row(row)
+        else:
+            result = {column: row.get(column) for column in plain}
+        for alias, table, inner in embeds:
+            result[alias] = self._embed(row, table, inner)
+        return result
+
+    def _embed(self, row, table, inner):
+        nested = LocalQueryBuilder(self.store, table).select(inner)
+        column = FOREIGN_KEYS.get((self.table_name, table))
+        if column is None and table == 'users' and 'user_id' in row:
+            column = 'user_id'
+        if column is not None:
+            target = self.store.table(table).get((str(row.get(column)),))
+            return nested._project(target) if target else None
+        # To-many: rows of `table` pointing back at this row
+        back = FOREIGN_KEYS.get((table, self.table_name))
+        if back is None:
+            raise LocalAPIError(f"Could not find a relationship between '{self.table_name}' and '{table}'")
+        return [nested._project(child) for child in self.store.table(table).values()
+                if child.get(back) == row.get('id')]
+
+    def execute(self):
+        with self.store.lock:
+            self.store.calls += 1
+            handler = getattr(self, f'_execute_{self.operation}')
+            return handler()
+
+    def _execute_select(self):
+        rows = self._sorted(self._matching())
+        count = len(rows) if self.count_mode else None
+        end = None if self.limit_count is None else self.offset + self.limit_count
+        rows = rows[self.offset:end]
+        return LocalResponse([self._project(row) for row in rows], count)
+
+    def _payload_rows(self):
+        return self.payload if isinstance(self.payload, list) else [self.payload]
+
+    def _execute_insert(self):
+        inserted = []
+        for row in self._payload_rows():
+            prepared = self.store.prepare_insert(self.table_name, row)
+            self.store._check_unique(self.table_name, prepared)
+            self.store.write(self.table_name, None, prepared)
+            inserted.append(prepared)
+        return LocalResponse([self._project(row) for row in inserted],
+                             len(inserted) if self.count_mode else None)
+
+    def _execute_upsert(self):
+        conflict_columns = [column.strip() for column in (self.on_conflict or '').split(',') if column.strip()] \
+            or list(PRIMARY_KEYS.get(self.table_name, ('id',)))
+        written = []
+        for row in self._payload_rows():
+            existing = None
+            if all(row.get(column) is not None for column in conflict_columns):
+                existing = self.store.find_unique(self.table_name, conflict_columns, row)
+            if existing is None:
+                prepared = self.store.prepare_insert(self.table_name, row)
+                self.store._check_unique(self.table_name, prepared)
+                self.store.write(self.table_name, None, prepared)
+                written.append(prepared)
+            elif not self.ignore_duplicates:
+                updated = dict(existing, **row)
+                self.store._check_unique(self.table_name, updated,
+                                         ignore_key=self.store.key(self.table_name, existing))
+                self.store.write(self.table_name, existing, updated)
+                written.append(updated)
+        return LocalResponse([self._project(row) for row in written],
+                             len(written) if self.count_mode else None)
+
+    def _execute_update(self):
+        updated_rows = []
+        for row in self._matching():
+            updated = dict(row, **self.payload)
+            self.store._check_unique(self.table_name, updated, ignore_key=self.store.key(self.table_name, row))
+            self.store.write(self.table_name, row, updated)
+            updated_rows.append(updated)
+        return LocalResponse([self._project(row) for row in updated_rows],
+                             len(updated_rows) if self.count_mode else None)
+
+    def _execute_delete(self):
+        deleted = self._matching()
+        for row in deleted:
+            self.store.write(self.table_name, row, None)
+        return LocalResponse([self._project(row) for row in deleted],
+                             len(deleted) if self.count_mode else None)
+
+
+# -- RPCs -----------------------------------------------------------------
+
+def _search_terms(q):
+    return [term for term in re.findall(r'\w+', (q or '').lower()) if term not in ('or', 'and')]
+
+
+def _search(store, table, key, fields, params):
+    terms = _search_terms(params.get('q'))
+    if not terms:
+        return []
+    category = params.get('filter_category')
+    after_rank, after_id = params.get('after_rank'), params.get('after_id')
+    results = []
+    for row in store.table(table).values():
+        if category and row.get('category') != category:
+            continue
+        rank = 0.0
+        matched = True
+        for term in terms:
+            hits = 0.0
+            for field, weight in fields:
+                words = re.findall(r'\w+', (row.get(field) or '').lower())
+                hits += weight * sum(1 for word in words if word.startswith(term))
+            if not hits:
+                matched = False
+                break
+            rank += hits
+        if not matched:
+            continue
+        rank = round(rank / (1 + math.log(1 + len(terms))), 6)
+        if after_rank is not None and (rank, str(row['id'])) >= (float(after_rank), str(after_id)):
+            continue
+        results.append((rank, str(row['id']), row))
+    results.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    limit = params.get('result_limit', 20)
+    return [{key: _copy_row(row), 'rank': rank} for rank, _, row in results[:limit]]
+
+
+def _nearby(store, table, key, params):
+    keys = store.geo[table].nearby(params['lat'], params['lng'], params.get('radius_km', 10),
+                                   limit=params.get('result_limit', 20))
+    rows = store.table(table)
+    return [{key: _copy_row(rows[(str(row_id),)]), 'distance_km': distance}
+            for row_id, distance in keys if (str(row_id),) in rows]
+
+
+def _user_stats(store, user_id):
+    stats = dict(TABLE_DEFAULTS['user_stats'])
+    row = store.table('user_stats').get((str(user_id),))
+    if row:
+        stats.update({column: row.get(column) or 0 for column in stats})
+    user = store.table('users').get((str(user_id),)) or {}
+    stats['reputation_points'] = user.get('reputation_points') or 0
+    return stats
+
+
+def _rpc_get_profile_bundle(store, params):
+    uid = params['uid']
+    if (str(uid),) not in store.table('users'):
+        return None
+    badges = [_copy_row(row) for row in store.table('user_badges').values() if row.get('user_id') == uid]
+    badges.sort(key=lambda row: _sort_key(row.get('earned_at') or ''), reverse=True)
+    activity = [_copy_row(row) for row in store.table('user_activity').values() if row.get('user_id') == uid]
+    activity.sort(key=lambda row: _sort_key(row.get('created_at') or ''), reverse=True)
+    return {
+        'stats': _user_stats(store, uid),
+        'badges': badges,
+        'activity': activity[:params.get('activity_limit', 10)]
+    }
+
+
+def _rpc_badge_stats_batch(store, params):
+    return [dict(_user_stats(store, user_id), user_id=user_id)
+            for user_id in params['user_ids'] if (str(user_id),) in store.table('users')]
+
+
+def _rpc_acquire_storage_object(store, params):
+    key = (params['p_bucket'], params['p_path'])
+    row = store.table('storage_objects').get(key)
+    if row is None:
+        row = store.prepare_insert('storage_objects', {
+            'bucket': params['p_bucket'], 'path': params['p_path'], 'sha256': params['p_sha256'],
+            'size': params.get('p_size'), 'content_type': params.get('p_content_type'), 'ref_count': 1
+        })
+        store.write('storage_objects', None, row)
+        return 1
+    updated = dict(row, ref_count=row['ref_count'] + 1, updated_at=_now())
+    store.write('storage_objects', row, updated)
+    return updated['ref_count']
+
+
+def _rpc_release_storage_object(store, params):
+    row = store.table('storage_objects').get((params['p_bucket'], params['p_path']))
+    if row is None:
+        return None
+    remaining = max(row['ref_count'] - 1, 0)
+    store.write('storage_objects', row, None if remaining == 0 else dict(row, ref_count=remaining))
+    return remaining
+
+
+def _rpc_backfill_counters(store, params):
+    store.recompute_counters()
+    return None
+
+
+RPCS = {
+    'search_events': lambda store, params: _search(
+        store, 'events', 'event', [('title', 1.0), ('description', 0.4), ('category', 0.2)], params),
+    'search_groups': lambda store, params: _search(
+        store, 'groups', 'group', [('name', 1.0), ('description', 0.4), ('category', 0.2)], params),
+    'nearby_events': lambda store, params: _nearby(store, 'events', 'event', params),
+    'nearby_issues': lambda store, params: _nearby(store, 'issues', 'issue', params),
+    'get_profile_bundle': _rpc_get_profile_bundle,
+    'badge_stats_batch': _rpc_badge_stats_batch,
+    'acquire_storage_object': _rpc_acquire_storage_object,
+    'release_storage_object': _rpc_release_storage_object,
+    'backfill_counters': _rpc_backfill_counters,
+    'backfill_user_stats': _rpc_backfill_counters,
+}
+
+
+class LocalRPC:
+    def __init__(self, store, name, params):
+        self.store = store
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        handler = RPCS.get(self.name)
+        if handler is None:
+            raise LocalAPIError(f"Could not find the function public.{self.name}", 'PGRST202')
+        with self.store.lock:
+            self.store.calls += 1
+            return LocalResponse(handler(self.store, self.params))
+
+
+class LocalClient:
+    """Drop-in for the supabase Client's table() and rpc() entry points"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def table(self, name):
+        return LocalQueryBuilder(self.store, name)
+
+    from_ = table
+
+    def rpc(self, name, params=None, **kwargs):
+        return LocalRPC(self.store, name, params)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_local_client():
+    """Process-wide local client for Config.DATA_BACKEND (memory or sqlite)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                path = Config.LOCAL_DB_PATH if Config.DATA_BACKEND == 'sqlite' else None
+                _client = LocalClient(LocalStore(path))
+    return _client
@@ -0,0 +1,212 @@
+"""Prometheus metrics for the web app
+
+Exports, on /metrics:
+
+- http_requests_total / http_request_duration_seconds by endpoint
+- supabase_calls_total / supabase_call_duration_seconds by table and
+  operation (fed by instrumentation's call listener)
+- app_cache_hits / app_cache_misses / app_cache_size / app_cache_hit_ratio
+  for caches registered with watch_cache()
+- upload_bytes / upload_duration_seconds by bucket (storage_helper)
+- firebase_token_verify_duration_seconds (firebase_client)
+- task_queue_jobs by status, read when /metrics is scraped
+- supabase_pool_* connection pool use per client (supabase_pool)
+
+Under gunicorn every worker is a separate process. Set
+PROMETHEUS_MULTIPROC_DIR to an empty directory (wiped before each start)
+and each process writes its samples there; /metrics then aggregates the
+whole directory. Add a child_exit hook to the gunicorn config so dead
+workers' live gauges are dropped:
+
+    from app.utils.metrics import mark_process_dead
+
+    def child_exit(server, worker):
+        mark_process_dead(worker.pid)
+
+Set METRICS_ENABLED=True to collect and serve metrics; production also
+needs METRICS_TOKEN, which scrapers send as a bearer token.
+prometheus_client is optional; without it the helpers are no-ops and
+/metrics is not registered.
+"""
+import os
+import sys
+import time
+from flask import g, request
+from app.config import Config
+
+# Must be in the environment before prometheus_client is imported
+if Config.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', Config.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(Config.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+try:
+    from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry,
+                                   REGISTRY, generate_latest, CONTENT_TYPE_LATEST)
+    from prometheus_client import multiprocess
+except ImportError:
+    Counter = None
+
+# Seconds; web requests and Supabase round trips share the same scale
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UPLOAD_SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 2e6, 5e6, 10e6, 16e6)
+
+# name -> TTLCache (anything with a stats() dict of hits/misses/size)
+_caches = {}
+
+
+def enabled():
+    """Whether prometheus_client is installed and metrics are switched on"""
+    return Counter is not None and Config.METRICS_ENABLED
+
+
+def multiprocess_mode():
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+
+if Counter is not None:
+    REQUESTS = Counter(
+        'http_requests_total', 'HTTP requests handled',
+        ['endpoint', 'method', 'status']
+    )
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'Time spent handling HTTP requests',
+        ['endpoint', 'method'], buckets=LATENCY_BUCKETS
+    )
+    SUPABASE_CALLS = Counter(
+        'supabase_calls_total', 'Supabase queries and RPCs executed',
+        ['table', 'operation', 'outcome']
+    )
+    SUPABASE_LATENCY = Histogram(
+        'supabase_call_duration_seconds', 'Supabase query and RPC round trip time',
+        ['table', 'operation'], buckets=LATENCY_BUCKETS
+    )
+    # Per-process cumulative counts mirrored from the caches' own counters
+    CACHE_HITS = Gauge('app_cache_hits', 'Cache hits', ['cache'], multiprocess_mode='livesum')
+    CACHE_MISSES = Gauge('app_cache_misses', 'Cache misses', ['cache'], multiprocess_mode='livesum')
+    CACHE_SIZE = Gauge('app_cache_size', 'Entries held in the cache', ['cache'], multiprocess_mode='livesum')
+    CACHE_HIT_RATIO = Gauge('app_cache_hit_ratio', 'Cache hit ratio in this process',
+                            ['cache'], multiprocess_mode='liveall')
+    UPLOAD_BYTES = Histogram(
+        'upload_bytes', 'Size of uploaded files as received',
+        ['bucket'], buckets=UPLOAD_SIZE_BUCKETS
+    )
+    UPLOAD_LATENCY = Histogram(
+        'upload_duration_seconds', 'Time to validate, process and store an upload',
+        ['bucket', 'outcome'], buckets=LATENCY_BUCKETS
+    )
+    FIREBASE_VERIFY_LATENCY = Histogram(
+        'firebase_token_verify_duration_seconds', 'Firebase ID token verification time',
+        ['outcome'], buckets=LATENCY_BUCKETS
+    )
+    QUEUE_JOBS = Gauge('task_queue_jobs', 'Background jobs by status',
+                       ['status'], multiprocess_mode='mostrecent')
+    POOL_IN_FLIGHT = Gauge('supabase_pool_in_flight', 'Requests using or waiting for a pooled connection',
+                           ['client', 'api'], multiprocess_mode='livesum')
+    POOL_CONNECTIONS = Gauge('supabase_pool_connections', 'Open pooled connections',
+                             ['client', 'api', 'state'], multiprocess_mode='livesum')
+    POOL_SATURATION = Gauge('supabase_pool_saturation', 'In-flight requests over pool size',
+                            ['client', 'api'], multiprocess_mode='liveall')
+    POOL_TIMEOUTS = Gauge('supabase_pool_timeouts', 'Requests that gave up waiting for a connection',
+                          ['client', 'api'], multiprocess_mode='livesum')
+
+
+def watch_cache(name, cache):
+    """Export a cache's hit/miss counters under the given name"""
+    _caches[name] = cache
+
+
+def observe_supabase_call(call):
+    """Call listener for app.utils.instrumentation"""
+    if not enabled():
+        return
+    SUPABASE_CALLS.labels(call['table'], call['operation'], 'error' if call['error'] else 'ok').inc()
+    SUPABASE_LATENCY.labels(call['table'], call['operation']).observe(call['duration_ms'] / 1000)
+
+
+def observe_upload(bucket_name, size, seconds, outcome):
+    """Record one upload; size is None when it was rejected before reading"""
+    if not enabled():
+        return
+    if size is not None:
+        UPLOAD_BYTES.labels(bucket_name).observe(size)
+    UPLOAD_LATENCY.labels(bucket_name, outcome).observe(seconds)
+
+
+def observe_token_verification(seconds, outcome):
+    if not enabled():
+        return
+    FIREBASE_VERIFY_LATENCY.labels(outcome).observe(seconds)
+
+
+def _update_cache_gauges():
+    for name, cache in _caches.items():
+        stats = cache.stats()
+        CACHE_HITS.labels(name).set(stats['hits'])
+        CACHE_MISSES.labels(name).set(stats['misses'])
+        CACHE_SIZE.labels(name).set(stats['size'])
+        CACHE_HIT_RATIO.labels(name).set(stats['hit_ratio'])
+
+
+def _update_pool_gauges():
+    # Only loaded (and pools only exist) when the real Supabase backend is used
+    pool = sys.modules.get('app.utils.supabase_pool')
+    if pool is None:
+        return
+    for client, apis in pool.get_pool_stats().items():
+        for api, stats in apis.items():
+            POOL_IN_FLIGHT.labels(client, api).set(stats['in_flight'])
+            POOL_CONNECTIONS.labels(client, api, 'idle').set(stats['idle_connections'])
+            POOL_CONNECTIONS.labels(client, api, 'busy').set(stats['connections'] - stats['idle_connections'])
+            POOL_SATURATION.labels(client, api).set(stats['saturation'])
+            POOL_TIMEOUTS.labels(client, api).set(stats['pool_timeouts'])
+
+
+def _update_queue_gauges():
+    from app.utils.task_queue import get_queue_stats
+    stats = get_queue_stats()
+    for status in ('queued', 'running', 'failed'):
+        QUEUE_JOBS.labels(status).set(stats[status])
+
+
+def render():
+    """(body, content type) for a scrape of this process or the multiprocess directory"""
+    _update_cache_gauges()
+    _update_pool_gauges()
+    _update_queue_gauges()
+    if multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """gunicorn child_exit hook: drop a dead worker's live gauges"""
+    if Counter is not None and multiprocess_mode():
+        multiprocess.mark_process_dead(pid)
+
+
+def init_app(app):
+    """Time every request and feed Supabase calls into the metrics"""
+    from app.utils.instrumentation import add_call_listener
+    add_call_listener(observe_supabase_call)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        # Rule endpoint, not the path, so ids don't explode label cardinality
+        endpoint = request.endpoint or 'unmatched'
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        # Cheap (a lock and a few ints); keeps per-process cache and pool
+        # gauges current for the multiprocess collector
+        _update_cache_gauges()
+        _update_pool_gauges()
+        return response
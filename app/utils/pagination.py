@@ -0,0 +1,66 @@
+"""Helpers for keyset (cursor) pagination"""
+import base64
+import json
+import math
+import re
+import uuid
+
+# PostgREST timestamp output, e.g. 2024-05-01T18:30:00.123456+00:00
+_TIMESTAMP_RE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}(:?\d{2})?)?$'
+)
+
+
+def _timestamp(value):
+    if not isinstance(value, str) or not _TIMESTAMP_RE.match(value):
+        raise ValueError(value)
+    return value
+
+
+def _uuid(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return str(uuid.UUID(value))
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+# Kinds of sort-key value a cursor may hold; each returns a value that is
+# safe to put into a PostgREST filter or raises ValueError
+CURSOR_KINDS = {
+    'timestamp': _timestamp,
+    'uuid': _uuid,
+    'number': _number,
+}
+
+
+def encode_cursor(*values):
+    """Pack the sort-key values of the last row on a page into an opaque cursor"""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *kinds):
+    """Unpack a cursor made by encode_cursor
+    
+    kinds names the expected value of each position ('timestamp', 'uuid'
+    or 'number'). Cursors come from the client, so every value is checked
+    before it can reach a query filter.
+    
+    Returns the list of values, or None if the cursor is missing or
+    malformed (callers then start from the first page).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(kinds):
+            return None
+        return [CURSOR_KINDS[kind](value) for kind, value in zip(kinds, values)]
+    except (ValueError, TypeError):
+        return None
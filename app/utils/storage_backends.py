@@ -0,0 +1,304 @@
+"""Object storage backends for uploaded media
+
+storage_helper talks to whichever backend Config.STORAGE_BACKEND selects:
+
+- 'supabase': Supabase Storage public buckets (production)
+- 'local': files under Config.LOCAL_STORAGE_ROOT, served by the media
+  blueprint (tests, benchmarks and offline development)
+
+Every backend implements put / get_url / delete / exists / stat plus
+path_from_url, which maps a URL it handed out back to a bucket path.
+"""
+import base64
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urljoin
+import requests
+from app.config import Config
+
+
+class StorageObjectExists(Exception):
+    """put() refused to overwrite an existing object"""
+
+
+class StorageBackend:
+    """Interface shared by all storage backends"""
+
+    def put(self, bucket_name, path, source, content_type, size=None):
+        """Store bytes or a file object at path; returns the public URL
+
+        Raises StorageObjectExists if the path is already taken.
+        """
+        raise NotImplementedError
+
+    def get_url(self, bucket_name, path):
+        """Public URL for a stored object"""
+        raise NotImplementedError
+
+    def delete(self, bucket_name, paths):
+        """Remove objects; missing paths are ignored"""
+        raise NotImplementedError
+
+    def exists(self, bucket_name, path):
+        """Whether an object is stored at path"""
+        return self.stat(bucket_name, path) is not None
+
+    def stat(self, bucket_name, path):
+        """dict with size and content_type, or None if missing"""
+        raise NotImplementedError
+
+    def path_from_url(self, url, bucket_name):
+        """Bucket path for a URL returned by get_url, or None if foreign"""
+        raise NotImplementedError
+
+
+class _ChunkReader:
+    """File-like view of length bytes of fileobj from offset
+
+    requests streams a body with read() and a known length in small
+    blocks, so a TUS chunk is never held in memory as a whole.
+    """
+
+    def __init__(self, fileobj, offset, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        fileobj.seek(offset)
+
+    def __len__(self):
+        return self.remaining
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage through the service role client"""
+
+    # Supabase's resumable (TUS) endpoint takes 6MB chunks (the last may be
+    # shorter); each is streamed from the file, not read into memory
+    RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+    RESUMABLE_MAX_RETRIES = 3
+
+    def __init__(self, client=None, resumable_threshold=None):
+        if client is None:
+            from app.utils.supabase_client import supabase_admin
+            client = supabase_admin
+        self.client = client
+        if resumable_threshold is None:
+            resumable_threshold = Config.SUPABASE_RESUMABLE_THRESHOLD
+        self.resumable_threshold = resumable_threshold
+
+    def put(self, bucket_name, path, source, content_type, size=None):
+        if isinstance(source, bytes):
+            return self._upload(bucket_name, path, source, content_type)
+        if size is not None and size >= self.resumable_threshold:
+            return self._resumable_upload(bucket_name, path, source, size, content_type)
+        source.seek(0)
+        return self._upload(bucket_name, path, source.read(), content_type)
+
+    def _upload(self, bucket_name, path, content, content_type):
+        try:
+            result = self.client.storage.from_(bucket_name).upload(
+                path=path,
+                file=content,
+                file_options={
+                    "content-type": content_type,
+                    "upsert": "false"
+                }
+            )
+        except Exception as e:
+            message = str(e).lower()
+            if 'duplicate' in message or 'already exists' in message:
+                raise StorageObjectExists(path) from e
+            raise
+
+        print(f"DEBUG [storage_backends]: Upload result: {result}")
+
+        # Check if upload was successful
+        if hasattr(result, 'error') and result.error:
+            print(f"DEBUG [storage_backends]: Upload failed with error: {result.error}")
+            raise Exception(f"Upload failed: {result.error}")
+
+        return self.get_url(bucket_name, path)
+
+    def _resumable_upload(self, bucket_name, path, fileobj, size, content_type):
+        """Upload a file object in chunks through the TUS endpoint, resuming after errors"""
+        endpoint = f"{Config.SUPABASE_URL}/storage/v1/upload/resumable"
+        headers = {
+            'Authorization': f"Bearer {Config.SUPABASE_SERVICE_ROLE_KEY}",
+            'apikey': Config.SUPABASE_SERVICE_ROLE_KEY,
+            'Tus-Resumable': '1.0.0'
+        }
+        metadata = {
+            'bucketName': bucket_name,
+            'objectName': path,
+            'contentType': content_type
+        }
+
+        response = requests.post(endpoint, headers={
+            **headers,
+            'Upload-Length': str(size),
+            'Upload-Metadata': ','.join(
+                f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items()
+            ),
+            'x-upsert': 'false'
+        }, timeout=30)
+        if response.status_code == 409:
+            raise StorageObjectExists(path)
+        response.raise_for_status()
+        location = urljoin(endpoint, response.headers['Location'])
+
+        offset = 0
+        retries = 0
+        while offset < size:
+            chunk = _ChunkReader(fileobj, offset, min(self.RESUMABLE_CHUNK_SIZE, size - offset))
+            try:
+                response = requests.patch(location, data=chunk, headers={
+                    **headers,
+                    'Upload-Offset': str(offset),
+                    'Content-Length': str(len(chunk)),
+                    'Content-Type': 'application/offset+octet-stream'
+                }, timeout=60)
+                response.raise_for_status()
+                offset = int(response.headers['Upload-Offset'])
+                retries = 0
+            except requests.RequestException as e:
+                retries += 1
+                if retries > self.RESUMABLE_MAX_RETRIES:
+                    raise
+                print(f"DEBUG [storage_backends]: Chunk at {offset} failed ({e}), resuming")
+                time.sleep(2 ** retries)
+                # Ask the server how much it has and continue from there
+                head = requests.head(location, headers=headers, timeout=30)
+                head.raise_for_status()
+                offset = int(head.headers['Upload-Offset'])
+
+        return self.get_url(bucket_name, path)
+
+    def get_url(self, bucket_name, path):
+        return self.client.storage.from_(bucket_name).get_public_url(path)
+
+    def delete(self, bucket_name, paths):
+        self.client.storage.from_(bucket_name).remove(list(paths))
+
+    def stat(self, bucket_name, path):
+        folder, _, name = path.rpartition('/')
+        entries = self.client.storage.from_(bucket_name).list(folder, {'search': name})
+        for entry in entries or []:
+            if entry.get('name') == name:
+                metadata = entry.get('metadata') or {}
+                return {
+                    'size': metadata.get('size'),
+                    'content_type': metadata.get('mimetype')
+                }
+        return None
+
+    def path_from_url(self, url, bucket_name):
+        # URL format: https://<project>.supabase.co/storage/v1/object/public/<bucket>/<path>
+        parts = url.split(f'/storage/v1/object/public/{bucket_name}/')
+        if len(parts) < 2:
+            return None
+        return parts[1].split('?')[0]
+
+
+class LocalStorage(StorageBackend):
+    """Objects as plain files under root/<bucket>/<path>"""
+
+    def __init__(self, root, url_prefix='/media'):
+        self.root = os.path.realpath(root)
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, bucket_name, path):
+        """Absolute file path for an object, refusing anything outside its bucket"""
+        bucket_root = os.path.join(self.root, bucket_name)
+        full_path = os.path.realpath(os.path.join(bucket_root, path))
+        if os.path.dirname(bucket_root) != self.root or \
+                not full_path.startswith(bucket_root + os.sep):
+            raise ValueError(f"Invalid storage path: {bucket_name}/{path}")
+        return full_path
+
+    def put(self, bucket_name, path, source, content_type, size=None):
+        full_path = self.local_path(bucket_name, path)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file, then hard-link into place: the object
+        # appears atomically and an existing one is never overwritten
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if isinstance(source, bytes):
+                    out.write(source)
+                else:
+                    source.seek(0)
+                    shutil.copyfileobj(source, out)
+            try:
+                os.link(temp_path, full_path)
+            except FileExistsError:
+                raise StorageObjectExists(path)
+        finally:
+            os.unlink(temp_path)
+        return self.get_url(bucket_name, path)
+
+    def get_url(self, bucket_name, path):
+        return f"{self.url_prefix}/{bucket_name}/{path}"
+
+    def delete(self, bucket_name, paths):
+        for path in paths:
+            try:
+                os.remove(self.local_path(bucket_name, path))
+            except FileNotFoundError:
+                pass
+
+    def stat(self, bucket_name, path):
+        try:
+            result = os.stat(self.local_path(bucket_name, path))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return {
+            'size': result.st_size,
+            'content_type': mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        }
+
+    def path_from_url(self, url, bucket_name):
+        prefix = f"{self.url_prefix}/{bucket_name}/"
+        index = url.find(prefix)
+        if index < 0:
+            return None
+        return url[index + len(prefix):].split('?')[0]
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Backend selected by Config.STORAGE_BACKEND, created on first use"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if Config.STORAGE_BACKEND == 'supabase':
+                    _storage = SupabaseStorage()
+                elif Config.STORAGE_BACKEND == 'local':
+                    _storage = LocalStorage(Config.LOCAL_STORAGE_ROOT)
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND: {Config.STORAGE_BACKEND}")
+    return _storage
+
+
+def set_storage(backend):
+    """Replace the process-wide backend (e.g. for tests and benchmarks)"""
+    global _storage
+    _storage = backend
@@ -1,29 +1,147 @@
-"""Helper functions for Supabase Storage operations"""
-import os
+"""Helper functions for media storage operations"""
+import hashlib
+import tempfile
+import time
 import uuid
-from werkzeug.utils import secure_filename
 from app.utils.supabase_client import supabase_admin
+from app.utils.storage_backends import get_storage, StorageObjectExists
+from app.utils.image_pipeline import process_image, IMAGE_PROFILES
+from app.utils.metrics import observe_upload
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Uploads are copied from the request stream in fixed-size chunks into a
+# spool that stays in memory up to SPOOL_MAX_MEMORY and then moves to a
+# temporary file, so memory per upload does not grow with file size.
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Magic bytes -> (extension, content type)
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', ('jpg', 'image/jpeg')),
+    (b'\x89PNG\r\n\x1a\n', ('png', 'image/png')),
+    (b'GIF87a', ('gif', 'image/gif')),
+    (b'GIF89a', ('gif', 'image/gif')),
+]
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def upload_to_storage(file, bucket_name, folder=''):
+def sniff_image_type(header):
+    """Identify an image from its first bytes; returns (extension, content type) or None"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return ('webp', 'image/webp')
+    for signature, kind in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return kind
+    return None
+
+def spool_upload(file, max_size=MAX_FILE_SIZE):
+    """
+    Copy an upload into a spooled temporary file, validating as it streams
+    
+    The type is checked from the first chunk's magic bytes (not the
+    client-supplied name or content type) and the size limit is enforced
+    while reading, so oversized uploads are rejected without reading them
+    in full.
+    
+    Returns:
+        (spool, size, (extension, content_type), sha256 hex digest);
+        the caller closes spool
+    
+    Raises:
+        ValueError if the content is not a supported image or is too large
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    kind = None
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if kind is None:
+                kind = sniff_image_type(chunk)
+                if kind is None:
+                    raise ValueError("Invalid file type")
+            size += len(chunk)
+            if size > max_size:
+                raise ValueError(f"File size exceeds {max_size // (1024 * 1024)}MB limit")
+            spool.write(chunk)
+            digest.update(chunk)
+        if kind is None:
+            raise ValueError("Empty file")
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, size, kind, digest.hexdigest()
+
+def _acquire_object(bucket_name, storage_path, digest, size, content_type):
+    """
+    Add a reference to a content-addressed object
+    
+    Returns the new reference count (1 means the object is new and must be
+    uploaded), or None if the count could not be taken (the object must
+    then not be shared).
+    """
+    try:
+        response = supabase_admin.rpc('acquire_storage_object', {
+            'p_bucket': bucket_name,
+            'p_path': storage_path,
+            'p_sha256': digest,
+            'p_size': size,
+            'p_content_type': content_type
+        }).execute()
+        return response.data
+    except Exception as e:
+        print(f"Error acquiring storage object {storage_path}: {e}")
+        return None
+
+def _release_object(bucket_name, storage_path):
     """
-    Upload file to Supabase Storage
+    Drop a reference to an object
+    
+    Returns the remaining reference count, or None if the object is not
+    tracked (uploaded before content addressing, or to a unique path).
+    Errors are raised: a failed call says nothing about other references.
+    """
+    response = supabase_admin.rpc('release_storage_object', {
+        'p_bucket': bucket_name,
+        'p_path': storage_path
+    }).execute()
+    return response.data
+
+def upload_image(file, bucket_name, folder=''):
+    """
+    Process and upload an image to the configured storage backend
+    
+    Images are resized, stripped of EXIF and re-encoded per bucket
+    (see image_pipeline.IMAGE_PROFILES); thumbnail variants are uploaded
+    next to the original.
+    
+    Objects are content-addressed: the path is the SHA-256 of the stored
+    bytes, and a reference count in storage_objects (add_storage_objects.sql)
+    lets repeat uploads of the same image skip the upload entirely. If the
+    reference can't be taken the image goes to a unique path instead, so
+    deleting it can never remove an object other rows still use.
     
     Args:
         file: FileStorage object from Flask request
         bucket_name: Name of the storage bucket (avatars, covers, etc.)
-        folder: Optional folder path within bucket
+        folder: Kept for callers' logging; content-addressed paths are
+            shared across folders so identical images deduplicate
     
     Returns:
-        Public URL of uploaded file or None on error
+        dict with 'url' and 'thumbnail_url' (None if the bucket has no
+        thumbnail variant) or None on error
     """
+    started = time.perf_counter()
+    file_size = None
     try:
         print(f"DEBUG [storage_helper]: Starting upload - bucket={bucket_name}, folder={folder}")
         print(f"DEBUG [storage_helper]: File={file}, filename={file.filename if file else 'None'}")
@@ -32,91 +150,164 @@ def upload_to_storage(file, bucket_name, folder=''):
             print(f"DEBUG [storage_helper]: Invalid file type. File exists: {file is not None}, Allowed: {allowed_file(file.filename) if file else False}")
             raise ValueError("Invalid file type")
         
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        print(f"DEBUG [storage_helper]: File size: {file_size} bytes")
+        # Stream the upload into a spool, checking type and size as we go
+        spool, file_size, (sniffed_ext, sniffed_type), raw_digest = spool_upload(file)
         
-        if file_size > MAX_FILE_SIZE:
-            print(f"DEBUG [storage_helper]: File too large: {file_size} > {MAX_FILE_SIZE}")
-            raise ValueError("File size exceeds 5MB limit")
+        print(f"DEBUG [storage_helper]: File size: {file_size} bytes, detected {sniffed_type}")
         
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_ext}"
-        
-        # Build storage path
-        storage_path = f"{folder}/{unique_filename}" if folder else unique_filename
-        
-        print(f"DEBUG [storage_helper]: Storage path: {storage_path}")
-        
-        # Read file content
-        file_content = file.read()
-        
-        print(f"DEBUG [storage_helper]: File content read, size: {len(file_content)} bytes")
-        
-        # Upload to Supabase Storage using admin client
-        print(f"DEBUG [storage_helper]: Uploading to Supabase...")
-        result = supabase_admin.storage.from_(bucket_name).upload(
-            path=storage_path,
-            file=file_content,
-            file_options={
-                "content-type": file.content_type or "image/jpeg",
-                "upsert": "false"
-            }
-        )
-        
-        print(f"DEBUG [storage_helper]: Upload result: {result}")
-        
-        # Check if upload was successful
-        if hasattr(result, 'error') and result.error:
-            print(f"DEBUG [storage_helper]: Upload failed with error: {result.error}")
-            raise Exception(f"Upload failed: {result.error}")
-        
-        # Get public URL
-        public_url = supabase_admin.storage.from_(bucket_name).get_public_url(storage_path)
+        with spool:
+            # Resize and re-encode; fall back to the original bytes if the
+            # image can't be processed
+            processed = process_image(spool, bucket_name)
+            
+            if processed:
+                file_ext = processed['extension']
+                content_type = processed['content_type']
+                thumbnails = processed['thumbnails']
+                stored_size = len(processed['content'])
+                digest = hashlib.sha256(processed['content']).hexdigest()
+                print(f"DEBUG [storage_helper]: Processed image: {file_size} -> {stored_size} bytes")
+            else:
+                file_ext = sniffed_ext
+                content_type = sniffed_type
+                thumbnails = {}
+                stored_size = file_size
+                digest = raw_digest
+            
+            # Content-addressed path, sharded by the first byte of the hash
+            base_path = f"{digest[:2]}/{digest}"
+            storage_path = f"{base_path}.{file_ext}"
+            thumbnail_paths = {variant: f"{base_path}_{variant}.{file_ext}" for variant in thumbnails}
+            
+            ref_count = _acquire_object(bucket_name, storage_path, digest, stored_size, content_type)
+            if ref_count is None:
+                # Untracked, so it must not share the content-addressed path
+                base_path = f"{base_path}-{uuid.uuid4().hex}"
+                storage_path = f"{base_path}.{file_ext}"
+                thumbnail_paths = {variant: f"{base_path}_{variant}.{file_ext}" for variant in thumbnails}
+                print(f"DEBUG [storage_helper]: No reference count, storing unshared at {storage_path}")
+            storage = get_storage()
+            
+            outcome = 'stored'
+            # Another holder may still be uploading, or may have failed and
+            # released; only reuse what is actually stored. Thumbnails are
+            # put before the original, so the original implies them.
+            if ref_count is not None and ref_count > 1 and storage.exists(bucket_name, storage_path):
+                # Same bytes already stored; just hand out its URLs
+                print(f"DEBUG [storage_helper]: Reusing {storage_path} ({ref_count} references)")
+                public_url = storage.get_url(bucket_name, storage_path)
+                outcome = 'reused'
+            else:
+                print(f"DEBUG [storage_helper]: Uploading to {bucket_name}/{storage_path}...")
+                try:
+                    for variant, thumbnail in thumbnails.items():
+                        try:
+                            storage.put(bucket_name, thumbnail_paths[variant], thumbnail, content_type)
+                        except StorageObjectExists:
+                            pass
+                    if processed:
+                        public_url = storage.put(bucket_name, storage_path, processed['content'], content_type)
+                    else:
+                        public_url = storage.put(bucket_name, storage_path, spool, content_type, size=file_size)
+                except StorageObjectExists:
+                    public_url = storage.get_url(bucket_name, storage_path)
+                except Exception:
+                    if ref_count is not None:
+                        try:
+                            _release_object(bucket_name, storage_path)
+                        except Exception as e:
+                            print(f"Error releasing storage object {storage_path}: {e}")
+                    raise
         
         print(f"DEBUG [storage_helper]: Public URL generated: {public_url}")
         
-        return public_url
+        thumbnail_url = None
+        if 'thumb' in thumbnail_paths:
+            thumbnail_url = storage.get_url(bucket_name, thumbnail_paths['thumb'])
+        
+        observe_upload(bucket_name, file_size, time.perf_counter() - started, outcome)
+        return {'url': public_url, 'thumbnail_url': thumbnail_url}
         
     except Exception as e:
+        observe_upload(bucket_name, file_size, time.perf_counter() - started,
+                       'rejected' if isinstance(e, ValueError) else 'error')
         print(f"Error uploading to storage: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+def upload_to_storage(file, bucket_name, folder=''):
+    """
+    Upload file to the configured storage backend
+    
+    Args:
+        file: FileStorage object from Flask request
+        bucket_name: Name of the storage bucket (avatars, covers, etc.)
+        folder: Optional folder path within bucket
+    
+    Returns:
+        Public URL of uploaded file or None on error
+    """
+    uploaded = upload_image(file, bucket_name, folder=folder)
+    return uploaded['url'] if uploaded else None
+
+def remove_from_storage(url, bucket_name):
+    """
+    Delete file from the configured storage backend, raising on errors
+    
+    Shared content-addressed objects are only removed once their last
+    reference is released. Background jobs use this so failures are
+    retried; request code should call delete_from_storage().
+    
+    Args:
+        url: Public URL of the file
+        bucket_name: Name of the storage bucket
+    
+    Returns:
+        True if the object was removed or is still referenced, False if
+        the URL does not point into this storage backend
+    """
+    if not url:
+        return True
+    
+    # Extract path from URL
+    storage = get_storage()
+    file_path = storage.path_from_url(url, bucket_name)
+    if not file_path:
+        return False
+    
+    # Content-addressed objects may be shared; only remove the last reference.
+    # None means no storage_objects row, so nothing else references it.
+    remaining = _release_object(bucket_name, file_path)
+    if remaining:
+        print(f"DEBUG [storage_helper]: Kept {file_path} ({remaining} references left)")
+        return True
+
+    paths = [file_path]
+    
+    # Thumbnail variants live next to the original
+    stem, _, ext = file_path.rpartition('.')
+    for variant in IMAGE_PROFILES.get(bucket_name, {}).get('thumbnails', {}):
+        paths.append(f"{stem}_{variant}.{ext}")
+    
+    storage.delete(bucket_name, paths)
+    
+    return True
+
 def delete_from_storage(url, bucket_name):
     """
-    Delete file from Supabase Storage
+    Delete file from the configured storage backend
     
     Args:
         url: Public URL of the file
         bucket_name: Name of the storage bucket
     
     Returns:
-        True on success, False on error
+        True on success (including keeping a still-referenced object),
+        False on error; objects are kept when their references can't be read
     """
     try:
-        if not url:
-            return True
-        
-        # Extract path from URL
-        # URL format: https://<project>.supabase.co/storage/v1/object/public/<bucket>/<path>
-        parts = url.split(f'/storage/v1/object/public/{bucket_name}/')
-        if len(parts) < 2:
-            return False
-        
-        file_path = parts[1]
-        
-        # Delete from storage using admin client
-        supabase_admin.storage.from_(bucket_name).remove([file_path])
-        
-        return True
-        
+        return remove_from_storage(url, bucket_name)
     except Exception as e:
         print(f"Error deleting from storage: {e}")
         return False
@@ -1,24 +1,36 @@
-from supabase import create_client, Client
 from app.config import Config
+from app.utils.instrumentation import instrument
 
 # Initialize Supabase client (anon key for user operations)
-supabase: Client = None
+supabase = None
 
 # Initialize admin client (service role key for admin operations like storage)
-supabase_admin: Client = None
+supabase_admin = None
 
-try:
-    # Create Supabase client - positional arguments only
-    supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY)
-    print("✅ Supabase client initialized successfully")
-    
-    # Create admin client with service role key
-    supabase_admin = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_ROLE_KEY)
-    print("✅ Supabase admin client initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing Supabase client: {e}")
-    import traceback
-    traceback.print_exc()
+if Config.DATA_BACKEND in ('memory', 'sqlite'):
+    # Offline stand-in for tests and benchmarks; no network access needed
+    from app.utils.local_db import get_local_client
+    supabase = supabase_admin = get_local_client()
+    print(f"✅ Local {Config.DATA_BACKEND} data backend initialized")
+else:
+    from app.utils.supabase_pool import create_managed_client
+    try:
+        # Clients on explicitly sized, keep-alive connection pools
+        # (app/utils/supabase_pool.py); shared by all threads
+        supabase = create_managed_client('anon', Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY)
+        print("✅ Supabase client initialized successfully")
+        
+        # Create admin client with service role key
+        supabase_admin = create_managed_client('admin', Config.SUPABASE_URL, Config.SUPABASE_SERVICE_ROLE_KEY)
+        print("✅ Supabase admin client initialized successfully")
+    except Exception as e:
+        print(f"❌ Error initializing Supabase client: {e}")
+        import traceback
+        traceback.print_exc()
+
+# Record every query per request (app/utils/instrumentation.py)
+supabase = instrument(supabase)
+supabase_admin = instrument(supabase_admin)
 
 def get_supabase_client():
     """Get Supabase client instance"""
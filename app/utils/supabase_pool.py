@@ -0,0 +1,188 @@
+"""Supabase clients with managed HTTP connection pools
+
+create_client() from supabase-py gives every client lazily created httpx
+sessions with default limits (20 keep-alive connections, 5s idle expiry)
+and one timeout for everything. create_managed_client() instead builds
+the PostgREST and Storage sessions up front, under a lock, on a
+ManagedTransport that:
+
+- caps connections at SUPABASE_POOL_SIZE and keeps them all alive for
+  SUPABASE_KEEPALIVE_EXPIRY seconds, so bursts reuse warm connections
+- speaks HTTP/2 when SUPABASE_HTTP2 is on and the h2 package is installed
+- applies a timeout per kind of operation (read, write, rpc, storage),
+  plus SUPABASE_POOL_TIMEOUT for waiting on a free connection
+- counts in-flight requests and pool timeouts for get_pool_stats()
+
+httpx clients are thread-safe, and nothing is created lazily afterwards,
+so the clients can be shared by every thread of a gunicorn worker. After
+a fork the inherited sockets must not be reused; with preload_app call
+reset_pools() from gunicorn's post_fork hook.
+"""
+import threading
+import httpx
+from supabase import create_client, ClientOptions
+from app.config import Config
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# name -> (supabase client, {'postgrest': transport, 'storage': transport})
+_managed = {}
+_managed_lock = threading.Lock()
+
+
+def operation_timeouts():
+    """Read timeout (seconds) per kind of operation, from config"""
+    return {
+        'read': Config.SUPABASE_READ_TIMEOUT,
+        'write': Config.SUPABASE_WRITE_TIMEOUT,
+        'rpc': Config.SUPABASE_RPC_TIMEOUT,
+        'storage': Config.SUPABASE_STORAGE_TIMEOUT,
+    }
+
+
+class ManagedTransport(httpx.HTTPTransport):
+    """HTTP transport that applies per-operation timeouts and tracks pool use"""
+
+    def __init__(self, pool_size, keepalive_expiry, http2, timeouts, storage=False):
+        super().__init__(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.timeouts = timeouts
+        self.storage = storage
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.pool_timeouts = 0
+        self.timeouts_hit = 0
+
+    def operation(self, request):
+        if self.storage:
+            return 'storage'
+        if request.method in ('GET', 'HEAD'):
+            return 'read'
+        if '/rpc/' in request.url.path:
+            return 'rpc'
+        return 'write'
+
+    def handle_request(self, request):
+        read_timeout = self.timeouts[self.operation(request)]
+        request.extensions['timeout'] = httpx.Timeout(
+            read_timeout,
+            connect=Config.SUPABASE_CONNECT_TIMEOUT,
+            pool=Config.SUPABASE_POOL_TIMEOUT
+        ).as_dict()
+
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().handle_request(request)
+        except httpx.PoolTimeout:
+            with self._lock:
+                self.pool_timeouts += 1
+            raise
+        except httpx.TimeoutException:
+            with self._lock:
+                self.timeouts_hit += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        connections = list(getattr(self._pool, 'connections', []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'http2': self.http2,
+                'connections': len(connections),
+                'idle_connections': idle,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                # HTTP/2 multiplexes many requests per connection, so this
+                # only means "waiting for a connection" over HTTP/1.1
+                'saturation': self.in_flight / self.pool_size if self.pool_size else 0.0,
+                'requests': self.requests,
+                'pool_timeouts': self.pool_timeouts,
+                'timeouts': self.timeouts_hit
+            }
+
+
+def _new_transport(storage=False):
+    return ManagedTransport(
+        pool_size=Config.SUPABASE_POOL_SIZE,
+        keepalive_expiry=Config.SUPABASE_KEEPALIVE_EXPIRY,
+        http2=Config.SUPABASE_HTTP2 and HTTP2_AVAILABLE,
+        timeouts=operation_timeouts(),
+        storage=storage
+    )
+
+
+def _replace_session(old, transport):
+    """Same kind of httpx client as old (base URL, headers) on a new transport"""
+    new = type(old)(
+        base_url=old.base_url,
+        headers=old.headers,
+        follow_redirects=True,
+        transport=transport
+    )
+    old.close()
+    return new
+
+
+def _install_transports(client):
+    transports = {'postgrest': _new_transport(), 'storage': _new_transport(storage=True)}
+
+    postgrest = client.postgrest
+    postgrest.session = _replace_session(postgrest.session, transports['postgrest'])
+
+    storage = client.storage
+    storage.session = _replace_session(storage.session, transports['storage'])
+    storage._client = storage.session
+    return transports
+
+
+def create_managed_client(name, url, key):
+    """Create a Supabase client with managed pools, registered under name for stats"""
+    options = ClientOptions(
+        # Server-side clients use API keys; never swap sessions on auth events
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=Config.SUPABASE_READ_TIMEOUT,
+        storage_client_timeout=Config.SUPABASE_STORAGE_TIMEOUT
+    )
+    with _managed_lock:
+        client = create_client(url, key, options)
+        _managed[name] = (client, _install_transports(client))
+    return client
+
+
+def reset_pools():
+    """Give every managed client fresh connection pools (gunicorn post_fork hook)"""
+    with _managed_lock:
+        for name, (client, _) in list(_managed.items()):
+            _managed[name] = (client, _install_transports(client))
+
+
+def get_pool_stats():
+    """{client name: {'postgrest': stats, 'storage': stats}} for managed clients"""
+    with _managed_lock:
+        managed = list(_managed.items())
+    return {
+        name: {kind: transport.stats() for kind, transport in transports.items()}
+        for name, (_, transports) in managed
+    }
@@ -0,0 +1,360 @@
+"""Persistent background task queue for post-request side effects
+
+Request handlers enqueue work with `some_task.delay(...)` and return as soon
+as the primary write is done. Jobs are stored in a pluggable backend (a
+SQLite file locally, the background_jobs table in Postgres in production)
+and executed by a Worker, either on a daemon thread inside the web process
+or in a separate process started with worker.py.
+
+Failed jobs are retried with exponential backoff up to max_attempts and
+then kept with status 'failed' for inspection.
+"""
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from app.config import Config
+
+# name -> Task, filled in by the @task decorator
+_registry = {}
+
+
+class Task:
+    """A registered background function"""
+
+    def __init__(self, fn, name, max_attempts):
+        self.fn = fn
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = fn.__doc__
+
+    def __call__(self, *args, **kwargs):
+        """Run the task synchronously"""
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue the task to run in the background"""
+        return enqueue(self.name, *args, **kwargs)
+
+
+def task(name=None, max_attempts=None):
+    """Register a function as a background task
+
+    Arguments must be JSON serializable; they are stored with the job.
+    """
+    def decorator(fn):
+        registered = Task(fn, name or fn.__name__, max_attempts or Config.TASK_MAX_ATTEMPTS)
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt, with jitter"""
+    delay = min(Config.TASK_RETRY_BASE_DELAY * (2 ** (attempts - 1)), Config.TASK_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class SQLiteBackend:
+    """Job storage in a local SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS background_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                locked_by TEXT,
+                locked_at REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_background_jobs_status_run_at '
+            'ON background_jobs(status, run_at)'
+        )
+
+    def push(self, task_name, payload, max_attempts):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO background_jobs (task, payload, max_attempts, run_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (task_name, json.dumps(payload), max_attempts, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id, limit):
+        now = time.time()
+        stale = now - Config.TASK_LOCK_TIMEOUT
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM background_jobs "
+                    "WHERE (status = 'queued' AND run_at <= ?) "
+                    "OR (status = 'running' AND locked_at < ?) "
+                    "ORDER BY run_at LIMIT ?",
+                    (now, stale, limit)
+                ).fetchall()
+                ids = [row['id'] for row in rows]
+                if ids:
+                    placeholders = ','.join('?' * len(ids))
+                    self._conn.execute(
+                        f"UPDATE background_jobs SET status = 'running', "
+                        f"attempts = attempts + 1, locked_by = ?, locked_at = ? "
+                        f"WHERE id IN ({placeholders})",
+                        [worker_id, now] + ids
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [{
+            'id': row['id'],
+            'task': row['task'],
+            'payload': json.loads(row['payload']),
+            'attempts': row['attempts'] + 1,
+            'max_attempts': row['max_attempts']
+        } for row in rows]
+
+    def complete(self, job_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM background_jobs WHERE id = ?', (job_id,))
+
+    def retry(self, job_id, error, delay):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_jobs SET status = 'queued', run_at = ?, "
+                "locked_by = NULL, locked_at = NULL, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_jobs SET status = 'failed', "
+                "locked_by = NULL, locked_at = NULL, last_error = ? WHERE id = ?",
+                (error, job_id)
+            )
+
+    def depth(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT status, COUNT(*) AS n FROM background_jobs GROUP BY status'
+            ).fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+class PostgresBackend:
+    """Job storage in the background_jobs table (add_background_jobs.sql)"""
+
+    def __init__(self, client=None):
+        if client is None:
+            from app.utils.supabase_client import supabase_admin
+            client = supabase_admin
+        self.client = client
+
+    def push(self, task_name, payload, max_attempts):
+        response = self.client.table('background_jobs').insert({
+            'task': task_name,
+            'payload': payload,
+            'max_attempts': max_attempts
+        }).execute()
+        return response.data[0]['id'] if response.data else None
+
+    def claim(self, worker_id, limit):
+        response = self.client.rpc('claim_background_jobs', {
+            'worker_id': worker_id,
+            'batch_size': limit,
+            'lock_timeout_seconds': Config.TASK_LOCK_TIMEOUT
+        }).execute()
+        return [{
+            'id': row['id'],
+            'task': row['task'],
+            'payload': row['payload'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts']
+        } for row in response.data or []]
+
+    def complete(self, job_id):
+        self.client.table('background_jobs').delete().eq('id', job_id).execute()
+
+    def retry(self, job_id, error, delay):
+        self.client.table('background_jobs').update({
+            'status': 'queued',
+            'run_at': (_utcnow() + timedelta(seconds=delay)).isoformat(),
+            'locked_by': None,
+            'locked_at': None,
+            'last_error': error
+        }).eq('id', job_id).execute()
+
+    def fail(self, job_id, error):
+        self.client.table('background_jobs').update({
+            'status': 'failed',
+            'locked_by': None,
+            'locked_at': None,
+            'last_error': error
+        }).eq('id', job_id).execute()
+
+    def depth(self):
+        response = self.client.rpc('background_job_counts', {}).execute()
+        return {row['status']: row['count'] for row in response.data or []}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend selected by Config.TASK_QUEUE_BACKEND, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if Config.TASK_QUEUE_BACKEND == 'postgres':
+                    _backend = PostgresBackend()
+                elif Config.TASK_QUEUE_BACKEND == 'sqlite':
+                    _backend = SQLiteBackend(Config.TASK_QUEUE_SQLITE_PATH)
+                else:
+                    raise ValueError(f"Unknown TASK_QUEUE_BACKEND: {Config.TASK_QUEUE_BACKEND}")
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the process-wide backend (e.g. for scripts)"""
+    global _backend
+    _backend = backend
+
+
+def enqueue(task_name, *args, **kwargs):
+    """Store a job for a registered task
+
+    If the queue itself is unavailable the task runs inline instead, so the
+    side effect is not lost; its own errors are logged, never raised.
+    """
+    registered = _registry[task_name]
+    payload = {'args': list(args), 'kwargs': kwargs}
+    try:
+        return get_backend().push(task_name, payload, registered.max_attempts)
+    except Exception as e:
+        print(f"Error enqueueing {task_name}, running inline: {e}")
+        try:
+            registered(*args, **kwargs)
+        except Exception as e2:
+            print(f"Error running {task_name} inline: {e2}")
+        return None
+
+
+class Worker:
+    """Claims and runs queued jobs"""
+
+    def __init__(self, backend=None, batch_size=None, poll_interval=None, app=None):
+        self.backend = backend or get_backend()
+        self.batch_size = batch_size or Config.TASK_BATCH_SIZE
+        self.poll_interval = poll_interval or Config.TASK_POLL_INTERVAL
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self._stop = threading.Event()
+        self.stats = {'succeeded': 0, 'retried': 0, 'failed': 0}
+
+    def run_job(self, job):
+        """Run one claimed job and record the outcome"""
+        registered = _registry.get(job['task'])
+        try:
+            if registered is None:
+                raise LookupError(f"No task registered as {job['task']}")
+            payload = job['payload']
+            if self.app is not None:
+                with self.app.app_context():
+                    registered(*payload.get('args', []), **payload.get('kwargs', {}))
+            else:
+                registered(*payload.get('args', []), **payload.get('kwargs', {}))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if registered is not None and job['attempts'] < job['max_attempts']:
+                delay = retry_delay(job['attempts'])
+                print(f"Task {job['task']} (job {job['id']}) failed, retrying in {delay:.0f}s: {error}")
+                self.backend.retry(job['id'], error, delay)
+                self.stats['retried'] += 1
+            else:
+                print(f"Task {job['task']} (job {job['id']}) failed permanently: {error}")
+                traceback.print_exc()
+                self.backend.fail(job['id'], error)
+                self.stats['failed'] += 1
+            return False
+        self.backend.complete(job['id'])
+        self.stats['succeeded'] += 1
+        return True
+
+    def run_once(self):
+        """Claim one batch and run it; returns the number of jobs run"""
+        jobs = self.backend.claim(self.worker_id, self.batch_size)
+        for job in jobs:
+            self.run_job(job)
+        return len(jobs)
+
+    def run_forever(self):
+        """Poll for jobs until stop() is called"""
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print(f"Error polling background jobs: {e}")
+                ran = 0
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+_worker = None
+
+
+def start_worker_thread(app=None):
+    """Run a Worker on a daemon thread inside this process"""
+    global _worker
+    if _worker is None:
+        _worker = Worker(app=app)
+        thread = threading.Thread(target=_worker.run_forever, name='task-worker', daemon=True)
+        thread.start()
+    return _worker
+
+
+def get_queue_stats():
+    """Queue depth by status plus this process's worker counters"""
+    try:
+        depth = get_backend().depth()
+    except Exception as e:
+        print(f"Error reading queue depth: {e}")
+        depth = {}
+    return {
+        'backend': Config.TASK_QUEUE_BACKEND,
+        'queued': depth.get('queued', 0),
+        'running': depth.get('running', 0),
+        'failed': depth.get('failed', 0),
+        'worker': dict(_worker.stats) if _worker else None
+    }
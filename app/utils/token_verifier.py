@@ -0,0 +1,191 @@
+"""Firebase ID token verification with cached keys and results
+
+Firebase ID tokens are RS256 JWTs signed with one of Google's rotating
+keys. Instead of the Admin SDK's per-call verification this module:
+
+- fetches Google's public certificates once and keeps them until the
+  response's Cache-Control max-age runs out (refetching early only when
+  a token names a key id we haven't seen)
+- caches verified tokens by SHA-256 hash for a short, bounded time, never
+  past the token's own exp, so a burst of logins with the same token
+  costs one signature check
+
+For tests and offline development set FIREBASE_KEYSET_PATH to a JSON file
+of {key id: PEM certificate or public key}; nothing is fetched then.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import jwt
+import requests
+from jwt.exceptions import InvalidTokenError
+from app.config import Config
+from app.utils.cache import TTLCache
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+# Used when Google sends no usable Cache-Control (seconds)
+DEFAULT_KEYS_MAX_AGE = 3600
+
+# Don't refetch more often than this when an unknown key id shows up
+MIN_REFRESH_INTERVAL = 60
+
+# Allowed clock difference with Google's servers (seconds)
+CLOCK_SKEW = 60
+
+
+class TokenVerificationError(Exception):
+    """The token is malformed, expired, or not signed for this project"""
+
+
+def _load_public_key(pem):
+    if 'BEGIN CERTIFICATE' in pem:
+        from cryptography.x509 import load_pem_x509_certificate
+        return load_pem_x509_certificate(pem.encode()).public_key()
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+    return load_pem_public_key(pem.encode())
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else DEFAULT_KEYS_MAX_AGE
+
+
+class PublicKeyCache:
+    """Google's signing keys, refreshed when their Cache-Control expiry passes"""
+
+    def __init__(self, url=GOOGLE_CERTS_URL, keyset=None):
+        self.url = url
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.offline = keyset is not None
+        if keyset is not None:
+            self._keys = {kid: _load_public_key(pem) for kid, pem in keyset.items()}
+            self._expires_at = float('inf')
+
+    def _refresh(self):
+        response = requests.get(self.url, timeout=10)
+        response.raise_for_status()
+        self._keys = {kid: _load_public_key(pem) for kid, pem in response.json().items()}
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + _max_age(response.headers.get('Cache-Control'))
+
+    def get(self, kid):
+        """Public key for a key id, or None if Google doesn't list it"""
+        key = self._keys.get(kid)
+        now = time.monotonic()
+        if key is not None and now < self._expires_at:
+            return key
+        if self.offline:
+            return None
+        with self._lock:
+            key = self._keys.get(kid)
+            expired = time.monotonic() >= self._expires_at
+            recently_fetched = time.monotonic() - self._fetched_at < MIN_REFRESH_INTERVAL
+            if expired or (key is None and not recently_fetched):
+                try:
+                    self._refresh()
+                except requests.RequestException as e:
+                    if key is None:
+                        raise
+                    # Keep verifying with the keys we have and retry shortly
+                    print(f"Error refreshing Firebase public keys, using cached ones: {e}")
+                    self._expires_at = time.monotonic() + MIN_REFRESH_INTERVAL
+                    return key
+                key = self._keys.get(kid)
+        return key
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens locally, caching keys and results"""
+
+    def __init__(self, project_id, keys, cache_size=1024, cache_ttl=300):
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self.keys = keys
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def verify(self, id_token):
+        """
+        Verify a token and return its claims, with 'uid' set like the Admin SDK
+
+        Raises:
+            TokenVerificationError if the token is not valid
+        """
+        if not self.project_id:
+            raise TokenVerificationError("FIREBASE_PROJECT_ID is not configured")
+        if not id_token or not isinstance(id_token, str):
+            raise TokenVerificationError("No token")
+
+        cache_key = hashlib.sha256(id_token.encode()).hexdigest()
+        claims = self.cache.get(cache_key)
+        if claims is not None:
+            if claims['exp'] > time.time():
+                return dict(claims)
+            self.cache.invalidate(cache_key)
+
+        claims = self._verify_signature(id_token)
+        self.cache.set(cache_key, claims)
+        return dict(claims)
+
+    def _verify_signature(self, id_token):
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except InvalidTokenError as e:
+            raise TokenVerificationError(f"Malformed token: {e}") from e
+        if header.get('alg') != 'RS256':
+            raise TokenVerificationError(f"Unexpected algorithm {header.get('alg')}")
+
+        key = self.keys.get(header.get('kid'))
+        if key is None:
+            raise TokenVerificationError(f"Unknown key id {header.get('kid')}")
+
+        try:
+            claims = jwt.decode(
+                id_token, key, algorithms=['RS256'],
+                audience=self.project_id, issuer=self.issuer, leeway=CLOCK_SKEW,
+                options={'require': ['exp', 'iat', 'sub', 'aud', 'iss']}
+            )
+        except InvalidTokenError as e:
+            raise TokenVerificationError(str(e)) from e
+
+        if not claims['sub'] or len(claims['sub']) > 128:
+            raise TokenVerificationError("Invalid subject")
+        if claims.get('auth_time', 0) > time.time() + CLOCK_SKEW:
+            raise TokenVerificationError("auth_time is in the future")
+
+        claims['uid'] = claims['sub']
+        return claims
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """Process-wide verifier for Config.FIREBASE_PROJECT_ID, created on first use"""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                keyset = None
+                if Config.FIREBASE_KEYSET_PATH:
+                    with open(Config.FIREBASE_KEYSET_PATH) as f:
+                        keyset = json.load(f)
+                _verifier = FirebaseTokenVerifier(
+                    Config.FIREBASE_PROJECT_ID,
+                    PublicKeyCache(keyset=keyset),
+                    cache_size=Config.FIREBASE_TOKEN_CACHE_SIZE,
+                    cache_ttl=Config.FIREBASE_TOKEN_CACHE_TTL
+                )
+    return _verifier
+
+
+def set_verifier(verifier):
+    """Replace the process-wide verifier (e.g. for tests)"""
+    global _verifier
+    _verifier = verifier
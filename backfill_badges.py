@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Award every badge a user qualifies for, across the whole user base
+
+Users are processed in batches ordered by id. Each batch costs one query for
+the user ids, one badge_stats_batch() call (add_badge_backfill.sql) that
+computes all counters with GROUP BY passes, one query for the badges already
+earned, and chunked bulk upserts for the missing ones.
+
+Usage:
+    python backfill_badges.py [--dry-run] [--resume] [--badges a,b]
+                              [--batch-size N] [--chunk-size N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.supabase_client import get_supabase_admin
+from app.utils.badge_helper import BADGE_REQUIREMENTS
+
+STATE_FILE = '.backfill_badges_state.json'
+
+# Batch user ids end up in an in_() filter on the query string, so keep
+# batches small enough to stay well under URL length limits
+DEFAULT_BATCH_SIZE = 250
+DEFAULT_CHUNK_SIZE = 500
+
+def load_state():
+    """Return the last user id processed by a previous run, if any"""
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE, 'r') as f:
+        return json.load(f).get('last_user_id')
+
+def save_state(last_user_id):
+    """Remember the last fully processed user id so a run can be resumed"""
+    with open(STATE_FILE, 'w') as f:
+        json.dump({'last_user_id': last_user_id}, f)
+
+def fetch_user_ids(supabase, after_id, batch_size):
+    """Next batch of user ids, keyset-paginated on id"""
+    query = supabase.table('users').select('id').order('id').limit(batch_size)
+    if after_id:
+        query = query.gt('id', after_id)
+    return [row['id'] for row in query.execute().data or []]
+
+def fetch_earned_badges(supabase, user_ids):
+    """Map user id -> set of badge types already awarded"""
+    earned = {user_id: set() for user_id in user_ids}
+    response = supabase.table('user_badges')\
+        .select('user_id, badge_type')\
+        .in_('user_id', user_ids)\
+        .execute()
+    for row in response.data or []:
+        earned[row['user_id']].add(row['badge_type'])
+    return earned
+
+def missing_badges(stats_rows, earned, badge_types):
+    """Badge rows each user qualifies for but has not been awarded"""
+    rows = []
+    for stats in stats_rows:
+        user_id = stats['user_id']
+        for badge_type in badge_types:
+            if badge_type in earned.get(user_id, ()):
+                continue
+            if BADGE_REQUIREMENTS[badge_type]['check'](stats, user_id):
+                rows.append({'user_id': user_id, 'badge_type': badge_type})
+    return rows
+
+def insert_badges(supabase, rows, chunk_size):
+    """Bulk upsert badge rows in chunks, skipping any that already exist"""
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        response = supabase.table('user_badges').upsert(
+            chunk,
+            on_conflict='user_id,badge_type',
+            ignore_duplicates=True
+        ).execute()
+        inserted += len(response.data or [])
+    return inserted
+
+def backfill_badges(dry_run=False, resume=False, badge_types=None,
+                    batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Evaluate badges for all users and insert the missing ones"""
+    supabase = get_supabase_admin()
+    badge_types = badge_types or list(BADGE_REQUIREMENTS)
+    
+    total = supabase.table('users').select('id', count='exact').limit(1).execute().count or 0
+    after_id = load_state() if resume else None
+    if after_id:
+        print(f"Resuming after user {after_id}")
+    
+    processed = 0
+    awarded = 0
+    started = time.time()
+    
+    while True:
+        user_ids = fetch_user_ids(supabase, after_id, batch_size)
+        if not user_ids:
+            break
+        
+        stats_rows = supabase.rpc('badge_stats_batch', {'user_ids': user_ids}).execute().data or []
+        earned = fetch_earned_badges(supabase, user_ids)
+        rows = missing_badges(stats_rows, earned, badge_types)
+        
+        if dry_run:
+            for row in rows:
+                print(f"  would award '{row['badge_type']}' to {row['user_id']}")
+            awarded += len(rows)
+        else:
+            awarded += insert_badges(supabase, rows, chunk_size)
+            save_state(user_ids[-1])
+        
+        after_id = user_ids[-1]
+        processed += len(user_ids)
+        elapsed = time.time() - started
+        print(f"Processed {processed}/{total} users "
+              f"({awarded} badges {'to award' if dry_run else 'awarded'}, {elapsed:.1f}s)")
+    
+    if not dry_run and os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+    
+    print(f"\n✅ Finished: {processed} users, {awarded} badges "
+          f"{'would be awarded' if dry_run else 'awarded'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill badges for all users')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='report missing badges without inserting them')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'continue after the last batch recorded in {STATE_FILE}')
+    parser.add_argument('--badges', default='',
+                        help='comma-separated badge types to evaluate (default: all)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'users per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'badge rows per insert (default: {DEFAULT_CHUNK_SIZE})')
+    args = parser.parse_args()
+    
+    selected = [b.strip() for b in args.badges.split(',') if b.strip()]
+    unknown = [b for b in selected if b not in BADGE_REQUIREMENTS]
+    if unknown:
+        parser.error(f"unknown badge types: {', '.join(unknown)}")
+    
+    try:
+        backfill_badges(
+            dry_run=args.dry_run,
+            resume=args.resume,
+            badge_types=selected,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted - rerun with --resume to continue")
+        sys.exit(1)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Recompute the denormalized counter columns from their source tables
+
+events.going_count, groups.member_count, group_posts.like_count and
+group_posts.comment_count are maintained by triggers (add_counter_columns.sql).
+Run this after bulk imports or if the counters ever drift.
+"""
+
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.supabase_client import get_supabase_admin
+
+def backfill_counters():
+    """Run the backfill_counters() database function"""
+    supabase = get_supabase_admin()
+    
+    try:
+        supabase.rpc('backfill_counters', {}).execute()
+        print("✅ Counters recomputed")
+    except Exception as e:
+        print(f"❌ Error recomputing counters: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    backfill_counters()
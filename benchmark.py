@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Route-level latency benchmark against the offline data backend
+
+Seeds users, events, RSVPs, groups, posts, likes and comments into the
+in-process stand-in (app/utils/local_db.py), then drives the Flask test
+client through the hot routes as a logged-in user and reports latency
+percentiles and backend calls per request.
+
+Usage:
+    python benchmark.py                       # default volumes, 50 requests per route
+    python benchmark.py --users 500 --events 2000 --requests 200
+    python benchmark.py --save-baseline       # record results as the baseline
+    python benchmark.py --compare             # fail on regressions against the baseline
+
+Calls per request come from the backend itself, so a route that starts
+issuing one query per row (N+1) shows up as a call count regression even
+when the local backend is too fast for it to move the latency.
+"""
+
+import argparse
+import atexit
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Everything offline and in this process: set before the app reads its config
+WORK_DIR = tempfile.mkdtemp(prefix='benchmark-')
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ['DATA_BACKEND'] = 'memory'
+os.environ['STORAGE_BACKEND'] = 'local'
+os.environ['LOCAL_STORAGE_ROOT'] = os.path.join(WORK_DIR, 'storage')
+os.environ['TASK_QUEUE_BACKEND'] = 'sqlite'
+os.environ['TASK_QUEUE_SQLITE_PATH'] = os.path.join(WORK_DIR, 'tasks.db')
+os.environ['TASK_WORKER_IN_PROCESS'] = 'False'
+os.environ['FLASK_DEBUG'] = 'False'
+# Keep probable N+1 warnings but not a log line per timed request
+os.environ['LOG_REQUEST_SUMMARY'] = 'False'
+
+from app import create_app
+from app.utils.supabase_client import supabase
+
+BASELINE_FILE = 'benchmark_baseline.json'
+
+CATEGORIES = ['Technology', 'Environment', 'Health & Wellness', 'Arts & Culture',
+              'Sports & Fitness', 'Education', 'Music', 'Food & Dining']
+
+# Allowed slowdown before a percentile counts as a regression; call counts
+# must not grow at all
+DEFAULT_LATENCY_TOLERANCE = 0.25
+
+
+def seed(users=200, events=400, rsvps_per_event=15, groups=60, members_per_group=25,
+         posts_per_group=20, likes_per_post=8, comments_per_post=4, seed_value=42):
+    """Insert a synthetic data set; returns the ids the routes need"""
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+
+    user_rows = [{
+        'id': f"bench-user-{i}",
+        'email': f"bench{i}@example.com",
+        'name': f"Bench User {i}",
+        'location': 'Trivandrum, Kerala',
+        'interests': rng.sample(CATEGORIES, 3),
+        'profile_picture': f"https://i.pravatar.cc/150?img={i % 70}"
+    } for i in range(users)]
+    supabase.table('users').insert(user_rows).execute()
+    user_ids = [row['id'] for row in user_rows]
+
+    event_rows = [{
+        'title': f"{rng.choice(CATEGORIES)} meetup {i}",
+        'description': 'Benchmark event with a description long enough to look like real content. ' * 3,
+        'category': rng.choice(CATEGORIES),
+        'location': 'Trivandrum',
+        'latitude': 8.5 + rng.uniform(-0.2, 0.2),
+        'longitude': 76.9 + rng.uniform(-0.2, 0.2),
+        'max_participants': 100,
+        'organizer_id': rng.choice(user_ids),
+        'date_time': (now + timedelta(hours=rng.randint(-240, 24 * 60))).isoformat()
+    } for i in range(events)]
+    event_ids = [row['id'] for row in supabase.table('events').insert(event_rows).execute().data]
+
+    rsvp_rows = []
+    for event_id in event_ids:
+        for user_id in rng.sample(user_ids, min(rsvps_per_event, users)):
+            rsvp_rows.append({
+                'event_id': event_id,
+                'user_id': user_id,
+                'status': rng.choice(['going', 'going', 'interested'])
+            })
+    supabase.table('event_rsvps').insert(rsvp_rows).execute()
+
+    group_rows = [{
+        'name': f"{rng.choice(CATEGORIES)} circle {i}",
+        'description': 'Benchmark group for people who like to meet up. ' * 3,
+        'category': rng.choice(CATEGORIES),
+        'creator_id': rng.choice(user_ids)
+    } for i in range(groups)]
+    group_ids = [row['id'] for row in supabase.table('groups').insert(group_rows).execute().data]
+
+    member_rows, post_rows = [], []
+    for group_id in group_ids:
+        members = rng.sample(user_ids, min(members_per_group, users))
+        member_rows.extend({'group_id': group_id, 'user_id': user_id} for user_id in members)
+        post_rows.extend({
+            'group_id': group_id,
+            'user_id': rng.choice(members),
+            'content': f"Benchmark post {n} in this group."
+        } for n in range(posts_per_group))
+    supabase.table('group_members').insert(member_rows).execute()
+    post_ids = [row['id'] for row in supabase.table('group_posts').insert(post_rows).execute().data]
+
+    like_rows, comment_rows = [], []
+    for post_id in post_ids:
+        like_rows.extend({'post_id': post_id, 'user_id': user_id}
+                         for user_id in rng.sample(user_ids, min(likes_per_post, users)))
+        comment_rows.extend({
+            'post_id': post_id,
+            'user_id': rng.choice(user_ids),
+            'comment': f"Benchmark comment {n}"
+        } for n in range(comments_per_post))
+    supabase.table('group_post_likes').insert(like_rows).execute()
+    supabase.table('group_post_comments').insert(comment_rows).execute()
+
+    return {'user_ids': user_ids, 'event_ids': event_ids, 'group_ids': group_ids}
+
+
+def build_routes(ids, rng):
+    """Route name -> function returning the next URL to request"""
+    return {
+        'events.list_events': lambda: '/events/',
+        'events.event_detail': lambda: f"/events/{rng.choice(ids['event_ids'])}",
+        'events.my_events': lambda: '/events/my-events',
+        'groups.list_groups': lambda: '/groups/',
+        'groups.group_detail': lambda: f"/groups/{rng.choice(ids['group_ids'])}",
+        'profile.view_profile': lambda: '/profile/',
+    }
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = math.ceil(fraction * len(sorted_values)) - 1
+    return sorted_values[max(0, min(index, len(sorted_values) - 1))]
+
+
+def run(app, routes, user_id, requests_per_route=50, warmup=5):
+    """Request every route; returns {route: summary}"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+        session['_fresh'] = True
+
+    store = supabase.store
+    results = {}
+    for name, next_url in routes.items():
+        for _ in range(warmup):
+            client.get(next_url())
+
+        timings, calls, errors = [], [], 0
+        for _ in range(requests_per_route):
+            url = next_url()
+            calls_before = store.calls
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            calls.append(store.calls - calls_before)
+            if response.status_code >= 400:
+                errors += 1
+
+        timings.sort()
+        results[name] = {
+            'requests': requests_per_route,
+            'errors': errors,
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'calls_mean': round(sum(calls) / len(calls), 2),
+            'calls_max': max(calls)
+        }
+    return results
+
+
+def print_report(results, baseline=None):
+    header = f"{'route':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls':>8}{'max':>6}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, row in results.items():
+        print(f"{name:<24}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+              f"{row['calls_mean']:>8.2f}{row['calls_max']:>6}{row['errors']:>8}")
+        if baseline and name in baseline:
+            base = baseline[name]
+            print(f"{'  baseline':<24}{base['p50_ms']:>9.2f}{base['p95_ms']:>9.2f}{base['p99_ms']:>9.2f}"
+                  f"{base['calls_mean']:>8.2f}{base['calls_max']:>6}{base['errors']:>8}")
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_LATENCY_TOLERANCE):
+    """Human-readable regressions of results against baseline"""
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if row['calls_max'] > base['calls_max'] or row['calls_mean'] > base['calls_mean']:
+            regressions.append(
+                f"{name}: backend calls per request {base['calls_mean']} -> {row['calls_mean']} "
+                f"(max {base['calls_max']} -> {row['calls_max']})"
+            )
+        if row['errors'] > base['errors']:
+            regressions.append(f"{name}: errors {base['errors']} -> {row['errors']}")
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if base[key] and row[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {base[key]} -> {row[key]}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the hot routes against a local backend')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--events', type=int, default=400)
+    parser.add_argument('--rsvps-per-event', type=int, default=15)
+    parser.add_argument('--groups', type=int, default=60)
+    parser.add_argument('--members-per-group', type=int, default=25)
+    parser.add_argument('--posts-per-group', type=int, default=20)
+    parser.add_argument('--likes-per-post', type=int, default=8)
+    parser.add_argument('--comments-per-post', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--routes', help='comma-separated subset of routes to run')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='write results to the baseline file')
+    parser.add_argument('--compare', action='store_true', help='exit 1 on regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_LATENCY_TOLERANCE,
+                        help='allowed latency increase as a fraction (default 0.25)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    app = create_app('production')
+
+    started = time.perf_counter()
+    ids = seed(users=args.users, events=args.events, rsvps_per_event=args.rsvps_per_event,
+               groups=args.groups, members_per_group=args.members_per_group,
+               posts_per_group=args.posts_per_group, likes_per_post=args.likes_per_post,
+               comments_per_post=args.comments_per_post)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    rng = random.Random(7)
+    routes = build_routes(ids, rng)
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = {name: url for name, url in routes.items() if name in wanted}
+
+    results = run(app, routes, ids['user_ids'][0], requests_per_route=args.requests)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline if args.compare else None)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+
+    if args.compare:
+        if baseline is None:
+            print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            sys.exit(2)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -1,8 +1,11 @@
-"""Check and test Supabase Storage buckets"""
-from supabase import create_client
+"""Check and test Supabase Storage buckets and the configured storage backend"""
 import os
+import sys
 from dotenv import load_dotenv
 
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
 load_dotenv()
 
 def test_storage():
@@ -13,6 +16,7 @@ def test_storage():
         service_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
         print(f"Connecting to: {supabase_url}")
+        from supabase import create_client
         supabase = create_client(supabase_url, service_key)
         
         # List existing buckets
@@ -57,5 +61,35 @@ def test_storage():
         import traceback
         traceback.print_exc()
 
+def test_backend():
+    """Round-trip an object through the backend selected by STORAGE_BACKEND"""
+    from app.config import Config
+    from app.utils.storage_backends import get_storage, StorageObjectExists
+    
+    storage = get_storage()
+    print(f"\n🧪 Testing '{Config.STORAGE_BACKEND}' backend ({type(storage).__name__})...")
+    test_path = "test/check_storage.jpg"
+    
+    try:
+        storage.delete('avatars', [test_path])
+        url = storage.put('avatars', test_path, b"test image content", 'image/jpeg')
+        print(f"✅ put: {url}")
+        print(f"✅ exists: {storage.exists('avatars', test_path)}")
+        print(f"✅ stat: {storage.stat('avatars', test_path)}")
+        print(f"✅ path_from_url: {storage.path_from_url(url, 'avatars')}")
+        try:
+            storage.put('avatars', test_path, b"other content", 'image/jpeg')
+            print("❌ put overwrote an existing object")
+        except StorageObjectExists:
+            print("✅ put refuses to overwrite")
+        storage.delete('avatars', [test_path])
+        print(f"✅ delete (exists now: {storage.exists('avatars', test_path)})")
+    except Exception as e:
+        print(f"❌ Backend test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
 if __name__ == "__main__":
-    test_storage()
+    if os.getenv('STORAGE_BACKEND', 'supabase') == 'supabase':
+        test_storage()
+    test_backend()
@@ -0,0 +1,33 @@
+"""Run the tests against the offline backends
+
+Config reads the environment when app.config is first imported, so the
+backends are chosen here, before any test module imports the app.
+"""
+import os
+import shutil
+import tempfile
+import pytest
+
+WORK_DIR = tempfile.mkdtemp(prefix='tests-')
+
+os.environ['DATA_BACKEND'] = 'memory'
+os.environ['STORAGE_BACKEND'] = 'local'
+os.environ['LOCAL_STORAGE_ROOT'] = os.path.join(WORK_DIR, 'storage')
+os.environ['TASK_QUEUE_BACKEND'] = 'sqlite'
+os.environ['TASK_QUEUE_SQLITE_PATH'] = os.path.join(WORK_DIR, 'tasks.db')
+os.environ['TASK_WORKER_IN_PROCESS'] = 'False'
+os.environ['METRICS_ENABLED'] = 'False'
+os.environ['LOG_REQUEST_SUMMARY'] = 'False'
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def store():
+    """Fresh, empty local data store for the test"""
+    from app.utils.local_db import LocalStore, get_local_client
+    client = get_local_client()
+    client.store = LocalStore()
+    return client.store
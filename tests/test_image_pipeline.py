@@ -0,0 +1,54 @@
+"""Bounded decoding and re-encoding of uploads (image_pipeline)"""
+import io
+import pytest
+from PIL import Image
+from app.utils import image_pipeline
+from app.utils.image_pipeline import IMAGE_PROFILES, process_image, source_pixel_limit
+
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def decoded(result):
+    return Image.open(io.BytesIO(result['content']))
+
+
+def test_oversized_png_is_rejected_before_decoding(monkeypatch):
+    limit = source_pixel_limit(IMAGE_PROFILES['group_posts'])
+    # Solid colour compresses to almost nothing however large it is
+    content = encode(Image.new('L', (limit // 1000 + 1, 1000)), 'PNG')
+    assert len(content) < 1024 * 1024
+
+    def fail(self):
+        raise AssertionError("decoded an oversized image")
+    monkeypatch.setattr(image_pipeline.Image.Image, 'load', fail)
+    with pytest.raises(ValueError, match='too large'):
+        process_image(content, 'group_posts')
+
+
+def test_large_jpeg_is_draft_scaled_under_the_limit():
+    profile = IMAGE_PROFILES['avatars']
+    width = 2 * int(source_pixel_limit(profile) ** 0.5)
+    result = process_image(encode(Image.new('RGB', (width, width), (10, 120, 200)), 'JPEG'), 'avatars')
+    assert max(decoded(result).size) <= max(profile['max_size'])
+
+
+def test_output_and_thumbnails_fit_the_profile():
+    result = process_image(encode(Image.new('RGB', (2400, 1800), (200, 30, 30)), 'PNG'), 'events')
+    assert decoded(result).size == (1600, 1200)
+    assert Image.open(io.BytesIO(result['thumbnails']['thumb'])).size == (640, 360)
+
+
+def test_exif_orientation_is_applied_and_stripped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # stored sideways, rotate 90° to display
+    content = encode(Image.new('RGB', (2000, 1000)), 'JPEG', exif=exif.tobytes())
+
+    result = process_image(content, 'covers')
+    image = decoded(result)
+    assert image.width < image.height
+    assert max(image.size) <= max(IMAGE_PROFILES['covers']['max_size'])
+    assert not image.getexif()
@@ -0,0 +1,56 @@
+"""Keyset cursors from untrusted query strings (pagination)"""
+import base64
+import json
+import uuid
+import pytest
+from app.models import Group
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.supabase_client import supabase
+
+POST_ID = str(uuid.uuid4())
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('values, kinds', [
+    (['2024-05-01T18:30:00.123456+00:00', POST_ID], ('timestamp', 'uuid')),
+    (['2024-05-01 18:30:00', POST_ID], ('timestamp', 'uuid')),
+    ([0.0607927, POST_ID], ('number', 'uuid')),
+])
+def test_valid_cursor_round_trips(values, kinds):
+    assert decode_cursor(encode_cursor(*values), *kinds) == values
+
+
+@pytest.mark.parametrize('cursor', [
+    None,
+    '',
+    'not base64!',
+    raw_cursor({'a': 1}),
+    raw_cursor(['2024-05-01T18:30:00+00:00']),
+    # Filter syntax smuggled into either position
+    raw_cursor(['2024-05-01T18:30:00+00:00",id.gt.0,created_at.gt."', POST_ID]),
+    raw_cursor(['2024-05-01T18:30:00+00:00', f"{POST_ID}),or(id.not.is.null"]),
+    raw_cursor([12, POST_ID]),
+    raw_cursor(['2024-05-01T18:30:00+00:00', 7]),
+])
+def test_malformed_or_crafted_cursor_is_rejected(cursor):
+    assert decode_cursor(cursor, 'timestamp', 'uuid') is None
+
+
+@pytest.mark.parametrize('rank', ['1 OR 1', True, float('nan'), None])
+def test_rank_must_be_a_finite_number(rank):
+    assert decode_cursor(raw_cursor([rank, POST_ID]), 'number', 'uuid') is None
+
+
+def test_crafted_cursor_falls_back_to_the_first_page(store):
+    supabase.table('groups').insert([{
+        'name': f"Group {n}", 'description': 'd', 'category': 'Music', 'creator_id': 'u1'
+    } for n in range(3)]).execute()
+
+    first_page, _ = Group.get_page(limit=10)
+    crafted = raw_cursor(['2999-01-01T00:00:00+00:00",id.is.null,created_at.lt."', POST_ID])
+    page, _ = Group.get_page(limit=10, cursor=crafted)
+    assert [group.id for group in page] == [group.id for group in first_page]
+    assert len(page) == 3
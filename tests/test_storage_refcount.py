@@ -0,0 +1,105 @@
+"""Reference counting of content-addressed uploads (storage_helper)"""
+import io
+import re
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app.utils import storage_helper
+from app.utils.storage_backends import get_storage
+
+BUCKET = 'group_posts'
+
+# Where shared, reference-counted objects live: <sha256[:2]>/<sha256>.<ext>
+SHARED_PATH = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+def make_upload(color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename='photo.png', content_type='image/png')
+
+
+def stored_path(url):
+    return get_storage().path_from_url(url, BUCKET)
+
+
+def exists(url):
+    return get_storage().exists(BUCKET, stored_path(url))
+
+
+class FailingRPC:
+    """supabase_admin stand-in whose RPCs always fail"""
+
+    def rpc(self, name, params=None):
+        raise ConnectionError("Supabase unavailable")
+
+
+def test_identical_uploads_share_one_object(store):
+    first = storage_helper.upload_image(make_upload(), BUCKET)
+    second = storage_helper.upload_image(make_upload(), BUCKET)
+
+    assert first['url'] == second['url']
+    assert SHARED_PATH.match(stored_path(first['url']))
+    row, = store.table('storage_objects').values()
+    assert row['ref_count'] == 2
+
+
+def test_object_is_deleted_with_its_last_reference(store):
+    first = storage_helper.upload_image(make_upload(), BUCKET)
+    storage_helper.upload_image(make_upload(), BUCKET)
+
+    assert storage_helper.delete_from_storage(first['url'], BUCKET)
+    assert exists(first['url'])
+
+    assert storage_helper.delete_from_storage(first['url'], BUCKET)
+    assert not exists(first['url'])
+    if first['thumbnail_url']:
+        assert not exists(first['thumbnail_url'])
+    assert not store.table('storage_objects')
+
+
+def test_upload_without_a_reference_goes_to_a_unique_path(store, monkeypatch):
+    shared = storage_helper.upload_image(make_upload(), BUCKET)
+
+    monkeypatch.setattr(storage_helper, 'supabase_admin', FailingRPC())
+    unshared = storage_helper.upload_image(make_upload(), BUCKET)
+
+    assert unshared is not None
+    assert unshared['url'] != shared['url']
+    assert not SHARED_PATH.match(stored_path(unshared['url']))
+
+    # Untracked and unshared, so deleting it is safe and leaves the shared one
+    monkeypatch.undo()
+    assert storage_helper.delete_from_storage(unshared['url'], BUCKET)
+    assert not exists(unshared['url'])
+    assert exists(shared['url'])
+
+
+def test_shared_object_is_kept_when_release_fails(store, monkeypatch):
+    uploaded = storage_helper.upload_image(make_upload(), BUCKET)
+    storage_helper.upload_image(make_upload(), BUCKET)
+
+    monkeypatch.setattr(storage_helper, 'supabase_admin', FailingRPC())
+    assert storage_helper.delete_from_storage(uploaded['url'], BUCKET) is False
+    assert exists(uploaded['url'])
+    if uploaded['thumbnail_url']:
+        assert exists(uploaded['thumbnail_url'])
+
+
+def test_reference_to_a_missing_object_uploads_it(store):
+    first = storage_helper.upload_image(make_upload(), BUCKET)
+    # The first holder's object is gone (failed upload, or still in flight)
+    get_storage().delete(BUCKET, [stored_path(first['url'])])
+
+    second = storage_helper.upload_image(make_upload(), BUCKET)
+    assert second['url'] == first['url']
+    assert exists(second['url'])
+
+
+def test_untracked_shared_object_is_deleted(store):
+    uploaded = storage_helper.upload_image(make_upload(), BUCKET)
+    store.table('storage_objects').clear()
+
+    assert storage_helper.delete_from_storage(uploaded['url'], BUCKET)
+    assert not exists(uploaded['url'])
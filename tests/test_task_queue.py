@@ -0,0 +1,117 @@
+"""Claiming, retrying and failing background jobs (task_queue)"""
+import pytest
+from app import tasks  # noqa: F401  registers check_badges and delete_file
+from app.config import Config
+from app.utils import badge_helper, storage_helper, task_queue
+from app.utils.supabase_client import supabase
+from app.utils.task_queue import SQLiteBackend, Worker, task
+
+calls = []
+
+
+@task(name='tests.flaky')
+def flaky(fail_times):
+    """Fails the first fail_times calls"""
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise ConnectionError("transient")
+
+
+class FailingClient:
+    """supabase stand-in whose queries and RPCs always fail"""
+
+    def table(self, name):
+        raise ConnectionError("Supabase unavailable")
+
+    def rpc(self, name, params=None):
+        raise ConnectionError("Supabase unavailable")
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    calls.clear()
+    # Retries become due immediately
+    monkeypatch.setattr(Config, 'TASK_RETRY_BASE_DELAY', 0)
+    return SQLiteBackend(str(tmp_path / 'tasks.db'))
+
+
+def jobs(backend):
+    return [dict(row) for row in backend._conn.execute('SELECT * FROM background_jobs')]
+
+
+def test_claim_marks_jobs_running_and_hides_them(backend):
+    backend.push('tests.flaky', {'args': [0]}, 3)
+
+    claimed = backend.claim('worker-a', 10)
+    assert [job['attempts'] for job in claimed] == [1]
+    assert jobs(backend)[0]['status'] == 'running'
+    assert backend.claim('worker-b', 10) == []
+
+
+def test_stale_running_job_is_reclaimed(backend, monkeypatch):
+    backend.push('tests.flaky', {'args': [0]}, 3)
+    backend.claim('worker-a', 10)
+
+    monkeypatch.setattr(Config, 'TASK_LOCK_TIMEOUT', -1)
+    reclaimed = backend.claim('worker-b', 10)
+    assert [job['attempts'] for job in reclaimed] == [2]
+    assert jobs(backend)[0]['locked_by'] == 'worker-b'
+
+
+def test_failed_job_is_retried_then_completed(backend):
+    backend.push('tests.flaky', {'args': [1]}, 3)
+    worker = Worker(backend=backend)
+
+    assert worker.run_once() == 1
+    job, = jobs(backend)
+    assert (job['status'], job['attempts']) == ('queued', 1)
+    assert 'ConnectionError' in job['last_error']
+
+    assert worker.run_once() == 1
+    assert jobs(backend) == []
+    assert worker.stats == {'succeeded': 1, 'retried': 1, 'failed': 0}
+
+
+def test_job_fails_permanently_after_max_attempts(backend):
+    backend.push('tests.flaky', {'args': [5]}, 2)
+    worker = Worker(backend=backend)
+
+    worker.run_once()
+    worker.run_once()
+    job, = jobs(backend)
+    assert (job['status'], job['attempts']) == ('failed', 2)
+    assert worker.run_once() == 0
+
+
+def test_retry_delay_backs_off_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_RETRY_BASE_DELAY', 2)
+    monkeypatch.setattr(Config, 'TASK_RETRY_MAX_DELAY', 30)
+    monkeypatch.setattr(task_queue.random, 'uniform', lambda low, high: 1)
+    assert [task_queue.retry_delay(n) for n in (1, 2, 3, 10)] == [2, 4, 8, 30]
+
+
+def test_check_badges_is_retried_on_backend_errors(backend, store, monkeypatch):
+    supabase.table('user_stats').insert({'user_id': 'u1', 'posts_created': 20}).execute()
+    backend.push('check_badges', {'args': ['u1', 'post']}, 3)
+    worker = Worker(backend=backend)
+
+    monkeypatch.setattr(badge_helper, 'supabase', FailingClient())
+    worker.run_once()
+    assert jobs(backend)[0]['status'] == 'queued'
+    assert not store.table('user_badges')
+
+    monkeypatch.undo()
+    worker.run_once()
+    assert jobs(backend) == []
+    assert [row['badge_type'] for row in store.table('user_badges').values()] == ['helpful_neighbor']
+
+
+def test_delete_file_is_retried_on_backend_errors(backend, monkeypatch):
+    backend.push('delete_file', {'args': ['/media/avatars/ab/' + 'ab' * 32 + '.jpg', 'avatars']}, 3)
+    worker = Worker(backend=backend)
+
+    monkeypatch.setattr(storage_helper, 'supabase_admin', FailingClient())
+    worker.run_once()
+    job, = jobs(backend)
+    assert job['status'] == 'queued'
+    assert 'ConnectionError' in job['last_error']
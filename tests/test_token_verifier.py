@@ -0,0 +1,131 @@
+"""Local Firebase ID token verification (token_verifier)"""
+import json
+import time
+from datetime import datetime, timedelta
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.config import Config
+from app.utils import token_verifier
+from app.utils.token_verifier import (FirebaseTokenVerifier, PublicKeyCache,
+                                      TokenVerificationError)
+
+PROJECT_ID = 'test-project'
+KID = 'key-1'
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PUBLIC_PEM = PRIVATE_KEY.public_key().public_bytes(
+    serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+).decode()
+
+
+def make_token(key=PRIVATE_KEY, algorithm='RS256', kid=KID, **overrides):
+    now = int(time.time())
+    claims = {
+        'iss': f"https://securetoken.google.com/{PROJECT_ID}",
+        'aud': PROJECT_ID,
+        'sub': 'user-123',
+        'iat': now,
+        'auth_time': now,
+        'exp': now + 3600,
+        'email': 'user@example.com'
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, key, algorithm=algorithm, headers={'kid': kid})
+
+
+@pytest.fixture
+def verifier():
+    return FirebaseTokenVerifier(PROJECT_ID, PublicKeyCache(keyset={KID: PUBLIC_PEM}))
+
+
+def test_valid_token_is_verified_once_then_cached(verifier, monkeypatch):
+    token = make_token()
+    claims = verifier.verify(token)
+    assert claims['uid'] == 'user-123'
+    assert claims['email'] == 'user@example.com'
+
+    def fail(id_token):
+        raise AssertionError("signature checked again")
+    monkeypatch.setattr(verifier, '_verify_signature', fail)
+    assert verifier.verify(token)['uid'] == 'user-123'
+
+
+@pytest.mark.parametrize('overrides', [
+    {'aud': 'other-project'},
+    {'iss': 'https://securetoken.google.com/other-project'},
+    {'iss': 'https://accounts.google.com'},
+])
+def test_token_for_another_project_is_rejected(verifier, overrides):
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(make_token(**overrides))
+
+
+def test_expired_token_is_rejected(verifier):
+    now = int(time.time())
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(make_token(iat=now - 7200, auth_time=now - 7200, exp=now - 3600))
+
+
+def test_cached_token_is_rejected_once_expired(verifier, monkeypatch):
+    now = time.time()
+    token = make_token(exp=int(now) + 120)
+    verifier.verify(token)
+
+    # Move both this module's clock and PyJWT's past exp and the skew
+    later = now + 120 + token_verifier.CLOCK_SKEW + 60
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(later, tz)
+
+    monkeypatch.setattr(token_verifier.time, 'time', lambda: later)
+    monkeypatch.setattr(jwt.api_jwt, 'datetime', Later)
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(token)
+    assert verifier.cache.stats()['size'] == 0
+
+
+def test_symmetric_algorithm_is_rejected(verifier):
+    token = make_token(key='a-shared-secret-long-enough-for-hs256', algorithm='HS256')
+    with pytest.raises(TokenVerificationError, match='algorithm'):
+        verifier.verify(token)
+
+
+def test_unsigned_token_is_rejected(verifier):
+    token = make_token(key=None, algorithm='none')
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(token)
+
+
+def test_unknown_key_id_is_rejected(verifier):
+    with pytest.raises(TokenVerificationError, match='Unknown key id'):
+        verifier.verify(make_token(kid='rotated-away'))
+
+
+def test_token_signed_by_another_key_is_rejected(verifier):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(make_token(key=other_key))
+
+
+@pytest.mark.parametrize('token', ['', None, 'not-a-jwt'])
+def test_malformed_token_is_rejected(verifier, token):
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(token)
+
+
+def test_process_verifier_uses_the_configured_keyset(tmp_path, monkeypatch):
+    keyset_path = tmp_path / 'keyset.json'
+    keyset_path.write_text(json.dumps({KID: PUBLIC_PEM}))
+    monkeypatch.setattr(Config, 'FIREBASE_KEYSET_PATH', str(keyset_path))
+    monkeypatch.setattr(Config, 'FIREBASE_PROJECT_ID', PROJECT_ID)
+    token_verifier.set_verifier(None)
+    try:
+        verifier = token_verifier.get_verifier()
+        assert verifier.keys.offline
+        assert verifier.verify(make_token())['uid'] == 'user-123'
+    finally:
+        token_verifier.set_verifier(None)
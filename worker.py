@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Run background jobs from the task queue
+
+Usage:
+    python worker.py            # poll until interrupted
+    python worker.py --once     # run one batch and exit
+    python worker.py --stats    # print queue depth and exit
+
+Set TASK_WORKER_IN_PROCESS=False on the web processes when running
+dedicated workers.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# This process is the worker; don't start a second one inside create_app()
+os.environ['TASK_WORKER_IN_PROCESS'] = 'False'
+
+from app import create_app
+from app.utils.task_queue import Worker, get_queue_stats
+import app.tasks  # noqa: F401  (registers the tasks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run background jobs')
+    parser.add_argument('--once', action='store_true', help='run one batch and exit')
+    parser.add_argument('--stats', action='store_true', help='print queue depth and exit')
+    args = parser.parse_args()
+    
+    if args.stats:
+        print(json.dumps(get_queue_stats(), indent=2))
+        sys.exit(0)
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    worker = Worker(app=app)
+    
+    if args.once:
+        print(f"Ran {worker.run_once()} jobs")
+        sys.exit(0)
+    
+    print(f"Worker {worker.worker_id} polling every {worker.poll_interval}s")
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
+        print(f"\nStopped: {worker.stats}")